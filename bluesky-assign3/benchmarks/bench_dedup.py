@@ -0,0 +1,103 @@
+"""
+Cost per post of a spam wave with and without the near-duplicate cache.
+
+A wave is `--templates` scam texts (each with a link and an image),
+copied `--copies` times each in one of these ways:
+
+    same blob     exact text, the same image CID
+    re-uploaded   exact text, the image uploaded again (a new CID)
+    near copy     one word changed, the image uploaded again
+
+and, for comparison, exact copies of the texts without an image.
+
+Blobs are served by a local blob server, so every new CID costs a real
+HTTP fetch, decode and pHash; posts are moderated one after another, on
+a fresh labeler each run. Reports the best of `--repeat` runs in
+microseconds per post, and the number of blob fetches.
+
+Run from the bluesky-assign3 directory:
+    python -m benchmarks.bench_dedup [--templates N] [--copies N] [--repeat N]
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+from benchmarks.fixtures import BlobServer, FakeClient, fake_cid
+from pylabel.automated_labeler import AutomatedLabeler
+from pylabel.metrics import Metrics
+from pylabel.post_context import PostContext
+
+ROOT = Path(__file__).resolve().parent.parent
+INPUT_DIR = str(ROOT / "labeler-inputs")
+KINDS = ("text only", "same blob", "re-uploaded", "near copy")
+
+
+def wave(templates: int, copies: int, kind: str, blobs: dict):
+    dog_dir = ROOT / "labeler-inputs" / "dog-list-images"
+    dogs = [(dog_dir / name).read_bytes() for name in sorted(os.listdir(dog_dir))]
+    posts = []
+    for c in range(copies):
+        for t in range(templates):
+            words = (f"limited offer {t} send eth now and get double back guaranteed returns "
+                     f"for everyone who joins the giveaway today").split()
+            if kind == "near copy" and c:
+                words[3 + c % 10] = f"variant{c}"
+            text = " ".join(words) + f" https://example.com/claim/{t}"
+            tail = b"" if kind == "same blob" else c.to_bytes(4, "big")
+            data = dogs[t % len(dogs)] + t.to_bytes(4, "big") + tail
+            cid = fake_cid(data)
+            blobs[cid] = data
+            record = {"$type": "app.bsky.feed.post", "text": text, "createdAt": "2025-04-01T00:00:00Z"}
+            if kind != "text only":
+                record["embed"] = {"$type": "app.bsky.embed.images",
+                                   "images": [{"alt": "", "image": {"$type": "blob", "mimeType": "image/jpeg",
+                                                                    "size": len(data), "ref": {"$link": cid}}}]}
+            rkey = f"3lwave{t:03d}{c:05d}"
+            did = f"did:plc:wave{c:016d}"
+            posts.append(PostContext.from_record(f"https://bsky.app/profile/{did}/post/{rkey}",
+                                                 f"at://{did}/app.bsky.feed.post/{rkey}", f"cid{t}-{c}", record))
+    return posts
+
+
+def run(posts, blob_base_url: str, dedup: bool):
+    labeler = AutomatedLabeler(FakeClient([]), INPUT_DIR)
+    labeler.blob_base_url = blob_base_url
+    labeler.metrics = Metrics()
+    if dedup:
+        labeler.enable_dedup()
+    try:
+        start = time.perf_counter()
+        labels = [sorted(labeler.moderate(post)) for post in posts]
+        elapsed = time.perf_counter() - start
+        return elapsed / len(posts) * 1e6, labeler.metrics.count("cache_misses", cache="blob"), labels
+    finally:
+        labeler.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--templates", type=int, default=20)
+    parser.add_argument("--copies", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'wave':<12} {'off us/post':>11} {'on us/post':>10} {'speedup':>8} {'fetches off':>11} {'on':>5}")
+    for kind in KINDS:
+        blobs = {}
+        posts = wave(args.templates, args.copies, kind, blobs)
+        server = BlobServer(blobs)
+        try:
+            runs = [(run(posts, server.base_url, dedup=False), run(posts, server.base_url, dedup=True))
+                    for _ in range(args.repeat)]
+            off, fetches_off, labels_off = min((r[0] for r in runs), key=lambda r: r[0])
+            on, fetches_on, labels_on = min((r[1] for r in runs), key=lambda r: r[0])
+        finally:
+            server.close()
+        assert labels_on == labels_off, "the cache changed a post's labels"
+        print(f"{kind:<12} {off:>11.1f} {on:>10.1f} {off / on:>7.2f}x {fetches_off:>11.0f} {fetches_on:>5.0f}")
+
+
+if __name__ == "__main__":
+    main()
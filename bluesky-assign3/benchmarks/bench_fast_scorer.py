@@ -0,0 +1,54 @@
+"""
+Compare the stdlib FastScamScorer with PolicyProposalClassifier.predict.
+
+Run from the bluesky-assign3 directory:
+    python -m benchmarks.bench_fast_scorer
+"""
+
+import csv
+import sys
+import time
+from pathlib import Path
+
+from pylabel.fast_scorer import FastScamScorer
+from pylabel.policy_proposal_labeler import PolicyProposalClassifier
+
+ROOT = Path(__file__).resolve().parent.parent
+SHORT_POST = "Free crypto giveaway, send 1 ETH and get 2 back!"
+N_SHORT = 100_000
+
+
+def main():
+    csv.field_size_limit(sys.maxsize)
+    with open(ROOT / "training-data" / "posts.csv", newline="", encoding="utf-8") as f:
+        posts = [row["Post"] or "" for row in csv.DictReader(f)]
+
+    classifier = PolicyProposalClassifier()
+    scorer = FastScamScorer.load(classifier.artifact_dir)
+
+    expected = classifier.model.decision_function(classifier.vectorizer.transform(posts))
+    max_err = max(abs(e - scorer.decision_function(p)) for e, p in zip(expected, posts))
+
+    start = time.perf_counter()
+    for p in posts:
+        classifier.predict(p)
+    sk_t = (time.perf_counter() - start) / len(posts) * 1e6
+
+    start = time.perf_counter()
+    for p in posts:
+        scorer.predict(p)
+    fast_t = (time.perf_counter() - start) / len(posts) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(N_SHORT):
+        scorer.predict(SHORT_POST)
+    short_t = (time.perf_counter() - start) / N_SHORT * 1e6
+
+    print(f"max |decision difference| over {len(posts)} posts: {max_err:.2e}")
+    print(f"sklearn predict:        {sk_t:8.1f} us/post")
+    print(f"FastScamScorer.predict: {fast_t:8.1f} us/post")
+    print(f"FastScamScorer, short post: {short_t:6.1f} us")
+
+
+if __name__ == "__main__":
+    main()
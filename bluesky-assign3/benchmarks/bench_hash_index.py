@@ -0,0 +1,79 @@
+"""
+Benchmark HashIndex against the original ImageHash-by-ImageHash scan.
+
+Run from the bluesky-assign3 directory:
+    python -m benchmarks.bench_hash_index
+"""
+
+import random
+import time
+
+import imagehash
+import numpy as np
+
+from pylabel.automated_labeler import THRESH
+from pylabel.hash_index import HashIndex
+
+SIZES = (1_000, 100_000, 1_000_000)
+N_QUERIES = 50
+# the old scan is only timed up to this size, it is far too slow beyond it
+MAX_LOOP = 100_000
+
+
+def random_hashes(n: int, seed: int):
+    rng = np.random.default_rng(seed)
+    bits = rng.integers(0, 2, size=(n, 8, 8), dtype=np.uint8).astype(bool)
+    return [imagehash.ImageHash(b) for b in bits]
+
+
+def near_copy(h: imagehash.ImageHash, flips: int, rng: random.Random):
+    bits = h.hash.copy().flatten()
+    for i in rng.sample(range(64), flips):
+        bits[i] = not bits[i]
+    return imagehash.ImageHash(bits.reshape(8, 8))
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'hashes':>9} {'loop us/query':>14} {'index us/query':>15} {'miss us/query':>14} "
+          f"{'knn us/query':>13}")
+    for size in SIZES:
+        refs = random_hashes(size, seed=size)
+        # probes with nothing within THRESH: the case that cannot stop early
+        misses = random_hashes(N_QUERIES, seed=size + 2)
+        full = HashIndex(refs)
+        keep = np.ones(len(refs), dtype=bool)
+        for m in misses:
+            keep &= full.distances(m) > THRESH
+        refs = [r for r, k in zip(refs, keep) if k]
+        index = HashIndex(full.hashes[keep])
+        index.any_within(refs[0], THRESH)      # build the multi-index outside the timing
+        # half the probes are near-duplicates of a reference, half are random
+        queries = [near_copy(rng.choice(refs), rng.randint(0, 24), rng) for _ in range(N_QUERIES // 2)]
+        queries += random_hashes(N_QUERIES - len(queries), seed=size + 1)
+
+        start = time.perf_counter()
+        hits = [index.any_within(q, THRESH) for q in queries]
+        index_t = (time.perf_counter() - start) / len(queries) * 1e6
+
+        start = time.perf_counter()
+        assert not any(index.any_within(q, THRESH) for q in misses)
+        miss_t = (time.perf_counter() - start) / len(misses) * 1e6
+
+        start = time.perf_counter()
+        for q in queries:
+            index.nearest(q, k=5)
+        knn_t = (time.perf_counter() - start) / len(queries) * 1e6
+
+        loop_col = "-"
+        if size <= MAX_LOOP:
+            start = time.perf_counter()
+            expected = [any((q - r) <= THRESH for r in refs) for q in queries]
+            loop_t = (time.perf_counter() - start) / len(queries) * 1e6
+            assert hits == expected, "index disagrees with the linear scan"
+            loop_col = f"{loop_t:.1f}"
+        print(f"{size:>9} {loop_col:>14} {index_t:>15.1f} {miss_t:>14.1f} {knn_t:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
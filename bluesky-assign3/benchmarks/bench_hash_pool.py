@@ -0,0 +1,87 @@
+"""
+Latency of text-only posts during an image-heavy burst, with image decode
+and pHash done in-process versus in a HashPool.
+
+A burst of posts, one in `--image-every` carrying a unique image blob
+(served by a local blob server), is moderated on a thread pool the way
+moderate_posts does it. Reports the p50/p99 of the time each text-only
+post spends in moderate(), and the burst's total throughput.
+
+Run from the bluesky-assign3 directory:
+    python -m benchmarks.bench_hash_pool [--posts N] [--processes P]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.bench_workers import build_jobs
+from benchmarks.fixtures import BlobServer, FakeClient
+from pylabel.automated_labeler import AutomatedLabeler
+from pylabel.post_context import PostContext
+
+ROOT = Path(__file__).resolve().parent.parent
+THREADS = 16
+
+
+def burst(n: int, image_every: int):
+    fixtures, blobs = build_jobs(n // image_every + 1)
+    posts = []
+    for i in range(n):
+        if i % image_every == 0:
+            fx = fixtures[i // image_every]
+            posts.append(PostContext.from_record(fx.url, fx.uri, fx.cid, fx.record))
+        else:
+            record = {"$type": "app.bsky.feed.post", "createdAt": "2025-04-01T00:00:00Z",
+                      "text": f"post {i}: read https://www.nytimes.com/2025/04/01/story-{i}.html"}
+            posts.append(PostContext.from_record(f"https://bsky.app/profile/x/post/{i}",
+                                                 f"at://did:plc:x/app.bsky.feed.post/{i}", f"cid{i}", record))
+    return posts, blobs
+
+
+def run(labeler: AutomatedLabeler, posts):
+    text_latency = []
+
+    def moderate(post: PostContext):
+        start = time.perf_counter()
+        labeler.moderate(post)
+        if not post.image_cids:
+            text_latency.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(moderate, posts))
+    wall = time.perf_counter() - start
+    text_latency.sort()
+    pick = lambda q: text_latency[min(int(len(text_latency) * q), len(text_latency) - 1)] * 1e3
+    return pick(0.5), pick(0.99), len(posts) / wall
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--image-every", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=None, help="HashPool size (default: one per core)")
+    args = parser.parse_args()
+
+    posts, blobs = burst(args.posts, args.image_every)
+    server = BlobServer(blobs)
+    print(f"{'hashing':<18} {'text p50 ms':>12} {'text p99 ms':>12} {'posts/s':>9}")
+    for mode in ("in-process", "hash pool"):
+        labeler = AutomatedLabeler(FakeClient([]), str(ROOT / "labeler-inputs"))
+        labeler.blob_base_url = server.base_url
+        if mode == "hash pool":
+            pool = labeler.enable_hash_pool(args.processes)
+            pool.hash(blobs[next(iter(blobs))])      # start the workers before timing
+            mode = f"hash pool ({pool.processes})"
+        p50, p99, rate = run(labeler, posts)
+        print(f"{mode:<18} {p50:>12.2f} {p99:>12.2f} {rate:>9.0f}")
+        if labeler.hash_pool is not None:
+            labeler.hash_pool.close()
+    server.close()
+
+
+if __name__ == "__main__":
+    main()
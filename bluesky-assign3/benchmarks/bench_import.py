@@ -0,0 +1,124 @@
+"""
+Import-time budget check for the pylabel modules.
+
+Imports each module in a fresh interpreter under `-X importtime` and
+checks two things:
+
+  * it does not load a package it has no use for at import time (the
+    label CLI must not pull in PIL, numpy or atproto, the scorer nothing
+    outside the stdlib, ...), which catches a heavy module-level import
+    on any machine;
+  * its cumulative import time stays within a multiple of a baseline
+    measured in the same run: the third-party packages it is allowed to
+    import, or a few stdlib modules for the dependency-free ones. The
+    budgets therefore hold on a faster or slower machine, and a model or
+    client built on import still shows up as a failure.
+
+Exits non-zero on any failure. tests/test_import_budget.py runs the same
+check.
+
+Run from the bluesky-assign3 directory:
+    python -m benchmarks.bench_import [--runs N]
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY = ("numpy", "scipy", "PIL", "sklearn", "pandas", "atproto", "atproto_client", "requests")
+
+# what each module may cost to import, against what it is built on
+BASELINES = {
+    "stdlib": "asyncio, json, hashlib, dataclasses, sqlite3, decimal, http.client",
+    "requests": "requests",
+    "images": "numpy, PIL.Image, requests",
+    "sklearn": "pandas, sklearn.linear_model, sklearn.feature_extraction.text",
+}
+
+# module -> (baseline, max ratio); about 1.5x the highest ratio seen over
+# repeated runs on a noisy machine, with a floor for the near-empty package
+BUDGETS: Dict[str, Tuple[str, float]] = {
+    "pylabel": ("stdlib", 0.02),
+    "pylabel.fast_scorer": ("stdlib", 0.2),
+    "pylabel.stages": ("stdlib", 0.6),
+    "pylabel.label": ("requests", 1.8),
+    "pylabel.automated_labeler": ("images", 2.0),
+    "pylabel.policy_proposal_classifier": ("sklearn", 1.6),
+    "pylabel.policy_proposal_labeler": ("sklearn", 1.7),
+}
+
+# packages a module must not have loaded once it is imported
+FORBIDDEN: Dict[str, Tuple[str, ...]] = {
+    "pylabel": HEAVY,
+    "pylabel.fast_scorer": HEAVY,
+    "pylabel.stages": HEAVY,
+    "pylabel.label": ("numpy", "scipy", "PIL", "sklearn", "pandas", "atproto", "atproto_client"),
+    "pylabel.automated_labeler": ("scipy", "sklearn", "pandas", "atproto", "atproto_client"),
+    "pylabel.policy_proposal_classifier": ("PIL", "atproto", "atproto_client"),
+    "pylabel.policy_proposal_labeler": ("PIL", "atproto", "atproto_client"),
+}
+
+
+def measure(modules: str) -> Tuple[float, Set[str]]:
+    """
+    Cumulative import time in ms of the comma-separated `modules` (and
+    their parent packages) in a fresh interpreter, and the top-level
+    packages loaded by then.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c",
+         f"import {modules}; import sys; print(' '.join(sys.modules))"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    wanted = set()
+    for module in modules.split(","):
+        parts = module.strip().split(".")
+        wanted.update(".".join(parts[:i]) for i in range(1, len(parts) + 1))
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, _self_us, cumulative_us, name = line.replace(":", "|", 1).split("|")
+        # one space of indent: imported by the -c statement itself, not by another module
+        if name.startswith(" ") and not name.startswith("  ") and name.strip() in wanted:
+            total_us += int(cumulative_us)
+    loaded = {name.split(".")[0] for name in proc.stdout.split()}
+    return total_us / 1e3, loaded
+
+
+def check(runs: int = 5, report=print) -> List[str]:
+    """Run every check, taking the best of `runs` imports; returns the failures."""
+    baselines = {name: min(measure(modules)[0] for _ in range(runs)) for name, modules in BASELINES.items()}
+    failures = []
+    report(f"{'module':<38} {'best ms':>9} {'baseline':>9} {'ratio':>6} {'budget':>7}")
+    for module, (baseline, budget) in BUDGETS.items():
+        samples = [measure(module) for _ in range(runs)]
+        best = min(ms for ms, _loaded in samples)
+        ratio = best / baselines[baseline]
+        flags = []
+        if ratio > budget:
+            flags.append("OVER BUDGET")
+            failures.append(f"{module} imports in {ratio:.2f}x {baseline} (budget {budget}x)")
+        loaded = sorted(set(FORBIDDEN[module]) & samples[0][1])
+        if loaded:
+            flags.append(f"loads {', '.join(loaded)}")
+            failures.append(f"{module} loads {', '.join(loaded)} at import time")
+        report(f"{module:<38} {best:>9.1f} {baseline:>9} {ratio:>6.2f} {budget:>7}  {'; '.join(flags)}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="take the best of this many imports")
+    args = parser.parse_args()
+    failures = check(args.runs)
+    if failures:
+        sys.exit("import budget failures:\n  " + "\n  ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark ModerationLedger writes and lookups as it grows to millions of rows.
+
+Run from the bluesky-assign3 directory:
+    python -m benchmarks.bench_ledger [--rows N]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from pylabel.ledger import ModerationLedger
+
+STEPS = (100_000, 1_000_000)
+N_QUERIES = 10_000
+LABELS = ([], [], [], ["t-and-s"], ["dog"], ["nyt", "cnn"])
+
+
+def uri(i: int) -> str:
+    return f"at://did:plc:{i % 50_000:024x}/app.bsky.feed.post/3l{i:011x}"
+
+
+def url(i: int) -> str:
+    return f"https://bsky.app/profile/did:plc:{i % 50_000:024x}/post/3l{i:011x}"
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2] * 1e6, samples[int(len(samples) * 0.99)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=STEPS[-1], help="largest ledger size")
+    args = parser.parse_args()
+    steps = [n for n in STEPS if n < args.rows] + [args.rows]
+
+    rng = random.Random(0)
+    path = os.path.join(tempfile.mkdtemp(), "ledger.db")
+    print(f"{'rows':>9} {'write rows/s':>13} {'get p50/p99 us':>15} {'url p50/p99 us':>15} "
+          f"{'miss p50/p99 us':>16} {'db MB':>7}")
+    with ModerationLedger(path) as ledger:
+        version = ledger.version_id({"stages": {"ts_labels": "1"}})
+        done = 0
+        for rows in steps:
+            start = time.perf_counter()
+            for i in range(done, rows):
+                ledger.record(uri(i), f"bafy{i:x}", LABELS[i % len(LABELS)], version, url(i))
+            ledger.flush()
+            write_rate = (rows - done) / (time.perf_counter() - start)
+            done = rows
+
+            timings = {"get": [], "url": [], "miss": []}
+            for _ in range(N_QUERIES):
+                i = rng.randrange(rows)
+                t = time.perf_counter()
+                ledger.get(uri(i), f"bafy{i:x}")
+                timings["get"].append(time.perf_counter() - t)
+                t = time.perf_counter()
+                ledger.get_url(url(i))
+                timings["url"].append(time.perf_counter() - t)
+                t = time.perf_counter()
+                ledger.get(uri(rows + i), "bafy")
+                timings["miss"].append(time.perf_counter() - t)
+            get, by_url, miss = (percentiles(timings[k]) for k in ("get", "url", "miss"))
+            size = os.path.getsize(path) / 1e6
+            print(f"{rows:>9} {write_rate:>13,.0f} {get[0]:>7.1f}/{get[1]:<7.1f} "
+                  f"{by_url[0]:>7.1f}/{by_url[1]:<7.1f} {miss[0]:>8.1f}/{miss[1]:<7.1f} {size:>7.0f}")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
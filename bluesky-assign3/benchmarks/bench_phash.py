@@ -0,0 +1,54 @@
+"""
+Benchmark batched pHashing against one-at-a-time imagehash.phash.
+
+Run from the bluesky-assign3 directory:
+    python -m benchmarks.bench_phash
+"""
+
+import os
+import time
+from io import BytesIO
+from pathlib import Path
+
+import imagehash
+from PIL import Image
+
+from pylabel.batch_hash import phash_blobs
+from pylabel.hash_index import hash_to_int
+
+ROOT = Path(__file__).resolve().parent.parent
+IMAGE_DIR = ROOT / "labeler-inputs" / "dog-list-images"
+REPEAT = 8
+
+
+def single(data: bytes) -> int:
+    im = Image.open(BytesIO(data)).convert("RGB").resize((256, 256))
+    return hash_to_int(imagehash.phash(im))
+
+
+def main():
+    blobs = [(IMAGE_DIR / f).read_bytes() for f in sorted(os.listdir(IMAGE_DIR))] * REPEAT
+
+    start = time.perf_counter()
+    expected = [single(b) for b in blobs]
+    single_t = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = phash_blobs(blobs)
+    batch_t = time.perf_counter() - start
+    assert batched == expected, "batched hashes differ from imagehash.phash"
+
+    start = time.perf_counter()
+    drafted = phash_blobs(blobs, draft=True)
+    draft_t = time.perf_counter() - start
+    max_bits = max(bin(a ^ b).count("1") for a, b in zip(expected, drafted))
+
+    n = len(blobs)
+    print(f"{n} images")
+    print(f"imagehash.phash one at a time: {single_t / n * 1e3:7.2f} ms/image")
+    print(f"phash_blobs:                   {batch_t / n * 1e3:7.2f} ms/image (bit-identical)")
+    print(f"phash_blobs(draft=True):       {draft_t / n * 1e3:7.2f} ms/image (max {max_bits} bits off)")
+
+
+if __name__ == "__main__":
+    main()
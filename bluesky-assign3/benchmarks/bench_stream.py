@@ -0,0 +1,62 @@
+"""
+Sustained events/second of the streaming labeler on a synthetic replay.
+
+Builds a Jetstream-style replay from the training posts (text-only
+creates plus some non-post events) and runs it through StreamLabeler.
+
+Run from the bluesky-assign3 directory:
+    python -m benchmarks.bench_stream [--events N] [--workers W]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from atproto import Client
+
+from pylabel.automated_labeler import AutomatedLabeler
+from pylabel.stream import StreamLabeler, replay_lines
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def write_replay(path: str, n_events: int) -> None:
+    csv.field_size_limit(sys.maxsize)
+    with open(ROOT / "training-data" / "posts.csv", newline="", encoding="utf-8") as f:
+        texts = [row["Post"] or "" for row in csv.DictReader(f)]
+    with open(path, "w", encoding="utf-8") as out:
+        for i in range(n_events):
+            event = {"did": f"did:plc:bench{i % 997}", "time_us": 1_700_000_000_000_000 + i}
+            if i % 10 == 9:
+                event.update(kind="commit", commit={"operation": "create", "collection": "app.bsky.feed.like",
+                                                    "rkey": f"l{i}", "record": {}})
+            else:
+                record = {"$type": "app.bsky.feed.post", "text": texts[i % len(texts)][:3000],
+                          "createdAt": "2025-04-01T00:00:00Z"}
+                event.update(kind="commit", commit={"operation": "create", "collection": "app.bsky.feed.post",
+                                                    "rkey": f"p{i}", "cid": f"bafybench{i}", "record": record})
+            out.write(json.dumps(event) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    labeler = AutomatedLabeler(Client(), str(ROOT / "labeler-inputs"))
+    with tempfile.TemporaryDirectory() as tmp:
+        replay = os.path.join(tmp, "events.jsonl")
+        write_replay(replay, args.events)
+        stream = StreamLabeler(labeler, workers=args.workers, report_every=None,
+                               checkpoint_path=os.path.join(tmp, "cursor.json"))
+        stats = stream.run(replay_lines(replay))
+        print(stats.summary())
+
+
+if __name__ == "__main__":
+    main()
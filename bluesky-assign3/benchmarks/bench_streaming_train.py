@@ -0,0 +1,90 @@
+"""
+Peak memory, wall time and holdout accuracy of the streaming trainer vs the
+full in-memory fit.
+
+Run from the bluesky-assign3 directory:
+    python -m benchmarks.bench_streaming_train [--scale N] [--epochs E]
+
+--scale N trains on the training CSV repeated N times (written to a temp
+file); --epochs E makes E streaming passes. Both models train on the same
+rows and are scored on the streaming trainer's holdout (one URI in five).
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from pylabel.streaming_trainer import StreamingScamClassifier, is_holdout
+
+ROOT = Path(__file__).resolve().parent.parent
+CSV = ROOT / "training-data" / "posts.csv"
+
+
+def holdout_mask(data: pd.DataFrame):
+    return data["URI"].astype(str).map(is_holdout)
+
+
+def full_fit(path: Path, epochs: int):
+    """What PolicyProposalClassifier does: load everything, then fit (on the non-holdout rows)."""
+    data = pd.read_csv(path)
+    data["Post"] = data["Post"].fillna("")
+    data = data[~holdout_mask(data)]
+    vectorizer = TfidfVectorizer(max_features=5000)
+    model = LogisticRegression().fit(vectorizer.fit_transform(data["Post"]), data["Label"])
+    return lambda texts: model.predict(vectorizer.transform(texts))
+
+
+def streaming_fit(path: Path, epochs: int):
+    clf = StreamingScamClassifier().fit_stream(path, epochs=epochs, chunk_size=5000)
+    return lambda texts: clf.model.predict(clf.vectorizer.transform(texts))
+
+
+def measure(fn, path: Path, epochs: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    predict = fn(path, epochs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20, predict
+
+
+def holdout_accuracy(predict) -> float:
+    data = pd.read_csv(CSV)
+    data = data[holdout_mask(data)]
+    return float((predict(data["Post"].fillna("").tolist()) == data["Label"].to_numpy()).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--epochs", type=int, default=1)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        path = CSV
+        if args.scale > 1:
+            path = Path(tmpdir) / "posts.csv"
+            header, body = CSV.read_text(encoding="utf-8").split("\n", 1)
+            with open(path, "w", encoding="utf-8") as out:
+                out.write(header + "\n")
+                for _ in range(args.scale):
+                    out.write(body)
+        for name, fn in (("full fit", full_fit), ("streaming", streaming_fit)):
+            elapsed, peak, predict = measure(fn, path, args.epochs)
+            print(f"{name:>10}: {elapsed:7.2f} s, peak {peak:8.1f} MiB, "
+                  f"holdout accuracy {holdout_accuracy(predict):.3f}")
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Offline benchmark suite: throughput and latency percentiles for every labeling stage.
+
+Runs against the fixtures in benchmarks/fixtures.py (a fake XRPC client
+and a local blob server), so no network access or credentials are needed
+and results are comparable between commits. Each input list is also
+scaled up synthetically to show how the stages grow with it.
+
+Run from the bluesky-assign3 directory:
+    python -m benchmarks.bench_suite [--repeat N] [--quick] [--out results.json]
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+
+from benchmarks.bench_ts_words import synthetic_terms
+from benchmarks.fixtures import BlobServer, FakeClient, load_fixtures
+from pylabel.automated_labeler import T_AND_S_LABEL, THRESH, AutomatedLabeler
+from pylabel.blob_cache import BlobHashCache
+from pylabel.domain_index import DomainIndex
+from pylabel.hash_index import HashIndex
+from pylabel.policy_proposal_labeler import PolicyProposalClassifier
+from pylabel.post_context import PostContext
+from pylabel.term_matcher import TermMatcher
+
+ROOT = Path(__file__).resolve().parent.parent
+WORD_SIZES = (10_000, 100_000)
+DOMAIN_SIZES = (100_000, 1_000_000)
+HASH_SIZES = (100_000, 1_000_000)
+
+
+def measure(stage: str, scale: Dict[str, int], fn: Callable, inputs: List,
+            repeat: int, before: Callable[[], None] = lambda: None) -> dict:
+    """Time fn on every input `repeat` times; `before` runs untimed ahead of each call."""
+    fn(inputs[0])       # warm up lazy state outside the timed region
+    samples = np.empty(len(inputs) * repeat, dtype=np.int64)
+    i = 0
+    for _ in range(repeat):
+        for item in inputs:
+            before()
+            start = time.perf_counter_ns()
+            fn(item)
+            samples[i] = time.perf_counter_ns() - start
+            i += 1
+    p50, p95, p99 = np.percentile(samples, (50, 95, 99)) / 1e3
+    result = {
+        "stage": stage,
+        "scale": scale,
+        "calls": int(len(samples)),
+        "throughput_per_s": round(len(samples) / (samples.sum() / 1e9), 1),
+        "p50_us": round(float(p50), 1),
+        "p95_us": round(float(p95), 1),
+        "p99_us": round(float(p99), 1),
+    }
+    print(f"{stage:<22} {json.dumps(scale):<34} {result['throughput_per_s']:>11.1f}/s "
+          f"p50 {result['p50_us']:>9.1f}us p95 {result['p95_us']:>9.1f}us p99 {result['p99_us']:>9.1f}us",
+          file=sys.stderr)
+    return result
+
+
+def synthetic_domains(real: Iterable[str], size: int) -> List[str]:
+    rng = random.Random(size)
+    domains = list(real)
+    tlds = ("com", "org", "net", "co.uk", "io")
+    while len(domains) < size:
+        name = "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(5, 12)))
+        domain = f"{name}.{rng.choice(tlds)}"
+        if rng.random() < 0.2:
+            domain += f"/{name[:4]}"
+        domains.append(domain)
+    return domains
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the fixtures per stage")
+    parser.add_argument("--quick", action="store_true", help="skip the synthetic scale-ups")
+    parser.add_argument("--out", type=str, default=None, help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    fixtures, blobs = load_fixtures()
+    server = BlobServer(blobs)
+    labeler = AutomatedLabeler(FakeClient(fixtures), str(ROOT / "labeler-inputs"))
+    labeler.blob_base_url = server.base_url
+    posts = [labeler.hydrate(fx.url) for fx in fixtures]
+    texts = [p.text for p in posts]
+    image_posts = [p for p in posts if p.image_cids]
+    repeat = args.repeat
+    results = []
+
+    # T&S: word matcher plus domain lookups on the post's links
+    base_words = {"words": len(labeler.ts_words), "domains": len(labeler.ts_domains)}
+    results.append(measure("ts_labels", base_words, labeler._ts_labels, texts, repeat))
+    if not args.quick:
+        words, matcher = labeler.ts_words, labeler.ts_matcher
+        for size in WORD_SIZES:
+            labeler.ts_matcher = TermMatcher(synthetic_terms(words, size))
+            results.append(measure("ts_labels", {"words": size, "domains": len(labeler.ts_domains)},
+                                   labeler._ts_labels, texts, repeat))
+        labeler.ts_matcher = matcher
+
+    # news citations
+    results.append(measure("cite_labels", {"domains": len(labeler.news_domain_map)},
+                           labeler._cite_labels, texts, repeat))
+    if not args.quick:
+        index = labeler.news_index
+        for size in DOMAIN_SIZES:
+            # each list grown from its own real entries, which keep their labels
+            news = synthetic_domains(labeler.news_domain_map, size)[len(labeler.news_domain_map):]
+            labeler.news_index = DomainIndex([*labeler.news_domain_map.items(),
+                                              *((d, "synthetic") for d in news)])
+            results.append(measure("cite_labels", {"domains": size}, labeler._cite_labels, texts, repeat))
+            labeler.ts_domain_index = DomainIndex((d, T_AND_S_LABEL)
+                                                  for d in synthetic_domains(labeler.ts_domains, size))
+            results.append(measure("ts_labels", {"words": len(labeler.ts_words), "domains": size},
+                                   labeler._ts_labels, texts, repeat))
+        labeler.news_index = index
+        labeler.ts_domain_index = DomainIndex((d, T_AND_S_LABEL) for d in labeler.ts_domains)
+
+    # dogs: cold (blob fetch + decode + pHash) and warm (CID cache hit + index scan)
+    def cold_cache():
+        labeler.blob_hashes = BlobHashCache()
+
+    results.append(measure("dog_labels_cold", {"hashes": len(labeler.dog_index)},
+                           labeler._dog_labels, image_posts, repeat, before=cold_cache))
+    for post in image_posts:
+        labeler._dog_labels(post)
+    results.append(measure("dog_labels_warm", {"hashes": len(labeler.dog_index)},
+                           labeler._dog_labels, image_posts, repeat))
+    if not args.quick:
+        index = labeler.dog_index
+        # a miss scans the whole index: the probe is the all-zero hash and every
+        # synthetic reference hash is kept further than THRESH bits away from it
+        misses = [PostContext(p.url, p.uri, p.cid, p.author_did, "", (), (f"miss-{i}",))
+                  for i, p in enumerate(image_posts)]
+        for post in misses:
+            labeler.blob_hashes.put(post.image_cids[0], 0)
+        rng = np.random.default_rng(1)
+        for size in HASH_SIZES:
+            extra = HashIndex(rng.integers(0, np.iinfo(np.uint64).max, size=size + 1000, dtype=np.uint64, endpoint=True))
+            far = extra.hashes[extra.distances(0) > THRESH][:size - len(index)]
+            labeler.dog_index = HashIndex(np.concatenate([labeler.dog_hashes, far]))
+            results.append(measure("dog_labels_warm", {"hashes": len(labeler.dog_index)},
+                                   labeler._dog_labels, image_posts, repeat))
+            results.append(measure("dog_labels_miss", {"hashes": len(labeler.dog_index)},
+                                   labeler._dog_labels, misses, repeat))
+        labeler.dog_index = index
+
+    # scam classifier, one post at a time as the labeler would call it
+    classifier = PolicyProposalClassifier()
+    results.append(measure("classifier_predict", {"features": len(classifier.vectorizer.vocabulary_)},
+                           classifier.predict, texts, repeat))
+
+    # end to end: hydration through the fake client, all checks, blob hashes cached by CID
+    def cold_posts():
+        labeler.post_cache.clear()
+
+    urls = [fx.url for fx in fixtures]
+    results.append(measure("moderate_post", {"posts": len(urls)}, labeler.moderate_post, urls, repeat,
+                           before=cold_posts))
+
+    server.close()
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fixtures": len(fixtures),
+        "repeat": repeat,
+        "results": results,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
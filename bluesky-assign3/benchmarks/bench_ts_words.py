@@ -0,0 +1,83 @@
+"""
+Benchmark the compiled T&S word matcher against the original per-term loop.
+
+Run from the bluesky-assign3 directory:
+    python -m benchmarks.bench_ts_words
+"""
+
+import csv
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+from pylabel.term_matcher import TermMatcher
+
+ROOT = Path(__file__).resolve().parent.parent
+SIZES = (100, 10_000, 100_000)
+N_POSTS = 500
+
+
+def loop_match(terms, text: str) -> bool:
+    """The original _ts_labels word loop, kept here as the baseline."""
+    text_lc = text.lower()
+    tokens = {tok.strip(string.punctuation).lower() for tok in text_lc.split()}
+    for term in terms:
+        if " " in term or "&" in term:
+            if term in text_lc:
+                return True
+        elif term in tokens:
+            return True
+    return False
+
+
+def load_posts(n: int):
+    csv.field_size_limit(sys.maxsize)
+    with open(ROOT / "training-data" / "posts.csv", newline="", encoding="utf-8") as f:
+        posts = [row["Post"] for row in csv.DictReader(f) if row["Post"]]
+    random.Random(0).shuffle(posts)
+    return posts[:n]
+
+
+def synthetic_terms(real_terms, size: int):
+    """Random made-up words and phrases (about a third multi-word) plus the real list."""
+    rng = random.Random(size)
+    terms = set(real_terms)
+    while len(terms) < size:
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+                 for _ in range(rng.choice((1, 1, 2, 3)))]
+        terms.add(" ".join(words))
+    return terms
+
+
+def timed(fn, posts):
+    start = time.perf_counter()
+    hits = [fn(p) for p in posts]
+    return time.perf_counter() - start, hits
+
+
+def main():
+    with open(ROOT / "labeler-inputs" / "t-and-s-words.csv", newline="", encoding="utf-8") as f:
+        real_terms = {row["Word"].strip().lower() for row in csv.DictReader(f)}
+    posts = load_posts(N_POSTS)
+
+    print(f"{'terms':>8} {'build s':>9} {'loop us/post':>13} {'matcher us/post':>16} {'speedup':>8}")
+    for size in SIZES:
+        terms = synthetic_terms(real_terms, size)
+
+        start = time.perf_counter()
+        matcher = TermMatcher(terms)
+        build = time.perf_counter() - start
+
+        loop_t, loop_hits = timed(lambda p: loop_match(terms, p), posts)
+        match_t, match_hits = timed(matcher.search, posts)
+        assert loop_hits == match_hits, "matcher disagrees with the original loop"
+
+        per_loop = loop_t / len(posts) * 1e6
+        per_match = match_t / len(posts) * 1e6
+        print(f"{size:>8} {build:>9.3f} {per_loop:>13.1f} {per_match:>16.1f} {per_loop / per_match:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
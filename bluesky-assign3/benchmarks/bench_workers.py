@@ -0,0 +1,102 @@
+"""
+Throughput of the multi-process labeler (pylabel.workers) from 1 worker
+process up to one per core.
+
+Every job is an image post with its own blob (a reference dog image with
+unique trailing bytes, so each one is fetched, decoded and hashed), served
+by a local blob server; posts come from a fake client, so no network is
+used. Throughput is measured between the first and last ack, which leaves
+out the time each worker spends building its labeler.
+
+Run from the bluesky-assign3 directory:
+    python -m benchmarks.bench_workers [--jobs N] [--max-processes P]
+"""
+
+import argparse
+import functools
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fixtures import BlobServer, FakeClient, Fixture, fake_cid
+from pylabel.automated_labeler import AutomatedLabeler
+from pylabel.work_queue import WorkQueue
+from pylabel.workers import run_pool
+
+ROOT = Path(__file__).resolve().parent.parent
+INPUT_DIR = str(ROOT / "labeler-inputs")
+
+
+def build_jobs(n: int):
+    """n image-post fixtures, each with a distinct blob, and the blobs by CID."""
+    dog_dir = ROOT / "labeler-inputs" / "dog-list-images"
+    dogs = [(dog_dir / name).read_bytes() for name in sorted(os.listdir(dog_dir))]
+    fixtures, blobs = [], {}
+    for i in range(n):
+        data = dogs[i % len(dogs)] + i.to_bytes(4, "big")
+        cid = fake_cid(data)
+        blobs[cid] = data
+        record = {"$type": "app.bsky.feed.post", "text": f"look at this one #{i}",
+                  "createdAt": "2025-04-01T00:00:00Z",
+                  "embed": {"$type": "app.bsky.embed.images",
+                            "images": [{"alt": "", "image": {"$type": "blob", "mimeType": "image/jpeg",
+                                                             "size": len(data), "ref": {"$link": cid}}}]}}
+        did = f"did:plc:bench{i % 97:016d}"
+        url = f"https://bsky.app/profile/bench{i % 97}.bsky.social/post/3lbench{i:07d}"
+        uri = f"at://{did}/app.bsky.feed.post/3lbench{i:07d}"
+        fixtures.append(Fixture(url, uri, fake_cid(json.dumps(record).encode(), codec=0x71), record, ["dog"]))
+    return fixtures, blobs
+
+
+def bench_labeler(fixture_path: str, blob_base_url: str, input_dir: str) -> AutomatedLabeler:
+    """Worker-side factory: a labeler over the fake client and the local blob server."""
+    with open(fixture_path, encoding="utf-8") as f:
+        fixtures = [Fixture(**json.loads(line)) for line in f]
+    labeler = AutomatedLabeler(FakeClient(fixtures), input_dir)
+    labeler.blob_base_url = blob_base_url
+    return labeler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    fixtures, blobs = build_jobs(args.jobs)
+    workdir = tempfile.mkdtemp()
+    fixture_path = os.path.join(workdir, "posts.jsonl")
+    with open(fixture_path, "w", encoding="utf-8") as f:
+        for fx in fixtures:
+            f.write(json.dumps(fx._asdict()) + "\n")
+    server = BlobServer(blobs)
+    factory = functools.partial(bench_labeler, fixture_path, server.base_url)
+
+    # warm the dog-list hash cache once, so workers only read it
+    bench_labeler(fixture_path, server.base_url, INPUT_DIR)
+
+    counts = sorted({1, 2, 4, 8, 16, 32, 64, args.max_processes} & set(range(1, args.max_processes + 1)))
+    print(f"{'processes':>9} {'posts/s':>9} {'speedup':>8} {'wall s':>7} {'done':>6} {'dead':>5}")
+    base = None
+    for processes in counts:
+        queue_path = os.path.join(workdir, f"queue-{processes}.db")
+        with WorkQueue(queue_path) as queue:
+            queue.put(fx.url for fx in fixtures)
+        start = time.perf_counter()
+        final = run_pool(queue_path, INPUT_DIR, processes, factory=factory)
+        wall = time.perf_counter() - start
+        with WorkQueue(queue_path) as queue:
+            results = list(queue.results())
+        assert all(r.labels == ["dog"] for r in results), "a worker produced wrong labels"
+        finished = sorted(r.finished for r in results)
+        rate = (len(finished) - 1) / max(finished[-1] - finished[0], 1e-9)
+        base = base or rate
+        print(f"{processes:>9} {rate:>9.0f} {rate / base:>7.2f}x {wall:>7.1f} "
+              f"{final['done']:>6} {final['dead']:>5}")
+    server.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Offline post and image fixtures, a fake XRPC client and a local blob server.
+
+Fixtures are read from benchmarks/fixtures/ when they have been recorded
+from the live network:
+
+    python -m benchmarks.fixtures --record
+
+Without a recording, equivalent fixtures are synthesized from
+test-data/*.csv (one post per URL, built to carry its expected labels),
+the labeler inputs and the dog-list-images.
+"""
+
+import argparse
+import base64
+import csv
+import hashlib
+import http.server
+import json
+import os
+import random
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+from urllib.parse import parse_qs, urlparse
+
+from atproto import models
+
+from pylabel.term_matcher import TermMatcher
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+POSTS_FILE = "posts.jsonl"
+BLOB_DIR = "blobs"
+TEST_CSVS = sorted((ROOT / "test-data").glob("*.csv"))
+
+
+class Fixture(NamedTuple):
+    url: str
+    uri: str
+    cid: str
+    record: dict
+    expected: List[str]
+
+
+def fake_cid(data: bytes, codec: int = 0x55) -> str:
+    """CIDv1 (sha2-256, base32) of data; 0x55 is the raw codec blobs use."""
+    digest = bytes([0x01, codec, 0x12, 0x20]) + hashlib.sha256(data).digest()
+    return "b" + base64.b32encode(digest).decode().lower().rstrip("=")
+
+
+def load_test_urls():
+    for path in TEST_CSVS:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                yield row["URL"], json.loads(row["Labels"])
+
+
+def _first_column(name: str) -> List[str]:
+    with open(ROOT / "labeler-inputs" / name, newline="", encoding="utf-8") as f:
+        return [row[0] for row in list(csv.reader(f))[1:]]
+
+
+def synthesize(blobs: Dict[str, bytes]):
+    """Build one fixture per test URL whose content produces its expected labels."""
+    rng = random.Random(0)
+    csv.field_size_limit(sys.maxsize)
+    with open(ROOT / "training-data" / "posts.csv", newline="", encoding="utf-8") as f:
+        texts = [row["Post"] for row in csv.DictReader(f) if row["Label"] == "0" and row["Post"]]
+    words = _first_column("t-and-s-words.csv")
+    # filler must not trip a checker on its own, or the expected labels would be wrong
+    matcher = TermMatcher(w.strip().lower() for w in words)
+    filler = [t[:200] for t in texts if "http" not in t and not matcher.search(t[:200].lower())]
+    with open(ROOT / "labeler-inputs" / "news-domains.csv", newline="", encoding="utf-8") as f:
+        by_source = {row["Source"].strip().lower(): row["Domain"].strip() for row in csv.DictReader(f)}
+    dog_dir = ROOT / "labeler-inputs" / "dog-list-images"
+    dogs = [(dog_dir / name).read_bytes() for name in sorted(os.listdir(dog_dir))]
+
+    for url, expected in load_test_urls():
+        parts = url.split("/")
+        did = "did:plc:" + hashlib.sha1(parts[-3].encode()).hexdigest()[:24]
+        text = rng.choice(filler)
+        for label in expected:
+            if label == "t-and-s":
+                text += f" {rng.choice(words)}"
+            elif label in by_source:
+                text += f" https://www.{by_source[label]}/2025/story.html"
+        record = {"$type": "app.bsky.feed.post", "text": text, "createdAt": "2025-04-01T00:00:00Z"}
+        if "dog" in expected:
+            data = rng.choice(dogs)
+            cid = fake_cid(data)
+            blobs[cid] = data
+            record["embed"] = {
+                "$type": "app.bsky.embed.images",
+                "images": [{"alt": "", "image": {"$type": "blob", "mimeType": "image/jpeg",
+                                                 "size": len(data), "ref": {"$link": cid}}}],
+            }
+        uri = f"at://{did}/app.bsky.feed.post/{parts[-1]}"
+        yield Fixture(url, uri, fake_cid(json.dumps(record).encode(), codec=0x71), record, expected)
+
+
+def load_fixtures():
+    """(fixtures, blobs by CID), recorded if available, synthesized otherwise."""
+    blobs: Dict[str, bytes] = {}
+    posts_file = FIXTURE_DIR / POSTS_FILE
+    if not posts_file.exists():
+        return list(synthesize(blobs)), blobs
+    with open(posts_file, encoding="utf-8") as f:
+        fixtures = [Fixture(**json.loads(line)) for line in f]
+    for path in (FIXTURE_DIR / BLOB_DIR).iterdir():
+        blobs[path.name] = path.read_bytes()
+    return fixtures, blobs
+
+
+class FakeClient:
+    """Serves get_post from fixtures, the way atproto's Client would."""
+
+    def __init__(self, fixtures: List[Fixture], base_url: str = ""):
+        self._base_url = base_url
+        self.calls = 0
+        self._by_key = {}
+        for fx in fixtures:
+            parts = fx.url.split("/")
+            self._by_key[(parts[-3], parts[-1])] = fx
+
+    def get_post(self, rkey: str, handle: str):
+        self.calls += 1
+        fx = self._by_key[(handle, rkey)]
+        record = models.get_or_create(fx.record, models.AppBskyFeedPost.Record, strict=False)
+        return models.AppBskyFeedPost.GetRecordResponse(uri=fx.uri, cid=fx.cid, value=record)
+
+
+class BlobServer:
+    """Local HTTP server answering com.atproto.sync.getBlob from a dict of blobs."""
+
+    def __init__(self, blobs: Dict[str, bytes]):
+        blobs_ = blobs
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                cid = parse_qs(urlparse(self.path).query).get("cid", [""])[0]
+                data = blobs_.get(cid)
+                self.send_response(200 if data is not None else 404)
+                self.send_header("Content-Length", str(len(data or b"")))
+                self.end_headers()
+                self.wfile.write(data or b"")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}/xrpc"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+
+
+def record(out_dir: Path = FIXTURE_DIR):
+    """Fetch every test post (and its image blobs) from the network into out_dir."""
+    import requests
+    from atproto import Client
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+    client = Client()
+    client.login(os.getenv("USERNAME"), os.getenv("PW"))
+    (out_dir / BLOB_DIR).mkdir(parents=True, exist_ok=True)
+    with open(out_dir / POSTS_FILE, "w", encoding="utf-8") as out:
+        for url, expected in load_test_urls():
+            parts = url.split("/")
+            resp = client.get_post(parts[-1], parts[-3])
+            rec = resp.value.model_dump(mode="json", by_alias=True, exclude_none=True)
+            did = resp.uri.split("/")[2]
+            for img in (rec.get("embed") or {}).get("images", []):
+                cid = img["image"]["ref"]["$link"]
+                blob = requests.get("https://bsky.social/xrpc/com.atproto.sync.getBlob",
+                                    params={"did": did, "cid": cid}, timeout=10)
+                blob.raise_for_status()
+                (out_dir / BLOB_DIR / cid).write_bytes(blob.content)
+            out.write(json.dumps(Fixture(url, resp.uri, resp.cid, rec, expected)._asdict()) + "\n")
+    print(f"Recorded fixtures to {out_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--record", action="store_true")
+    if parser.parse_args().record:
+        record()
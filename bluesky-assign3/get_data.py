@@ -1,5 +1,10 @@
 import os
 import csv
+import sys
+import json
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from atproto import Client
 from dotenv import load_dotenv
@@ -31,12 +36,202 @@ def has_mentions(post) -> bool:
     return False
 
 
+def classify(post) -> int:
+    record = getattr(post.post, 'record', None)
+    text = getattr(record, 'text', '')
+    labels = getattr(post.post, 'labels', [])
+    label_vals = [label.val for label in labels]
+
+    is_scam = (
+        has_scam_keywords(text) or
+        any(lbl in label_vals for lbl in ['!spam', '!scam']) or
+        reply_post(post) or 
+        quote_post(post) or 
+        has_mentions(post)
+    )
+    return 1 if is_scam else 0
+
+
+def feed_time(post) -> str:
+    """When a feed item entered the author's feed (a repost's time for reposts), as an ISO string."""
+    return getattr(getattr(post, 'reason', None), 'indexed_at', None) or post.post.indexed_at or ''
+
+
+class CrawlState:
+    """
+    Per-account feed cursors plus the set of post URIs already written.
+
+    The CSV is appended to page by page and the cursors are saved right
+    after each page, so a restarted crawl resumes where it stopped; a
+    page that was written but not checkpointed is re-fetched and its
+    rows are dropped as duplicates by URI. Each finished account also
+    keeps `since`, the feed time of the newest post it had, so a later
+    --append pass over it can stop once it reaches older posts.
+    """
+
+    def __init__(self, output_file: str, state_file: str):
+        self.output_file = output_file
+        self.state_file = state_file
+        self.lock = threading.Lock()
+        self.cursors = {}
+        if os.path.exists(state_file):
+            with open(state_file, encoding='utf-8') as f:
+                self.cursors = json.load(f)
+        self.seen = set()
+        new_file = not os.path.exists(output_file)
+        if not new_file:
+            csv.field_size_limit(sys.maxsize)
+            with open(output_file, newline='', encoding='utf-8') as f:
+                self.seen = {row['URI'] for row in csv.DictReader(f)}
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        self.out = open(output_file, mode='a', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.out)
+        if new_file:
+            self.writer.writerow(['URI', 'Account', 'Label', 'Post'])
+        self.written = 0
+
+    def done(self, account: str) -> bool:
+        return self.cursors.get(account, {}).get('done', False)
+
+    def cursor(self, account: str):
+        return self.cursors.get(account, {}).get('cursor')
+
+    def since(self, account: str):
+        return self.cursors.get(account, {}).get('since')
+
+    def write_page(self, account: str, rows, cursor, newest: str = '') -> None:
+        """Write one page of (uri, label, text) rows; a falsy cursor finishes the account's pass."""
+        with self.lock:
+            for uri, label, text in rows:
+                if uri in self.seen:
+                    continue
+                self.seen.add(uri)
+                self.writer.writerow([uri, account, label, text])
+                self.written += 1
+            self.out.flush()
+            entry = dict(self.cursors.get(account, {}))
+            entry['newest'] = max(entry.get('newest') or '', newest)
+            if cursor:
+                entry.update(cursor=cursor, done=False)
+            else:
+                since = max(entry.get('since') or '', entry.pop('newest'))
+                entry = {'cursor': None, 'done': True, 'since': since or None}
+            self.cursors[account] = entry
+            tmp = self.state_file + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.cursors, f)
+            os.replace(tmp, self.state_file)
+
+    def close(self) -> None:
+        self.out.close()
+
+
+def crawl_account(client: Client, account: str, state: CrawlState, revisit: bool = False) -> int:
+    """
+    Page through one account's feed, writing each page as it arrives.
+
+    An account already crawled is skipped, unless `revisit`: then its feed
+    is read again from the top until a page holds nothing newer than the
+    last pass saw.
+    """
+    since = state.since(account)
+    if state.done(account):
+        if not revisit:
+            print(f"\n Skipping {account} (already crawled)")
+            return 0
+        print(f"\n Checking {account} for posts since {since}")
+        cursor = None
+    else:
+        print(f"\n Fetching from: {account}")
+        cursor = state.cursor(account)
+    scams = 0
+    while True:
+        try:
+            response = client.app.bsky.feed.get_author_feed(
+                {'actor': account, 'cursor': cursor} if cursor else {'actor': account}
+            )
+        except Exception as e:
+            print(f"❌ Failed to fetch from {account}\n{e}")
+            return scams
+
+        posts = response.feed
+        cursor = getattr(response, 'cursor', None)
+        rows = []
+        for post in posts:
+            record = getattr(post.post, 'record', None)
+            label = classify(post)
+            scams += label
+            rows.append((post.post.uri, label, getattr(record, 'text', '')))
+        times = [feed_time(post) for post in posts]
+        # a page with nothing newer than the last pass reaches what it already has
+        # (one old post, e.g. a pinned one, does not end the pass)
+        if since is not None and all(t <= since for t in times):
+            cursor = None
+        state.write_page(account, rows, cursor if posts else None, max(times, default=''))
+
+        if not posts or not cursor:
+            return scams
+
+
+def crawl(client: Client, accounts, output_file: str, state_file: str, concurrency: int = 4,
+          append: bool = False, fresh: bool = False) -> int:
+    """
+    Crawl several accounts at once; returns the number of scam posts seen.
+
+    By default the output is replaced: the crawl is written to
+    <output>.partial (and <state>.partial), which are renamed over the
+    output and state files only once every account is done, so an
+    interrupted crawl leaves the previous output untouched. A rerun after
+    an interruption resumes from the .partial files; `fresh` discards them
+    and starts over. With `append`, new posts are added to the output in
+    place: interrupted accounts resume from their saved cursors and
+    finished ones are checked again for posts newer than the last pass.
+    """
+    accounts = list(accounts)
+    if append:
+        out_path, state_path = output_file, state_file
+    else:
+        out_path, state_path = output_file + '.partial', state_file + '.partial'
+        if fresh:
+            for path in (out_path, state_path):
+                if os.path.exists(path):
+                    os.remove(path)     # leftovers of an interrupted crawl, never the output itself
+        elif os.path.exists(state_path):
+            print(f"Resuming the interrupted crawl in {out_path} (--fresh to start over)")
+    state = CrawlState(out_path, state_path)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            scams = sum(pool.map(lambda a: crawl_account(client, a, state, revisit=append), accounts))
+    finally:
+        state.close()
+    unfinished = [account for account in accounts if not state.done(account)]
+    if unfinished:
+        # an account whose fetch failed midway: keep what there is to resume from
+        print(f"\n{len(unfinished)} account(s) not finished ({', '.join(unfinished)}); "
+              f"rerun to resume{'' if append else f', {output_file} is unchanged'}")
+    elif not append:
+        os.replace(out_path, output_file)
+        if os.path.exists(state_path):
+            os.replace(state_path, state_file)
+    print(f"\n  {scams} scam posts.")
+    print(f"Exported {state.written} {'new ' if append else ''}posts to {out_path if unfinished else output_file}")
+    return scams
+
+
 def main():
-    client = Client()
-    client.login(USERNAME, PW)
-    posts = []
-    matched_posts = []
-    legit_posts = []
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--accounts', type=str, default=None,
+                        help='file with one account handle per line (defaults to the built-in list)')
+    parser.add_argument('--output', type=str, default='training-data/posts.csv')
+    parser.add_argument('--state', type=str, default='training-data/crawl-state.json')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--append', action='store_true',
+                        help='add new posts to the existing output, resuming from the saved cursors '
+                             'and picking up posts newer than the last crawl, instead of replacing it')
+    parser.add_argument('--fresh', action='store_true',
+                        help='discard an interrupted crawl (the .partial files) instead of resuming it')
+    args = parser.parse_args()
+
     list_of_accounts=[
         'trader-fazal.bsky.social', 
         'hivefortune.bsky.social', 
@@ -46,80 +241,16 @@ def main():
         'technews.bsky.social',
         'someuser.bsky.social'
     ]
-    cursor = None
+    if args.accounts:
+        with open(args.accounts, encoding='utf-8') as f:
+            list_of_accounts = [line.strip() for line in f if line.strip()]
 
-    for account in list_of_accounts:
-        print(f"\n Fetching from: {account}")
-        cursor = None
-        while True:
-            try:
-                response = client.app.bsky.feed.get_author_feed(
-                    {'actor': account, 'cursor': cursor} if cursor else {'actor': account}
-                )
-            except Exception as e:
-                print(f"❌ Failed to fetch from {account}\n{e}")
-                break
-
-            posts = response.feed
-            cursor = getattr(response, 'cursor', None)
-            if not posts:
-                break
-
-            for post in posts:
-                record = getattr(post.post, 'record', None)
-                text = getattr(record, 'text', '')
-                labels = getattr(post.post, 'labels', [])
-                label_vals = [label.val for label in labels]
-
-                is_scam = (
-                    has_scam_keywords(text) or
-                    any(lbl in label_vals for lbl in ['!spam', '!scam']) or
-                    reply_post(post) or 
-                    quote_post(post) or 
-                    has_mentions(post)
-                )
-
-                if is_scam:
-                    matched_posts.append((
-                        post.post.uri,
-                        account,
-                        1,
-                        text
-                    ))
-                else:
-                    legit_posts.append((
-                        post.post.uri,
-                        account,
-                        0,
-                        text
-                    ))
-
-                # if has_scam_keywords(text) or any(lbl in label_vals for lbl in ['!spam', '!scam']) \
-                #    or reply_post(post) or quote_post(post) or has_mentions(post):
-                #     matched_posts.append((
-                #         post.post.uri,
-                #         account,
-                #         ','.join(label_vals),
-                #         text
-                #     ))
-
-            if not cursor:
-                break
-
-    
-    print(f"\n  {len(matched_posts)} scam posts.")
-
-
-# Exporting
-    os.makedirs('training-data', exist_ok=True)
-    output_file = 'training-data/posts.csv'
-    with open(output_file, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(['URI', 'Account', 'Label', 'Post'])  # <-- updated column name
-        for uri, account, label, text in matched_posts + legit_posts:
-            writer.writerow([uri, account, label, text])
-
-    print(f"Exported {len(matched_posts) + len(legit_posts)} posts to {output_file}")
+    client = Client()
+    client.login(USERNAME, PW)
+    if args.append and args.fresh:
+        parser.error('--fresh only applies without --append')
+    crawl(client, list_of_accounts, args.output, args.state, args.concurrency,
+          append=args.append, fresh=args.fresh)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,3 +1,36 @@
-"""Init file for module"""
-from .automated_labeler import *
-from .label import *
+"""Init file for module
+
+Names are resolved on first access, so `python -m pylabel.label` and other
+short-lived commands do not pay for the image and model dependencies of
+the automated labeler unless they use it.
+"""
+
+from importlib import import_module
+
+_EXPORTS = {
+    "AutomatedLabeler": "automated_labeler",
+    "ModerationResult": "automated_labeler",
+    "T_AND_S_LABEL": "automated_labeler",
+    "DOG_LABEL": "automated_labeler",
+    "THRESH": "automated_labeler",
+    "did_from_handle": "label",
+    "post_from_url": "label",
+    "label_event": "label",
+    "label_account": "label",
+    "label_post": "label",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
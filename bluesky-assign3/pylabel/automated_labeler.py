@@ -2,36 +2,112 @@
 
 
 from __future__ import annotations
-from typing import List, Set
-from atproto import Client, models
-from urllib.parse import urlparse
-import csv, re, os, requests, imagehash, string
-from PIL import Image
-from io import BytesIO
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+import asyncio, csv, hashlib, os, threading, time
+
+from .batch_hash import decode, phash_pixels, prepare
+from .blob_cache import HIT, MISS, SHARED, BlobHashCache
+from .cache import LRUCache
+from .dedup import NearDuplicateCache
+from .domain_index import DomainIndex
+from .hash_cache import hash_directory
+from .hash_pool import HashPool
+from .hash_index import HashIndex
+from .ledger import ModerationLedger
+from .metrics import NULL_METRICS, Metrics
+from .post_context import PostContext, repo_from_uri
+from .rate_limit import HostRateLimiter
+from .resolver import HandleResolver, default_resolver
+from .sessions import pooled_session
+from .stages import IMAGES, LINKS, TEXT, IncompleteModeration, Stage, run_cpu_stages, run_io_stages, run_stages
+from .term_matcher import TermMatcher
+from .text_features import TextFeatures
+
+if TYPE_CHECKING:
+    from atproto import Client
 
 T_AND_S_LABEL = "t-and-s"    
 DOG_LABEL      = "dog"
 THRESH         = 16          
+DOG_HASH_CACHE = "dog-list-hashes.npz"
+BLOB_XRPC      = "https://bsky.social/xrpc"
+POST_CACHE_SIZE = 10_000
+POST_CACHE_TTL  = 600.0     # seconds
+
+BLOB_CACHE_METRIC = {HIT: "cache_hits", MISS: "cache_misses", SHARED: "cache_coalesced"}
+
+# the rate limiter passed to moderate() for the post being moderated; stages
+# are called as check(post, features), so it reaches their requests this way
+_POST_LIMITER: ContextVar[Optional[HostRateLimiter]] = ContextVar("post_limiter", default=None)
+
+
+class ModerationResult(NamedTuple):
+    """
+    One finished post from moderate_posts. labels is None if the post
+    failed; if only some stages did, error is an IncompleteModeration and
+    labels are what the others found.
+    """
+    url: str
+    labels: Optional[List[str]]
+    error: Optional[BaseException] = None
+
 
 class AutomatedLabeler:
     """Automated labeler implementation """
 
-    def __init__(self, client: Client, input_dir: str):
+    def __init__(self, client: Client, input_dir: str, blob_cache_path: Optional[str] = None):
         self.client     = client
         self.input_dir  = input_dir
 
+        # network settings, overridable so the labeler can run against a local fake server
+        self.blob_base_url = BLOB_XRPC
+        self.rate_limiter: Optional[HostRateLimiter] = None
+        # resolves the author of a post whose URI names a handle rather than a DID
+        self.resolver: HandleResolver = default_resolver()
+
+        # per-stage timings and counters; assign a Metrics() to start collecting
+        self.metrics: Metrics = NULL_METRICS
+
+        # hydrated posts, keyed by at:// URI (handle form, as built from the web URL)
+        self.post_cache: LRUCache[str, PostContext] = LRUCache(POST_CACHE_SIZE, POST_CACHE_TTL)
+
+        # blob fetches share one keep-alive pool; pHashes are remembered by CID,
+        # also across restarts in a SQLite file if blob_cache_path is given
+        self.session = pooled_session()
+        self.blob_hashes = BlobHashCache(blob_cache_path)
+        # optional process pool for decode + pHash; see enable_hash_pool()
+        self.hash_pool: Optional[HashPool] = None
+
         # Milestone 3 (cite your sources)
         self.news_domain_map = self._load_domain_map("news-domains.csv")
+        self.news_index = DomainIndex(self.news_domain_map.items())
 
         #  Milestone 4 (dog image detector)
         dog_img_dir = os.path.join(input_dir, "dog-list-images")
         self.dog_hashes = self._load_dog_hashes(dog_img_dir)
+        self.dog_index = HashIndex(self.dog_hashes)
 
         # Milestone 2
 
         self.ts_domains = self._load_simple_list("t-and-s-domains.csv","Domain")
+        self.ts_domain_index = DomainIndex((d, T_AND_S_LABEL) for d in self.ts_domains)
 
         self.ts_words = self._load_simple_list("t-and-s-words.csv", "Word")
+        self.ts_matcher = TermMatcher(self.ts_words)
+
+        # checker stages, run cheapest first by moderate(); see register()
+        self.stages: List[Stage] = self._default_stages()
+        self._io_pool: Optional[ThreadPoolExecutor] = None
+        self._io_pool_lock = threading.Lock()
+
+        # optional near-duplicate cache in front of the stages; see enable_dedup()
+        self.dedup: Optional[NearDuplicateCache] = None
+
+        # optional persistent record of finished posts; see enable_ledger()
+        self.ledger: Optional[ModerationLedger] = None
+        self._rule_version: Optional[int] = None
 
     # helper functions
     def _load_domain_map(self, csv_name: str) -> dict[str, str]:
@@ -62,105 +138,146 @@ class AutomatedLabeler:
         return items
 
     def _load_dog_hashes(self, directory: str):
-        #Compute perceptual hashes for every reference dog image
-        hashes = []
-        for fname in os.listdir(directory):
-            if fname.lower().endswith((".jpg", ".jpeg", ".png")):
-                try:
-                    im = Image.open(os.path.join(directory, fname)).convert("RGB").resize((256, 256))
-                    hashes.append(imagehash.phash(im))
-                except Exception as e:
-                    print(f"[dog‑loader] could not hash {fname}: {e}")
+        #Compute perceptual hashes for every reference dog image, reusing the on-disk cache
+        cache_path = os.path.join(self.input_dir, DOG_HASH_CACHE)
+        _names, hashes = hash_directory(directory, cache_path)
         return hashes
 
-    def _post_from_url(self, url: str):
+    def _throttle(self, url: str, rate_limiter: Optional[HostRateLimiter] = None) -> None:
+        limiter = rate_limiter or _POST_LIMITER.get() or self.rate_limiter
+        if limiter is not None:
+            limiter.acquire(url)
+
+    def _client_url(self) -> str:
+        return getattr(self.client, "_base_url", None) or BLOB_XRPC
+
+    def _post_from_url(self, url: str, rate_limiter: Optional[HostRateLimiter] = None):
         parts  = url.split("/")
         rkey   = parts[-1]
         handle = parts[-3]
+        self._throttle(self._client_url(), rate_limiter)
         return self.client.get_post(rkey, handle)
 
-    #Milestone 2 - T&S
-
-    def _ts_labels(self,text:str) -> Set(str):
-
-        text_lc = text.lower()
-
-        tokens = {tok.strip(string.punctuation).lower() for tok in text_lc.split()}
-
-        for term in self.ts_words:
-
-            if " " in term or "&" in term:
-
-                if term in text_lc:
-
-                    return {T_AND_S_LABEL}
-            
-            elif term in tokens:
+    def hydrate(self, url: str, rate_limiter: Optional[HostRateLimiter] = None) -> PostContext:
+        """
+        Fetch the post behind a web URL once; repeat calls are served from post_cache.
+        The fetch is throttled by `rate_limiter` if given, else the labeler's own.
+        """
+        key = self._web_to_at_uri(url)
+        post = self.post_cache.get(key)
+        if post is None:
+            self.metrics.inc("cache_misses", cache="post")
+            with self.metrics.timer("get_post"):
+                post = PostContext.from_get_record(url, self._post_from_url(url, rate_limiter))
+            self.post_cache.put(key, post)
+        else:
+            self.metrics.inc("cache_hits", cache="post")
+        return post
 
-                return {T_AND_S_LABEL}
+    #Milestone 2 - T&S
 
-        for link in re.findall(r'https?://[^\s]+', text_lc, flags=re.I):
+    def _ts_labels(self, text: str, features: Optional[TextFeatures] = None) -> Set[str]:
 
-            domain = urlparse(link).netloc.lower()
+        features = features or TextFeatures(text)
 
-            if domain.startswith("www."):
+        if self.ts_matcher.search_tokens(features.text_lc, features.tokens):
 
-                domain = domain[4:]
+            return {T_AND_S_LABEL}
 
-            domain = domain.rstrip("/")
+        for link in features.links:
 
-            if any(domain == d or domain.endswith("." + d) for d in self.ts_domains):
+            if self.ts_domain_index.lookup_parts(link.host, link.segments) is not None:
 
                 return {T_AND_S_LABEL}
             
         return set()
 
     #  Milestone 3  – Cite
-    def _cite_labels(self, text: str) -> Set[str]:
+    def _cite_labels(self, text: str, features: Optional[TextFeatures] = None) -> Set[str]:
 
+        features = features or TextFeatures(text)
         labels: Set[str] = set()
-        for link in re.findall(r'https?://[^\s]+', text, flags=re.I):
-            host = urlparse(link.lower()).netloc
-            if host.startswith("www."):
-                host = host[4:]
-            if host in self.news_domain_map:
-                labels.add(self.news_domain_map[host])
+        for link in features.links:
+            source = self.news_index.lookup_parts(link.host, link.segments)
+            if source is not None:
+                labels.add(source)
         return labels
 
     #   Milestone 4  – Dogs
-    def _extract_image_urls(self, post: models.AppBskyFeedDefs.FeedViewPost) -> List[str]:
-        urls = []
-        embed = getattr(post.record, "embed", None)
-        if isinstance(embed, models.AppBskyEmbedImages.Main):
-            for img in embed.images:
-                did = post.author.did
-                cid = img.image.ref.link
-                urls.append(f"https://bsky.social/xrpc/com.atproto.sync.getBlob?did={did}&cid={cid}")
-        return urls
-
-    def _is_dog_image(self, url: str) -> bool:
-        try:
-            resp = requests.get(url, timeout=5)
+    def _blob_url(self, did: str, cid: str) -> str:
+        return f"{self.blob_base_url}/com.atproto.sync.getBlob?did={did}&cid={cid}"
+
+    def _image_hash(self, did: str, cid: str) -> int:
+        """pHash of a blob, downloaded only the first time its CID is seen (once, however many posts ask)."""
+        h, source = self.blob_hashes.get_or_compute(cid, lambda: self._fetch_image_hash(did, cid))
+        self.metrics.inc(BLOB_CACHE_METRIC[source], cache="blob")
+        return h
+
+    def _fetch_image_hash(self, did: str, cid: str) -> int:
+        metrics = self.metrics
+        url = self._blob_url(did, cid)
+        self._throttle(url)
+        with metrics.timer("blob_fetch"):
+            resp = self.session.get(url, timeout=5)
             resp.raise_for_status()
-            im   = Image.open(BytesIO(resp.content)).convert("RGB").resize((256, 256))
-            h    = imagehash.phash(im)
-            return any((h - dh) <= THRESH for dh in self.dog_hashes)
+        if self.hash_pool is not None:
+            # waits without the GIL, so text-only posts keep moving meanwhile
+            with metrics.timer("hash_pool"):
+                h = self.hash_pool.hash(resp.content)
+        else:
+            with metrics.timer("image_decode"):
+                pixels = prepare(decode(resp.content))
+            with metrics.timer("phash"):
+                h = int(phash_pixels(pixels[None])[0])
+        return h
+
+    def _is_dog_image(self, did: str, cid: str) -> bool:
+        try:
+            h = self._image_hash(did, cid)
         except Exception:
-            return False
-
-    def _dog_labels(self, web_post_url: str) -> Set[str]:
-        """Return {'dog'} if attached image matches reference set."""
-        labels: Set[str] = set()
+            # once per failed image, whichever step raised: the throttle and the
+            # cache lookup have no timer of their own to count it
+            self.metrics.inc("errors", stage="image_hash")
+            raise
+        with self.metrics.timer("dog_index"):
+            return self.dog_index.any_within(h, THRESH)
+
+    def _author_did(self, post: PostContext) -> Optional[str]:
+        """The DID blobs are fetched from, resolving the handle of a handle-form URI."""
+        if post.author_did:
+            return post.author_did
+        handle = repo_from_uri(post.uri)
+        if not handle:
+            return None
         try:
-            at_uri = self._web_to_at_uri(web_post_url)
-            post   = self.client.app.bsky.feed.get_post_thread({"uri": at_uri}).thread.post
-            for img_url in self._extract_image_urls(post):
-                if self._is_dog_image(img_url):
-                    labels.add(DOG_LABEL)
-                    break
+            return self.resolver.resolve(handle)
         except Exception as e:
-            print(f"[dog‑checker] failed on {web_post_url}: {e}")
-        return labels
+            self.metrics.inc("errors", stage="resolve_handle")
+            print(f"[dog‑checker] could not resolve {handle}: {e}")
+            return None
+
+    def _dog_labels(self, post: PostContext) -> Set[str]:
+        """
+        Return {'dog'} if attached image matches reference set. Raises if
+        no image matched but one could not be checked, since the answer is
+        then unknown rather than "no dog".
+        """
+        if not post.image_cids:
+            return set()
+        did = self._author_did(post)
+        if not did:
+            return set()
+        error: Optional[Exception] = None
+        for cid in post.image_cids:
+            try:
+                if self._is_dog_image(did, cid):
+                    return {DOG_LABEL}
+            except Exception as e:
+                print(f"[dog‑checker] failed on {post.url}: {e}")
+                error = error or e
+        if error is not None:
+            raise error
+        return set()
 
     @staticmethod
     def _web_to_at_uri(url: str) -> str:
@@ -168,24 +285,280 @@ class AutomatedLabeler:
         handle, post_id = parts[4], parts[6]
         return f"at://{handle}/app.bsky.feed.post/{post_id}"
 
-    def moderate_post(self, url: str) -> List[str]:
-        """Return a list of labels that apply to the post (runs all checks)."""
-        labels: Set[str] = set()
-
-        #  milestone 2 (t&s) , 3 (cite) 
-
-        resp = self._post_from_url(url)
-        if resp and resp.value and resp.value.text:
-            text = resp.value.text
-
-            labels.update(self._ts_labels(text))
-
-            labels.update(self._cite_labels(text))
-
-        #milestone 4 - dogs
-        if DOG_LABEL not in labels:                    
-            labels.update(self._dog_labels(url))
-
-        # ---------- milestone 2 (T&S) would slot in here ---------------------
+    def moderate_post(self, url: str, rate_limiter: Optional[HostRateLimiter] = None) -> List[str]:
+        """
+        Return a list of labels that apply to the post (runs all checks).
+
+        The post is hydrated first (served from post_cache if fetched
+        recently) so that, with a ledger, it is looked up by URI + CID like
+        any other: a record rewritten in place since is moderated again.
+        `rate_limiter`, if given, throttles this post's requests instead of
+        the labeler's own.
+        """
+        with self.metrics.timer("moderate_post"):
+            return self.moderate(self.hydrate(url, rate_limiter), rate_limiter)
+
+    def moderate(self, post: PostContext, rate_limiter: Optional[HostRateLimiter] = None) -> List[str]:
+        """
+        Run all checks on an already hydrated post (e.g. one decoded from the firehose).
+
+        Raises IncompleteModeration, carrying the labels the other stages
+        found, if a stage failed; such a result is neither cached nor
+        recorded in the ledger, so the post is moderated again next time.
+        `rate_limiter`, if given, throttles the stages' requests instead of
+        the labeler's own.
+        """
+        token = _POST_LIMITER.set(rate_limiter)
+        try:
+            return self._moderate_once(post)
+        finally:
+            _POST_LIMITER.reset(token)
+
+    def _moderate_once(self, post: PostContext) -> List[str]:
+        """moderate() without the limiter: the ledger lookup, then the stages."""
+        ledger = self.ledger
+        if ledger is None:
+            return self._moderate(post)
+        entry = ledger.get(post.uri, post.cid)
+        if entry is not None and entry.version == self.rule_version():
+            self.metrics.inc("ledger_hits")
+            return list(entry.labels)
+        self.metrics.inc("ledger_misses")
+        labels = self._moderate(post)     # raises, before recording, if incomplete
+        ledger.record(post.uri, post.cid, labels, self.rule_version(), post.url)
+        return labels
 
+    def _stage_pool(self) -> Optional[ThreadPoolExecutor]:
+        """The pool that overlaps the I/O stages, created once more than one is registered."""
+        if self._io_pool is None:
+            io_stages = sum(stage.io for stage in self.stages)
+            if io_stages > 1:
+                with self._io_pool_lock:
+                    if self._io_pool is None:
+                        self._io_pool = ThreadPoolExecutor(max_workers=io_stages, thread_name_prefix="stage")
+        return self._io_pool
+
+    def _moderate(self, post: PostContext) -> List[str]:
+        io_pool = self._stage_pool()
+        dedup = self.dedup
+        if dedup is None:
+            return list(run_stages(post, self.stages, io_pool, self.metrics))
+
+        # an exact copy of a moderated post reuses all of its labels; a near
+        # copy only those of the network stages, and only when they would
+        # really go to the network. Hits and misses are timed end to end, so
+        # what the cache saves is their measured difference.
+        metrics = self.metrics
+        start = time.perf_counter()
+        features = TextFeatures.from_post(post)
+        key = dedup.key(post, features)
+        cached = dedup.get(key)
+        if cached is not None:
+            metrics.inc("dedup_hits", kind="exact")
+            metrics.observe("dedup_hit", time.perf_counter() - start)
+            return list(cached)
+        errors: Dict[str, BaseException] = {}
+        labels, io_stages = run_cpu_stages(post, self.stages, features, metrics, errors)
+        fp = None
+        if io_stages:
+            fp = dedup.fingerprint(post, features, key)
+            if self._io_pending(post, io_stages):
+                with metrics.timer("dedup_lookup"):
+                    io_labels = dedup.lookup_near(fp)
+                if io_labels is not None and not errors:
+                    labels |= io_labels
+                    dedup.store(key, labels, io_labels)
+                    metrics.inc("dedup_hits", kind="near")
+                    metrics.observe("dedup_hit", time.perf_counter() - start)
+                    return list(labels)
+        metrics.inc("dedup_misses")
+        io_labels = run_io_stages(post, io_stages, features, io_pool, metrics, errors)
+        labels |= io_labels
+        if errors:
+            raise IncompleteModeration(labels, errors)
+        dedup.store(key, labels, io_labels, fp)
+        metrics.observe("dedup_miss", time.perf_counter() - start)
         return list(labels)
+
+    def _io_pending(self, post: PostContext, io_stages: List[Stage]) -> bool:
+        """Whether running `io_stages` would go to the network (the dog check only does for unhashed blobs)."""
+        if any(stage.name != "dog_labels" for stage in io_stages):
+            return True
+        return any(self.blob_hashes.get(cid) is None for cid in post.image_cids)
+
+    def enable_dedup(self, **kwargs) -> NearDuplicateCache:
+        """Put a NearDuplicateCache (kwargs are its thresholds and limits) in front of the stages."""
+        self.dedup = NearDuplicateCache(**kwargs)
+        return self.dedup
+
+    def enable_hash_pool(self, processes: Optional[int] = None) -> HashPool:
+        """Decode and pHash blobs in `processes` worker processes (default: one per core)."""
+        self.hash_pool = HashPool(processes, metrics=self.metrics)
+        return self.hash_pool
+
+    def enable_ledger(self, path: str, **kwargs) -> ModerationLedger:
+        """Record finished posts in a ModerationLedger at `path` and skip those already recorded."""
+        self.ledger = ModerationLedger(path, **kwargs)
+        self._rule_version = None
+        return self.ledger
+
+    def rule_versions(self) -> dict:
+        """What decides a post's labels: each stage's version and a digest of every input list."""
+        inputs = {}
+        for name in ("news-domains.csv", "t-and-s-domains.csv", "t-and-s-words.csv"):
+            with open(os.path.join(self.input_dir, name), "rb") as f:
+                inputs[name] = hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+        inputs["dog-list-images"] = hashlib.blake2b(self.dog_hashes.tobytes(), digest_size=16).hexdigest()
+        return {"stages": {stage.name: stage.version for stage in self.stages}, "inputs": inputs}
+
+    def rule_version(self) -> int:
+        """The ledger id of the current rule_versions(), recomputed after register/unregister."""
+        if self._rule_version is None:
+            self._rule_version = self.ledger.version_id(self.rule_versions())
+        return self._rule_version
+
+    def post_ref(self, url: str) -> PostContext:
+        """The post at `url` for emission (its URI and CID), from post_cache after moderate_post."""
+        return self.hydrate(url)
+
+    def close(self) -> None:
+        """Release what the labeler owns: the stage thread pool, hash pool, ledger and blob cache."""
+        with self._io_pool_lock:
+            if self._io_pool is not None:
+                self._io_pool.shutdown()
+                self._io_pool = None
+        if self.hash_pool is not None:
+            self.hash_pool.close()
+        if self.ledger is not None:
+            self.ledger.close()
+        self.blob_hashes.close()
+
+    def __enter__(self) -> "AutomatedLabeler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    #  Checker registry
+
+    def _default_stages(self) -> List[Stage]:
+        # costs are rough per-post microseconds from benchmarks/bench_suite.py
+        return [
+            # milestone 2 (t&s): words in the text, domains in its links
+            Stage("ts_labels", lambda post, features: self._ts_labels(post.text, features),
+                  inputs=frozenset({TEXT}), labels=frozenset({T_AND_S_LABEL}), cost=40.0),
+            # milestone 3 (cite): any number of news sources
+            Stage("cite_labels", lambda post, features: self._cite_labels(post.text, features),
+                  inputs=frozenset({LINKS}), cost=5.0),
+            # milestone 4 (dogs): blob fetch, only for posts with an images embed
+            Stage("dog_labels", lambda post, features: self._dog_labels(post), inputs=frozenset({IMAGES}),
+                  labels=frozenset({DOG_LABEL}), cost=25_000.0, io=True),
+        ]
+
+    def register(self, stage: Stage) -> None:
+        """Add a checker stage, replacing any registered stage of the same name."""
+        self.stages = [s for s in self.stages if s.name != stage.name] + [stage]
+        self._rule_version = None
+
+    def unregister(self, name: str) -> None:
+        self.stages = [s for s in self.stages if s.name != name]
+        self._rule_version = None
+
+    #  Batch / async entry points
+
+    async def amoderate_post(self, url: str) -> List[str]:
+        """Async moderate_post: runs the blocking checks in a worker thread."""
+        return await asyncio.to_thread(self.moderate_post, url)
+
+    def _start_moderate(self, loop: asyncio.AbstractEventLoop, url: str,
+                        rate_limiter: Optional[HostRateLimiter] = None) -> asyncio.Future:
+        """Run moderate_post(url, rate_limiter) on a thread of its own; the future settles on `loop`."""
+        fut = loop.create_future()
+
+        def settle(result, error) -> None:
+            if fut.done():          # timed out and abandoned
+                return
+            if error is not None:
+                fut.set_exception(error)
+            else:
+                fut.set_result(result)
+
+        def target() -> None:
+            result, error = None, None
+            try:
+                result = self.moderate_post(url, rate_limiter)
+            except Exception as e:
+                error = e
+            try:
+                loop.call_soon_threadsafe(settle, result, error)
+            except RuntimeError:
+                pass                # the batch finished (and its loop closed) first
+
+        threading.Thread(target=target, name="moderate", daemon=True).start()
+        return fut
+
+    async def amoderate_posts(
+        self,
+        urls: Iterable[str],
+        concurrency: int = 16,
+        timeout: Optional[float] = 30.0,
+        rate_limits: Optional[Dict[str, float]] = None,
+    ) -> AsyncIterator[ModerationResult]:
+        """
+        Moderate many posts concurrently, yielding each result as soon as it finishes.
+
+        At most `concurrency` posts are in flight, so `urls` can be an
+        arbitrarily long iterator. Each post runs on a thread of its own
+        that starts when the post is taken, so `timeout` counts only its
+        own running time. A post that takes longer is reported with a
+        TimeoutError and its thread is abandoned (left to finish in the
+        background) without holding up a slot. `rate_limits` maps host ->
+        requests per second for the outgoing XRPC and blob calls of this
+        batch; its limiter is handed to each post, so other batches running
+        at the same time keep theirs (or the labeler's own rate_limiter).
+        """
+        loop = asyncio.get_running_loop()
+        limiter = HostRateLimiter(rate_limits) if rate_limits is not None else None
+
+        async def run(url: str) -> ModerationResult:
+            try:
+                moderated = self._start_moderate(loop, url, limiter)
+                return ModerationResult(url, await asyncio.wait_for(moderated, timeout))
+            except asyncio.TimeoutError as e:
+                self.metrics.inc("timeouts", stage="moderate_post")
+                return ModerationResult(url, None, e)
+            except IncompleteModeration as e:
+                return ModerationResult(url, sorted(e.labels), e)
+            except Exception as e:
+                return ModerationResult(url, None, e)
+
+        url_iter = iter(urls)
+        pending: Set[asyncio.Task] = set()
+        try:
+            while True:
+                for url in url_iter:
+                    pending.add(asyncio.ensure_future(run(url)))
+                    if len(pending) >= concurrency:
+                        break
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def moderate_posts(self, urls: Iterable[str], **kwargs) -> Iterator[ModerationResult]:
+        """Synchronous wrapper around amoderate_posts for scripts like test_labeler.py."""
+        loop = asyncio.new_event_loop()
+        results = self.amoderate_posts(urls, **kwargs)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.close()
@@ -0,0 +1,125 @@
+"CID-keyed cache of image pHashes"
+
+from __future__ import annotations
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+import os, sqlite3, threading, time
+
+from .cache import LRUCache
+
+MEMORY_SIZE = 100_000
+DISK_SIZE   = 10_000_000
+TRIM_EVERY  = 1024
+
+_SIGN = 1 << 63
+
+HIT, MISS, SHARED = "hit", "miss", "shared"
+
+
+def _to_signed(h: int) -> int:
+    # SQLite integers are signed 64-bit
+    return h - (1 << 64) if h >= _SIGN else h
+
+
+def _to_unsigned(h: int) -> int:
+    return h + (1 << 64) if h < 0 else h
+
+
+class BlobHashCache:
+    """
+    Remembers the pHash of every image blob by CID.
+
+    A CID names immutable content, so a hash never goes stale and entries
+    only leave the cache through eviction. The memory tier is an LRU; the
+    optional SQLite tier at `path` survives restarts and drops its least
+    recently used rows once it holds more than `disk_size` entries.
+    Concurrent get_or_compute misses on the same CID share one computation.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_size: int = MEMORY_SIZE,
+                 disk_size: int = DISK_SIZE):
+        self.memory: LRUCache[str, int] = LRUCache(memory_size)
+        self.disk_size = disk_size
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS blob_hashes "
+                "(cid TEXT PRIMARY KEY, phash INTEGER NOT NULL, used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS blob_hashes_used ON blob_hashes(used)")
+
+    def get(self, cid: str) -> Optional[int]:
+        h = self.memory.get(cid)
+        if h is not None or self._db is None:
+            return h
+        with self._lock:
+            row = self._db.execute("SELECT phash FROM blob_hashes WHERE cid = ?", (cid,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE blob_hashes SET used = ? WHERE cid = ?", (time.time(), cid))
+        h = _to_unsigned(row[0])
+        self.memory.put(cid, h)
+        return h
+
+    def put(self, cid: str, h: int) -> None:
+        self.memory.put(cid, h)
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO blob_hashes (cid, phash, used) VALUES (?, ?, ?)",
+                (cid, _to_signed(h), time.time()),
+            )
+            self._puts += 1
+            # trim in batches so the COUNT(*) and eviction are amortized over many inserts
+            if self._puts % TRIM_EVERY == 0:
+                (count,) = self._db.execute("SELECT COUNT(*) FROM blob_hashes").fetchone()
+                if count > self.disk_size:
+                    self._db.execute(
+                        "DELETE FROM blob_hashes WHERE cid IN "
+                        "(SELECT cid FROM blob_hashes ORDER BY used LIMIT ?)",
+                        (count - self.disk_size,),
+                    )
+
+    def get_or_compute(self, cid: str, compute: Callable[[], int]) -> Tuple[int, str]:
+        """
+        The hash of `cid` and where it came from: HIT if cached, MISS if this
+        call ran compute() (and stored the result), SHARED if it waited on
+        another thread's compute() for the same CID. A failed compute() is
+        not cached; it raises in every caller waiting on it.
+        """
+        h = self.get(cid)
+        if h is not None:
+            return h, HIT
+
+        with self._inflight_lock:
+            fut = self._inflight.get(cid)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[cid] = Future()
+        if not owner:
+            return fut.result(), SHARED
+
+        try:
+            h = compute()
+            self.put(cid, h)
+            fut.set_result(h)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(cid, None)
+        return h, MISS
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
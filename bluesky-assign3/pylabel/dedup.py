@@ -0,0 +1,210 @@
+"Near-duplicate cache that reuses labels across copies of the same post"
+
+from __future__ import annotations
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+import hashlib, string, threading, time
+import numpy as np
+
+from .text_features import TextFeatures
+
+MAX_ENTRIES  = 100_000
+TTL          = 3600.0       # seconds a moderated post stays reusable
+THRESHOLD    = 0.8          # Jaccard similarity of the word sets
+NUM_PERM     = 64           # MinHash signature length
+BANDS        = 16           # LSH bands of NUM_PERM // BANDS rows each
+MIN_TOKENS   = 8            # shorter texts only match exactly
+
+_PUNCT = string.punctuation
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_SEEDS = np.random.default_rng(0x5EED).integers(0, 2**63, size=NUM_PERM, dtype=np.uint64)
+
+
+class Fingerprint(NamedTuple):
+    key: bytes                  # the exact key, see NearDuplicateCache.key()
+    signature: np.ndarray       # MinHash of the word set, uint32[num_perm]
+    words: FrozenSet[str]
+    links: Tuple[Tuple[str, Tuple[str, ...]], ...]
+    images: int
+
+
+class Entry(NamedTuple):
+    labels: FrozenSet[str]      # every label the post got
+    io_labels: FrozenSet[str]   # the part the network stages found
+    fingerprint: Optional[Fingerprint]      # set if indexed for near lookups
+    stored: float
+
+
+def words(features: TextFeatures) -> List[str]:
+    """The post's distinct words minus links and mentions (which vary per copy), sorted."""
+    found = {tok.strip(_PUNCT) for tok in features.text_lc.split()
+             if tok[0] != "@" and "://" not in tok}
+    found.discard("")
+    return sorted(found)
+
+
+def _word_hashes(words: List[str]) -> np.ndarray:
+    # blake2b rather than hash(), which is randomized per process
+    digests = b"".join(hashlib.blake2b(w.encode(), digest_size=8).digest() for w in words)
+    return np.frombuffer(digests, dtype=np.uint64)
+
+
+def minhash(words: List[str], num_perm: int = NUM_PERM) -> np.ndarray:
+    """
+    MinHash signature of a set of distinct words; the fraction of equal
+    rows estimates Jaccard similarity. The same words give the same
+    signature in every process.
+    """
+    if not words:
+        return np.zeros(num_perm, dtype=np.uint32)
+    base = _word_hashes(words)[:, None]
+    # a multiply-xorshift mix per seed stands in for num_perm random permutations
+    x = (base ^ _SEEDS[None, :num_perm]) * _MIX
+    x ^= x >> np.uint64(32)
+    return x.min(axis=0).astype(np.uint32)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    union = len(a | b)
+    return len(a & b) / union if union else 1.0
+
+
+class NearDuplicateCache:
+    """
+    Remembers the labels of recently moderated posts by content.
+
+    Spam waves repost the same text and links with the image uploaded
+    again (a new CID each time), so the cache works on the text and links
+    and takes the images as equal when their number is:
+
+    - an exact copy (same text up to case and whitespace, same link URLs
+      in the same order, as many images) reuses the whole label set, and
+      nothing is checked again;
+    - a near copy (word sets with a Jaccard similarity of at least
+      `threshold`, the same links, as many images) reuses only the labels
+      of the network stages: its text differs, so the text stages run on
+      it, but its image fetches are skipped. Links are never fuzzy-matched
+      because the cite and T&S domain rules depend on them.
+
+    Exact lookups cost one hash of the text. Near lookups go through an
+    LSH index over MinHash signatures: with the default 16 bands of 4 rows,
+    a post at similarity 0.8 shares a band with its match with probability
+    above 0.999; the signature only finds candidates, whose actual word
+    sets are then checked against the threshold. (SimHash was too noisy
+    here: one substituted word in a 20-word post moves it by 4-17 bits.)
+    At most `max_entries` posts are kept (least recently used are
+    dropped), each for at most `ttl` seconds.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL,
+                 threshold: float = THRESHOLD, num_perm: int = NUM_PERM,
+                 bands: int = BANDS, min_tokens: int = MIN_TOKENS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        if not 0 < num_perm <= NUM_PERM or num_perm % bands:
+            raise ValueError(f"num_perm must be a multiple of bands and at most {NUM_PERM}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.rows = num_perm // bands
+        self.min_tokens = min_tokens
+        self.clock = clock
+        self._entries: "OrderedDict[bytes, Entry]" = OrderedDict()
+        self._bands: List[Dict[bytes, Set[bytes]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(post, features: TextFeatures) -> bytes:
+        """The exact key: a digest of the normalized text, the link URLs and the number of images."""
+        text = " ".join(features.text_lc.split())
+        urls = tuple(link.url for link in features.links)
+        return hashlib.blake2b(repr((text, urls, len(post.image_cids))).encode(), digest_size=16).digest()
+
+    def fingerprint(self, post, features: TextFeatures, key: Optional[bytes] = None) -> Fingerprint:
+        """What near lookups compare; costs a MinHash of the words, so only taken when it can pay off."""
+        tokens = words(features)
+        links = tuple(sorted({(link.host, link.segments) for link in features.links}))
+        return Fingerprint(key or self.key(post, features), minhash(tokens, self.num_perm),
+                           frozenset(tokens), links, len(post.image_cids))
+
+    def _band_keys(self, signature: np.ndarray):
+        rows = self.rows
+        for i in range(len(self._bands)):
+            yield i, signature[i * rows:(i + 1) * rows].tobytes()
+
+    def _drop(self, key: bytes) -> None:
+        entry = self._entries.pop(key)
+        if entry.fingerprint is None:
+            return
+        for i, band in self._band_keys(entry.fingerprint.signature):
+            bucket = self._bands[i].get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._bands[i][band]
+
+    def _live(self, key: bytes, now: float) -> Optional[Entry]:
+        entry = self._entries.get(key)
+        if entry is not None and now - entry.stored >= self.ttl:
+            self._drop(key)
+            return None
+        return entry
+
+    def get(self, key: bytes) -> Optional[FrozenSet[str]]:
+        """Every label of a stored exact copy, if there is one."""
+        now = self.clock()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry.labels
+
+    def lookup_near(self, fp: Fingerprint) -> Optional[FrozenSet[str]]:
+        """The network-stage labels of the most similar stored near copy, if any is similar enough."""
+        if len(fp.words) < self.min_tokens:
+            return None
+        now = self.clock()
+        with self._lock:
+            candidates: Set[bytes] = set()
+            for i, band in self._band_keys(fp.signature):
+                candidates.update(self._bands[i].get(band, ()))
+            best, best_key, best_entry = self.threshold, None, None
+            for key in candidates:
+                entry = self._live(key, now)
+                if entry is None or entry.fingerprint.links != fp.links or entry.fingerprint.images != fp.images:
+                    continue
+                similarity = jaccard(fp.words, entry.fingerprint.words)
+                if similarity >= best:
+                    best, best_key, best_entry = similarity, key, entry
+            if best_entry is None:
+                return None
+            self._entries.move_to_end(best_key)
+            return best_entry.io_labels
+
+    def store(self, key: bytes, labels: Set[str], io_labels: Set[str] = frozenset(),
+              fp: Optional[Fingerprint] = None) -> None:
+        """
+        Remember the labels a complete moderation produced for this post;
+        with its fingerprint it is also found by near lookups.
+        """
+        if fp is not None and len(fp.words) < self.min_tokens:
+            fp = None
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = Entry(frozenset(labels), frozenset(io_labels), fp, self.clock())
+            if fp is not None:
+                for i, band in self._band_keys(fp.signature):
+                    self._bands[i].setdefault(band, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            for band in self._bands:
+                band.clear()
@@ -0,0 +1,80 @@
+"Domain index shared by the T&S and cite checkers"
+
+from __future__ import annotations
+from typing import Dict, Generic, Iterable, List, Optional, Tuple, TypeVar
+from urllib.parse import urlparse
+
+V = TypeVar("V")
+
+
+def normalize_entry(entry: str) -> str:
+    """Turn a list entry like 'www.tspa.org' or 'github.com/org/repo/' into 'host[/path]'."""
+    entry = entry.strip().lower()
+    if "://" in entry:
+        entry = entry.split("://", 1)[1]
+    if entry.startswith("www."):
+        entry = entry[4:]
+    return entry.strip("/")
+
+
+def split_url(url: str) -> Tuple[str, List[str]]:
+    """Return the normalized host and the non-empty path segments of a link."""
+    parsed = urlparse(url.strip().lower())
+    host = (parsed.hostname or "").rstrip(".")
+    if host.startswith("www."):
+        host = host[4:]
+    segments = [seg for seg in parsed.path.split("/") if seg]
+    return host, segments
+
+
+class DomainIndex(Generic[V]):
+    """
+    Maps domains (optionally with a path prefix) to values.
+
+    A link matches an entry if its host is the entry's host or a subdomain of
+    it, and its path starts with the entry's path segments. Entries are kept
+    in a hash map keyed on 'host[/path]', and a lookup probes each host suffix
+    and path prefix of the link, so the cost depends on how deep the URL is
+    and not on how many domains are loaded. The most specific entry wins.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, V]] = ()):
+        self._entries: Dict[str, V] = {}
+        self._max_path_depth = 0
+        for entry, value in entries:
+            self.add(entry, value)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, entry: str, value: V) -> None:
+        key = normalize_entry(entry)
+        if not key:
+            return
+        depth = key.count("/")
+        self._max_path_depth = max(self._max_path_depth, depth)
+        self._entries[key] = value
+
+    def lookup_parts(self, host: str, segments: List[str]) -> Optional[V]:
+        if not host:
+            return None
+        entries = self._entries
+        labels = host.split(".")
+        depth = min(len(segments), self._max_path_depth)
+        for i in range(len(labels)):
+            suffix = ".".join(labels[i:]) if i else host
+            for d in range(depth, 0, -1):
+                value = entries.get(suffix + "/" + "/".join(segments[:d]))
+                if value is not None:
+                    return value
+            value = entries.get(suffix)
+            if value is not None:
+                return value
+        return None
+
+    def lookup(self, url: str) -> Optional[V]:
+        """Value of the most specific entry matching the link, or None."""
+        return self.lookup_parts(*split_url(url))
+
+    def __contains__(self, url: str) -> bool:
+        return self.lookup(url) is not None
@@ -0,0 +1,182 @@
+"Batched, deduplicated, retrying label emission"
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional, Set, Tuple
+import random, threading, time
+
+from atproto import Client
+from atproto_client.exceptions import RequestErrorBase
+from atproto_client.models.com.atproto.admin.defs import RepoRef
+from atproto_client.models.com.atproto.repo.strong_ref import Main
+
+from .cache import LRUCache
+from .label import label_event
+from .metrics import NULL_METRICS, Metrics
+
+if TYPE_CHECKING:
+    from .ledger import ModerationLedger
+
+MAX_BATCH   = 100
+MAX_DELAY   = 1.0           # seconds a label may wait in the queue
+MAX_RETRIES = 5
+BACKOFF     = 0.5           # first retry delay, doubled on every attempt
+EMITTED_MEMORY = 1_000_000  # subjects whose emitted labels are remembered
+
+# a post is identified by (uri, cid), so an edited record (new CID) is a new
+# subject and its labels are emitted for it; an account by (did, "")
+SubjectKey = Tuple[str, str]
+
+
+def _retryable(e: Exception) -> Tuple[bool, Optional[float]]:
+    """Whether a failed emit is worth retrying, and the server's Retry-After if any."""
+    if not isinstance(e, RequestErrorBase):
+        return False, None
+    resp = e.response
+    if resp is None:
+        return True, None           # transport error, no response at all
+    if resp.status_code != 429 and resp.status_code < 500:
+        return False, None
+    retry_after = (resp.headers or {}).get("retry-after") or (resp.headers or {}).get("Retry-After")
+    try:
+        return True, float(retry_after) if retry_after else None
+    except ValueError:
+        return True, None
+
+
+class LabelEmitter:
+    """
+    Queues labels and emits them to Ozone in batches.
+
+    Labels for the same subject are merged while queued, and a label
+    already emitted (or being sent right now) for a subject is skipped,
+    so repeated moderation of a post costs nothing. A post's subject is
+    its URI + CID: each (uri, cid, label) is emitted once. Posts are referenced
+    by the URI/CID the caller already has (e.g. a PostContext), never
+    refetched. The queue is
+    flushed when it holds `max_batch` subjects or its oldest entry is
+    `max_delay` seconds old. Failed emits are retried with exponential
+    backoff on 429, 5xx and network errors. With a `ledger`, what was
+    emitted for each post (URI + CID) is also recorded there, after every
+    flush, so a restarted run does not emit it again.
+
+        with LabelEmitter(labeler_client, client.me.did) as emitter:
+            emitter.label_post(post, labels)
+    """
+
+    def __init__(self, labeler_client: Client, created_by: str, max_batch: int = MAX_BATCH,
+                 max_delay: float = MAX_DELAY, max_retries: int = MAX_RETRIES,
+                 backoff: float = BACKOFF, sleep: Callable[[float], None] = time.sleep,
+                 metrics: Metrics = NULL_METRICS, ledger: Optional[ModerationLedger] = None):
+        self.labeler_client = labeler_client
+        self.created_by = created_by
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self.metrics = metrics
+        self.ledger = ledger
+        self.sent = 0
+        self.failed = 0
+        # subject key -> labels emitted for it
+        self.emitted: LRUCache[SubjectKey, frozenset] = LRUCache(EMITTED_MEMORY)
+        # subject key -> (subject ref, labels waiting to be sent)
+        self._pending: Dict[SubjectKey, Tuple[object, Set[str]]] = {}
+        # subject key -> labels a flush has taken from _pending and is sending
+        self._inflight: Dict[SubjectKey, Set[str]] = {}
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer = threading.Thread(target=self._run_timer, daemon=True)
+        self._timer.start()
+
+    def __enter__(self) -> "LabelEmitter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _submit(self, key: SubjectKey, subject, labels: Iterable[str]) -> None:
+        with self._lock:
+            new = set(labels) - (self.emitted.get(key) or frozenset()) - self._inflight.get(key, set())
+            if not new:
+                self.metrics.inc("emit_deduplicated")
+                return
+            entry = self._pending.get(key)
+            self._pending[key] = (subject, (entry[1] if entry else set()) | new)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self.flush()
+
+    def label_post(self, post, labels: Iterable[str]) -> None:
+        """Queue labels for a post; `post` is anything with `uri` and `cid` (e.g. a PostContext)."""
+        key = (post.uri, post.cid)
+        if self.ledger is not None and self.emitted.get(key) is None:
+            entry = self.ledger.get(post.uri, post.cid)
+            if entry is not None and entry.emitted:
+                self.emitted.put(key, entry.emitted)
+        self._submit(key, Main(cid=post.cid, uri=post.uri), labels)
+
+    def label_account(self, did: str, labels: Iterable[str]) -> None:
+        self._submit((did, ""), RepoRef(did=did), labels)
+
+    def _send(self, subject, labels: Set[str]) -> bool:
+        data = label_event(self.created_by, subject, sorted(labels))
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.metrics.timer("emit"):
+                    self.labeler_client.tools.ozone.moderation.emit_event(data)
+                return True
+            except Exception as e:
+                retry, retry_after = _retryable(e)
+                if not retry or attempt == self.max_retries:
+                    print(f"[emitter] giving up on {labels} after {attempt + 1} attempt(s): {e}")
+                    return False
+                self.metrics.inc("emit_retries")
+                delay = self.backoff * (2 ** attempt)
+                self.sleep(retry_after if retry_after is not None else delay * random.uniform(0.5, 1.0))
+        return False
+
+    def flush(self) -> None:
+        """Send everything queued so far."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending, self._oldest = self._pending, {}, None
+                for key, (_subject, labels) in batch.items():
+                    self._inflight[key] = labels
+            for key, (subject, labels) in batch.items():
+                already = self.emitted.get(key) or frozenset()
+                labels = labels - already
+                sent = not labels or self._send(subject, labels)
+                with self._lock:
+                    # a submit sees either the labels in flight or the emitted ones, never neither
+                    if sent and labels:
+                        self.emitted.put(key, already | labels)
+                    del self._inflight[key]
+                if not labels:
+                    continue
+                if sent:
+                    self.sent += 1
+                    self.metrics.inc("emitted")
+                    if self.ledger is not None and isinstance(subject, Main):
+                        self.ledger.mark_emitted(subject.uri, subject.cid, already | labels)
+                else:
+                    self.failed += 1
+                    self.metrics.inc("emit_failures")
+            if self.ledger is not None:
+                self.ledger.flush()
+
+    def _run_timer(self) -> None:
+        while not self._stop.wait(min(self.max_delay, 0.1) or 0.1):
+            oldest = self._oldest
+            if oldest is not None and time.monotonic() - oldest >= self.max_delay:
+                self.flush()
+
+    def close(self) -> None:
+        """Stop the timer and flush whatever is still queued."""
+        self._stop.set()
+        self._timer.join()
+        self.flush()
@@ -0,0 +1,87 @@
+"Dependency-free scorer for the exported scam classifier"
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import hashlib, json, math, re
+
+DEFAULT_ARTIFACT_DIR = Path(__file__).resolve().parent.parent / "models" / "scam-classifier"
+SCORING_FILE = "scoring.json"
+
+# sklearn's default token_pattern; with greedy matching \b\w\w+\b finds the
+# same maximal word runs as \w{2,}, which the re engine matches faster
+SKLEARN_TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+FAST_TOKEN_PATTERN = r"\w{2,}"
+
+
+class FastScamScorer:
+    """
+    Reproduces PolicyProposalClassifier's decision function with the stdlib only.
+
+    For a TF-IDF row with l2 normalization the logistic-regression score is
+
+        sum(count_t * idf_t * coef_t) / sqrt(sum((count_t * idf_t) ** 2)) + intercept
+
+    so scoring a post needs one tokenizer pass and a dict lookup per token,
+    against a table of token -> (idf * coef, idf) exported with the model.
+    """
+
+    def __init__(self, table: Dict[str, Any], digest: Optional[str] = None):
+        # what the labeler's rule version records for this model; load() sets it from the file
+        self.digest = digest
+        self.lowercase: bool = table["lowercase"]
+        self.classes: List[Any] = table["classes"]
+        self.intercept: float = table["intercept"]
+        # token -> (idf * coef, idf ** 2)
+        self.weights: Dict[str, Tuple[float, float]] = {
+            term: (w, idf * idf) for term, (w, idf) in table["weights"].items()
+        }
+        pattern = table["token_pattern"]
+        if pattern == SKLEARN_TOKEN_PATTERN:
+            pattern = FAST_TOKEN_PATTERN
+        self._findall = re.compile(pattern).findall
+        # TextFeatures.terms are exactly this model's tokens, so they can be scored directly
+        self.accepts_terms = self.lowercase and pattern == FAST_TOKEN_PATTERN
+
+    @classmethod
+    def load(cls, artifact_dir: Union[str, Path] = DEFAULT_ARTIFACT_DIR) -> "FastScamScorer":
+        data = (Path(artifact_dir) / SCORING_FILE).read_bytes()
+        return cls(json.loads(data.decode("utf-8")), hashlib.blake2b(data, digest_size=16).hexdigest())
+
+    def decision_function(self, text: str) -> float:
+        if self.lowercase:
+            text = text.lower()
+        return self.decision_terms(self._findall(text))
+
+    def decision_terms(self, terms: Iterable[str]) -> float:
+        """decision_function for text that has already been tokenized."""
+        get = self.weights.get
+        counts: Dict[str, int] = {}
+        for tok in terms:
+            if get(tok) is not None:
+                counts[tok] = counts.get(tok, 0) + 1
+        if not counts:
+            return self.intercept
+        dot = norm = 0.0
+        for tok, n in counts.items():
+            w, idf2 = get(tok)
+            dot += n * w
+            norm += n * n * idf2
+        return dot / math.sqrt(norm) + self.intercept
+
+    def predict_proba(self, text: str) -> float:
+        """P(scam), the positive-class probability sklearn's predict_proba reports."""
+        return self._sigmoid(self.decision_function(text))
+
+    def predict_proba_terms(self, terms: Iterable[str]) -> float:
+        return self._sigmoid(self.decision_terms(terms))
+
+    @staticmethod
+    def _sigmoid(z: float) -> float:
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
+
+    def predict(self, text: str) -> Any:
+        return self.classes[1] if self.decision_function(text) > 0 else self.classes[0]
@@ -0,0 +1,146 @@
+"On-disk cache of perceptual hashes for the reference image library"
+
+from __future__ import annotations
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import hashlib, os
+import numpy as np
+
+from .batch_hash import BATCH, decode, phash_blobs, phash_pixels, prepare
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+CACHE_VERSION = 3
+
+
+class CacheEntry(NamedTuple):
+    size: int
+    mtime_ns: int
+    inode: int
+    digest: bytes
+    phash: int
+
+
+def hash_image_bytes(data: bytes) -> int:
+    """pHash of an encoded image, computed the same way as the live dog checker."""
+    return int(phash_pixels(prepare(decode(data))[None])[0])
+
+
+def content_digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _file_key(st: os.stat_result) -> Tuple[int, int, int]:
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def load_arrays(path: str) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Read a cache file written by save_cache as its parallel arrays (names,
+    sizes, mtimes, inodes, digests, hashes), or
+    None if it is missing, unreadable or from another cache version.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != CACHE_VERSION:
+                return None
+            return {k: data[k] for k in data.files}
+    except Exception as e:
+        print(f"[dog‑loader] ignoring unreadable hash cache {path}: {e}")
+        return None
+
+
+def load_cache(path: str) -> Dict[str, CacheEntry]:
+    """
+    Read a cache file written by save_cache as entries by file name.
+
+    The file is a plain .npz of parallel arrays, so build steps can also
+    np.load it directly.
+    """
+    arrays = load_arrays(path)
+    if arrays is None:
+        return {}
+    columns = [arrays[k].tolist() for k in ("sizes", "mtimes", "inodes", "digests", "hashes")]
+    return {name: CacheEntry(*row) for name, row in zip(arrays["names"].tolist(), zip(*columns))}
+
+
+def save_cache(path: str, entries: Dict[str, CacheEntry]) -> None:
+    names = sorted(entries)
+    # per-process temp file, so workers starting together never write over each other
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(
+            f,
+            version=np.int64(CACHE_VERSION),
+            names=np.array(names, dtype=str),
+            sizes=np.array([entries[n].size for n in names], dtype=np.int64),
+            mtimes=np.array([entries[n].mtime_ns for n in names], dtype=np.int64),
+            inodes=np.array([entries[n].inode for n in names], dtype=np.uint64),
+            digests=np.array([entries[n].digest for n in names], dtype="V16"),
+            hashes=np.array([entries[n].phash for n in names], dtype=np.uint64),
+        )
+    os.replace(tmp, path)
+
+
+def hash_directory(directory: str, cache_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return (names, hashes) for every image in directory, reusing the cache.
+
+    Every image is stat'ed on each call (an image rewritten in place does
+    not reliably change the directory's mtime, so that is not trusted).
+    Files whose size, mtime and inode are unchanged are not opened; files
+    that were touched but whose content digest still matches reuse their
+    stored hash; only new or modified images are decoded and hashed.
+    """
+    cached = load_cache(cache_path)
+    current: Dict[str, CacheEntry] = {}
+    dirty = False
+
+    with os.scandir(directory) as it:
+        files = sorted(
+            (e for e in it if e.is_file() and e.name.lower().endswith(IMAGE_EXTS)),
+            key=lambda e: e.name,
+        )
+    todo: List[Tuple[str, os.stat_result, bytes, bytes]] = []
+
+    def flush() -> None:
+        hashes = phash_blobs([data for _name, _st, _digest, data in todo])
+        for (name, st, digest, _data), phash in zip(todo, hashes):
+            if phash is None:
+                print(f"[dog‑loader] could not hash {name}")
+                continue
+            current[name] = CacheEntry(*_file_key(st), digest, phash)
+        todo.clear()
+
+    for entry in files:
+        st = entry.stat()
+        old = cached.get(entry.name)
+        if old and old[:3] == _file_key(st):
+            current[entry.name] = old
+            continue
+        dirty = True
+        try:
+            with open(entry.path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            print(f"[dog‑loader] could not read {entry.name}: {e}")
+            continue
+        digest = content_digest(data)
+        if old and old.digest == digest:
+            current[entry.name] = CacheEntry(*_file_key(st), digest, old.phash)
+            continue
+        todo.append((entry.name, st, digest, data))
+        if len(todo) >= BATCH:
+            flush()
+    if todo:
+        flush()
+
+    if dirty or current.keys() != cached.keys():
+        try:
+            save_cache(cache_path, current)
+        except OSError as e:
+            print(f"[dog‑loader] could not write hash cache {cache_path}: {e}")
+
+    names = sorted(current)
+    hashes = np.array([current[n].phash for n in names], dtype=np.uint64)
+    return np.array(names, dtype=str), hashes
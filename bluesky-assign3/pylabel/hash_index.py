@@ -0,0 +1,185 @@
+"Hamming-space index for perceptual image hashes"
+
+from __future__ import annotations
+from functools import lru_cache
+from itertools import combinations
+from typing import Iterable, List, Optional, Tuple, Union
+import numpy as np
+import imagehash
+
+HashLike = Union[imagehash.ImageHash, int]
+
+# scan in blocks so "anything within r bits" can stop at the first hit
+BLOCK = 1 << 16
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        return np.bitwise_count(x, out=out)
+else:
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(x: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        counts = _BYTE_COUNTS[x.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+        if out is None:
+            return counts
+        out[...] = counts
+        return out
+
+
+def hash_to_int(h: HashLike) -> int:
+    """Pack a 64-bit ImageHash into an int (ints pass through unchanged)."""
+    if isinstance(h, imagehash.ImageHash):
+        return int.from_bytes(np.packbits(h.hash.flatten()).tobytes(), "big")
+    return int(h)
+
+
+# multi-index hashing: the 64 bits split into CHUNKS substrings of CHUNK_BITS
+CHUNKS     = 4
+CHUNK_BITS = 64 // CHUNKS
+# below this many hashes a plain scan beats probing the tables (measured
+# on uniformly random hashes, the worst case for the index)
+MIN_INDEXED = 1 << 19
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(lo: int, hi: int) -> np.ndarray:
+    """Every CHUNK_BITS-bit mask with lo..hi bits set."""
+    masks = [sum(1 << i for i in bits)
+             for weight in range(lo, hi + 1) for bits in combinations(range(CHUNK_BITS), weight)]
+    return np.array(masks, dtype=np.int64)
+
+
+class HashIndex:
+    """
+    Reference hashes packed into a uint64 array, with a multi-index on top.
+
+    Distances are XOR + popcount, exactly what ImageHash's subtraction
+    gives. Small sets are scanned linearly. Larger ones are also split into
+    CHUNKS 16-bit substrings, each with a table of the hashes sorted by
+    that substring. Probing substring c at flip weight w visits the
+    buckets exactly w bits from the probe's substring; doing that in the
+    order (c, w) = (0, 0), (1, 0), ..., (CHUNKS - 1, 0), (0, 1), ... means
+    that after step s every hash within s bits has been visited (if all
+    substrings differ by more than their probed weight, the total
+    distance exceeds s). So any_within(h, r) verifies only the buckets of
+    steps 0..r, and nearest() stops once the k-th best is within s.
+    """
+
+    def __init__(self, hashes: Iterable[HashLike] = ()):
+        if isinstance(hashes, np.ndarray):
+            self._hashes = hashes.astype(np.uint64, copy=False)
+        else:
+            self._hashes = np.fromiter((hash_to_int(h) for h in hashes), dtype=np.uint64)
+        self._tables: Optional[List[Tuple[np.ndarray, np.ndarray, np.ndarray]]] = None
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    @property
+    def hashes(self) -> np.ndarray:
+        return self._hashes
+
+    def add(self, hashes: Iterable[HashLike]) -> None:
+        new = np.fromiter((hash_to_int(h) for h in hashes), dtype=np.uint64)
+        self._hashes = np.concatenate([self._hashes, new])
+        self._tables = None
+
+    def _index(self) -> Optional[List[Tuple[np.ndarray, np.ndarray, np.ndarray]]]:
+        # per substring: bucket offsets, the hashes in bucket order, and their positions
+        if self._tables is None and len(self._hashes) >= MIN_INDEXED:
+            tables = []
+            for c in range(CHUNKS):
+                keys = ((self._hashes >> np.uint64(c * CHUNK_BITS)) & np.uint64(0xFFFF)).astype(np.int64)
+                order = np.argsort(keys, kind="stable")
+                offsets = np.searchsorted(keys[order], np.arange((1 << CHUNK_BITS) + 1))
+                tables.append((offsets, self._hashes[order], order))
+            self._tables = tables
+        return self._tables
+
+    def _probe(self, probe: int, chunk: int, lo: int, hi: int) -> np.ndarray:
+        """Offsets into chunk's sorted table of the hashes whose substring is lo..hi bits from the probe's."""
+        offsets = self._tables[chunk][0]
+        buckets = ((probe >> (chunk * CHUNK_BITS)) & 0xFFFF) ^ _flip_masks(lo, hi)
+        starts = offsets[buckets]
+        lens = offsets[buckets + 1] - starts
+        total = int(lens.sum())
+        return np.repeat(starts - (np.cumsum(lens) - lens), lens) + np.arange(total)
+
+    def distances(self, h: HashLike) -> np.ndarray:
+        """Hamming distance from h to every reference hash."""
+        return _popcount(self._hashes ^ np.uint64(hash_to_int(h)))
+
+    def any_within(self, h: HashLike, radius: int) -> bool:
+        """True if any reference hash is within `radius` bits of h."""
+        probe = hash_to_int(h)
+        if self._index() is None:
+            return self._scan_within(probe, radius)
+        target = np.uint64(probe)
+        # weight 0 in every substring first (cheap, and catches close copies),
+        # then every remaining step up to `radius` at once per substring
+        rounds = [(c, 0, 0) for c in range(min(CHUNKS, radius + 1))]
+        rounds += [(c, 1, (radius - c) // CHUNKS) for c in range(CHUNKS) if radius - c >= CHUNKS]
+        for chunk, lo, hi in rounds:
+            found = self._tables[chunk][1][self._probe(probe, chunk, lo, hi)]
+            if (_popcount(found ^ target) <= radius).any():
+                return True
+        return False
+
+    def _scan_within(self, probe: int, radius: int) -> bool:
+        probe = np.uint64(probe)
+        xored = np.empty(min(BLOCK, len(self._hashes)), dtype=np.uint64)
+        counts = np.empty(len(xored), dtype=np.uint8)
+        for start in range(0, len(self._hashes), BLOCK):
+            block = self._hashes[start:start + BLOCK]
+            n = len(block)
+            np.bitwise_xor(block, probe, out=xored[:n])
+            if (_popcount(xored[:n], out=counts[:n]) <= radius).any():
+                return True
+        return False
+
+    def nearest(self, h: HashLike, k: int = 1) -> List[Tuple[int, int]]:
+        """The k closest reference hashes as (index, distance), closest first."""
+        if not len(self._hashes) or k <= 0:
+            return []
+        k = min(k, len(self._hashes))
+        probe = hash_to_int(h)
+        if self._index() is not None:
+            target = np.uint64(probe)
+            # candidates bucketed by distance; only those within `step` are ever deduplicated
+            by_dist: List[List[np.ndarray]] = [[] for _ in range(65)]
+            seen = 0
+            for step in range(4 * (CHUNK_BITS + 1)):
+                chunk, weight = step % CHUNKS, step // CHUNKS
+                _offsets, sorted_hashes, order = self._tables[chunk]
+                idx = self._probe(probe, chunk, weight, weight)
+                if len(idx):
+                    seen += len(idx)
+                    dist = _popcount(sorted_hashes[idx] ^ target)
+                    ranked = np.argsort(dist, kind="stable")
+                    bounds = np.cumsum(np.bincount(dist, minlength=65))
+                    for d, part in enumerate(np.split(order[idx][ranked], bounds[:-1])):
+                        if len(part):
+                            by_dist[d].append(part)
+                # every hash within `step` bits has now been seen
+                if step < 65:
+                    found, count = [], 0
+                    for d in range(step + 1):
+                        if by_dist[d]:
+                            near = np.unique(np.concatenate(by_dist[d]))
+                            found.append((d, near))
+                            count += len(near)
+                    if count >= k:
+                        out = [(int(i), d) for d, near in found for i in near]
+                        return out[:k]
+                if seen > len(self._hashes) // 4:
+                    break                   # the probe is far from everything; scan instead
+        return self._scan_nearest(probe, k)
+
+    def _scan_nearest(self, probe: int, k: int) -> List[Tuple[int, int]]:
+        dist = self.distances(probe)
+        # distances only take 65 values, so find the cutoff from a histogram
+        # instead of partitioning the whole array
+        cutoff = int(np.searchsorted(np.cumsum(np.bincount(dist, minlength=65)), k))
+        idx = np.flatnonzero(dist <= cutoff)
+        idx = idx[np.argsort(dist[idx], kind="stable")][:k]
+        return [(int(i), int(dist[i])) for i in idx]
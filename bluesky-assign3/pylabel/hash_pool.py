@@ -0,0 +1,124 @@
+"Process pool that decodes and pHashes image blobs off the calling process's GIL"
+
+from __future__ import annotations
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional
+import os, threading
+
+from .batch_hash import decode, phash_pixels, prepare
+from .metrics import NULL_METRICS, Metrics
+
+HASH_TIMEOUT = 30.0         # seconds hash() waits for a worker
+
+
+def _warm() -> None:
+    # pay for the scipy import when the worker starts, not on its first blob
+    from scipy.fftpack import dct  # noqa: F401
+
+
+def _hash_shared(name: str, size: int) -> int:
+    """Worker side: pHash the `size` encoded bytes in shared memory block `name`."""
+    # spawned workers share the parent's resource tracker, which unlinks
+    # the block if the parent dies before release() does
+    shm = SharedMemory(name=name)
+    try:
+        view = shm.buf[:size]
+        try:
+            pixels = prepare(decode(view))
+        finally:
+            view.release()
+        return int(phash_pixels(pixels[None])[0])
+    finally:
+        shm.close()
+
+
+class HashPool:
+    """
+    Decodes and pHashes image blobs in worker processes.
+
+    The blob's bytes are copied into a shared memory block and only its
+    name crosses the process boundary, so nothing is pickled but the
+    resulting hash. The caller blocks (or awaits the future) without
+    holding the GIL, so other threads keep running while the decode
+    saturates spare cores. `processes` defaults to the number of cores.
+
+    hash() gives up after `timeout` seconds. If a worker dies (the pool is
+    then broken for every caller), the pool is rebuilt, counted in
+    `restarts` and the `hash_pool_restarts` metric, and the blob is tried
+    once more; a blob that breaks the fresh pool as well is reported as
+    an error rather than decoded in this process, which it could crash
+    the same way.
+    """
+
+    def __init__(self, processes: Optional[int] = None, timeout: float = HASH_TIMEOUT,
+                 metrics: Metrics = NULL_METRICS):
+        self.processes = processes or os.cpu_count() or 1
+        self.timeout = timeout
+        self.metrics = metrics
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._pool = self._new_pool()
+
+    def __enter__(self) -> "HashPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(self.processes, mp_context=get_context("spawn"), initializer=_warm)
+
+    def _rebuild(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is not broken:
+                return                  # another caller already replaced it
+            self._pool = self._new_pool()
+            self.restarts += 1
+        self.metrics.inc("hash_pool_restarts")
+        broken.shutdown(wait=False)
+
+    def submit(self, data: bytes) -> Future:
+        """A future for the uint64 pHash of an encoded image (as an int)."""
+        return self._submit(self._pool, data)
+
+    def _submit(self, pool: ProcessPoolExecutor, data: bytes) -> Future:
+        shm = SharedMemory(create=True, size=max(len(data), 1))
+        shm.buf[:len(data)] = data
+        try:
+            fut = pool.submit(_hash_shared, shm.name, len(data))
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+
+        def release(_fut: Future) -> None:
+            shm.close()
+            shm.unlink()
+
+        fut.add_done_callback(release)
+        return fut
+
+    def hash(self, data: bytes) -> int:
+        """The pHash of an encoded image; raises TimeoutError after `timeout` seconds."""
+        try:
+            return self._hash_once(data)
+        except BrokenProcessPool:
+            # a worker died, possibly on another caller's blob: once more on the fresh pool
+            return self._hash_once(data)
+
+    def _hash_once(self, data: bytes) -> int:
+        pool = self._pool
+        try:
+            return self._submit(pool, data).result(self.timeout)
+        except BrokenProcessPool:
+            self._rebuild(pool)
+            raise
+        except FutureTimeoutError:
+            self.metrics.inc("timeouts", stage="hash_pool")
+            raise
+
+    def close(self) -> None:
+        self._pool.shutdown()
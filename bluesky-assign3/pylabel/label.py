@@ -1,18 +1,34 @@
 """Command-line tool for labeling posts and accounts on Bluesky"""
 
+from __future__ import annotations
+
 import argparse
 import os
-from typing import List
+import warnings
+from typing import TYPE_CHECKING, List
+
+from .resolver import default_resolver
+
+# atproto costs over a second to import, so it is loaded by the functions
+# that build requests rather than by `import pylabel.label`
+if TYPE_CHECKING:
+    from atproto import Client
+
+# module attributes that used to be read from .env at import time
+_DEPRECATED_ENV = ("USERNAME", "PW")
 
-import requests
-from atproto import Client, models
-from atproto_client.models.com.atproto.admin.defs import RepoRef
-from atproto_client.models.com.atproto.repo.strong_ref import Main
-from dotenv import load_dotenv
 
-load_dotenv(override=True)
-USERNAME = os.getenv("USERNAME")
-PW = os.getenv("PW")
+def __getattr__(name: str):
+    if name in _DEPRECATED_ENV:
+        warnings.warn(
+            f"pylabel.label.{name} is deprecated; load .env and read os.getenv({name!r}) instead",
+            DeprecationWarning, stacklevel=2)
+        from dotenv import load_dotenv
+
+        load_dotenv(override=True)
+        return os.getenv(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def did_from_handle(handle: str):
     """
@@ -25,11 +41,11 @@ def did_from_handle(handle: str):
         str: The DID associated with the input handle.
     """
     # via: https://github.com/skygaze-ai/atproto-101
-    return requests.get(
-        "https://bsky.social/xrpc/com.atproto.identity.resolveHandle",
-        params={"handle": handle},
-        timeout=10,
-    ).json()["did"]
+    # resolved through the shared, cached resolver so repeat lookups cost no request
+    did = default_resolver().resolve(handle)
+    if did is None:
+        raise KeyError(f"could not resolve handle {handle}")
+    return did
 
 
 def post_from_url(client: Client, url: str):
@@ -42,40 +58,54 @@ def post_from_url(client: Client, url: str):
     return client.get_post(rkey, handle)
 
 
-def label_account(client: Client, handle: str, label_value: List[str]):
+def label_event(created_by: str, subject, label_value: List[str]):
     """
-    Apply a label to an account with the specified handle
+    Build the Ozone emitEvent payload that applies labels to a subject
+    (a RepoRef for accounts or a strong ref for posts).
     """
-    did = did_from_handle(handle)
-    data = models.ToolsOzoneModerationEmitEvent.Data(
-        created_by=client.me.did,
+    from atproto import models
+
+    return models.ToolsOzoneModerationEmitEvent.Data(
+        created_by=created_by,
         event=models.ToolsOzoneModerationDefs.ModEventLabel(
             create_label_vals=label_value,
             negate_label_vals=[],
         ),
-        subject=RepoRef(did=did),
+        subject=subject,
         subject_blob_cids=[],
     )
+
+
+def label_account(client: Client, handle: str, label_value: List[str]):
+    """
+    Apply a label to an account with the specified handle
+    """
+    from atproto_client.models.com.atproto.admin.defs import RepoRef
+
+    did = did_from_handle(handle)
+    data = label_event(client.me.did, RepoRef(did=did), label_value)
     return client.tools.ozone.moderation.emit_event(data)
 
 
 def label_post(
-    client: Client, labeler_client: Client, post_url: str, label_value: List[str]
+    client: Client,
+    labeler_client: Client,
+    post_url: str,
+    label_value: List[str],
+    post=None,
 ):
     """
     Apply a label to a post with the specified URL
+
+    `post` may be an already hydrated PostContext (or any object with `uri`
+    and `cid`), which skips fetching the post again.
     """
-    post = post_from_url(client, post_url)
+    from atproto_client.models.com.atproto.repo.strong_ref import Main
+
+    if post is None:
+        post = post_from_url(client, post_url)
     post_ref = Main(cid=post.cid, uri=post.uri)
-    data = models.ToolsOzoneModerationEmitEvent.Data(
-        created_by=client.me.did,
-        event=models.ToolsOzoneModerationDefs.ModEventLabel(
-            create_label_vals=label_value,
-            negate_label_vals=[],
-        ),
-        subject=post_ref,
-        subject_blob_cids=[],
-    )
+    data = label_event(client.me.did, post_ref, label_value)
     return labeler_client.tools.ozone.moderation.emit_event(data)
 
 
@@ -83,9 +113,14 @@ def main():
     """
     Main function for command-line tool.
     """
+    from atproto import Client
+    from dotenv import load_dotenv
+
+    load_dotenv(override=True)
+    username, password = os.getenv("USERNAME"), os.getenv("PW")
     client = Client()
-    client.login(USERNAME, PW)
-    did = did_from_handle(USERNAME)
+    client.login(username, password)
+    did = did_from_handle(username)
     labeler_client = client.with_proxy("atproto_labeler", did)
     parser = argparse.ArgumentParser()
     parser.add_argument("label_target", type=str)
@@ -0,0 +1,204 @@
+"Persistent record of what has been moderated and emitted, keyed by post URI + CID"
+
+from __future__ import annotations
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+import hashlib, json, os, sqlite3, threading, time
+
+BATCH_SIZE = 1000           # rows buffered before a write transaction
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS versions "
+    "(id INTEGER PRIMARY KEY, digest TEXT NOT NULL UNIQUE, detail TEXT NOT NULL)",
+    # version is NULL for posts that were only emitted, never moderated here
+    "CREATE TABLE IF NOT EXISTS moderations "
+    "(uri TEXT NOT NULL, cid TEXT NOT NULL, url TEXT, labels TEXT NOT NULL, "
+    "version INTEGER, moderated REAL, emitted TEXT, emitted_at REAL, "
+    "PRIMARY KEY (uri, cid)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS moderations_url ON moderations(url, moderated) WHERE url IS NOT NULL",
+)
+
+
+def _encode(labels: Iterable[str]) -> str:
+    return json.dumps(sorted(labels))
+
+
+def _decode(labels: Optional[str]) -> FrozenSet[str]:
+    return frozenset(json.loads(labels)) if labels else frozenset()
+
+
+class LedgerEntry(NamedTuple):
+    uri: str
+    cid: str
+    url: Optional[str]
+    labels: FrozenSet[str]
+    version: Optional[int]
+    emitted: FrozenSet[str]     # labels already sent to Ozone for this URI + CID
+
+
+class ModerationLedger:
+    """
+    SQLite ledger of moderated posts.
+
+    Each row is one exact record version (URI + CID) with the labels it
+    got, the id of the rule version that computed them (see version_id),
+    and the labels already emitted for it. A labeler consults it before
+    fetching or checking a post and an emitter before sending, so a
+    restarted batch only redoes posts whose CID or rule version changed.
+
+    Writes are buffered and committed `batch_size` rows at a time (and on
+    flush/close); reads see the buffer, so a crash loses at most one
+    unflushed batch. Lookups go through the (uri, cid) primary key or the
+    url index, and stay flat at millions of rows.
+    """
+
+    def __init__(self, path: str, batch_size: int = BATCH_SIZE):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.batch_size = batch_size
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        # (uri, cid) -> row waiting to be written, and emission marks likewise
+        self._rows: Dict[Tuple[str, str], tuple] = {}
+        self._emits: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._urls: Dict[str, Tuple[str, str]] = {}
+
+    def __enter__(self) -> "ModerationLedger":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM moderations").fetchone()[0]
+
+    def version_id(self, detail: dict) -> int:
+        """The id of a rule version, described by a JSON-able dict of checker and input versions."""
+        blob = json.dumps(detail, sort_keys=True)
+        digest = hashlib.blake2b(blob.encode(), digest_size=16).hexdigest()
+        with self._lock:
+            vid = self._versions.get(digest)
+            if vid is None:
+                self._db.execute("INSERT OR IGNORE INTO versions (digest, detail) VALUES (?, ?)",
+                                 (digest, blob))
+                (vid,) = self._db.execute("SELECT id FROM versions WHERE digest = ?", (digest,)).fetchone()
+                self._versions[digest] = vid
+        return vid
+
+    def _entry(self, row) -> LedgerEntry:
+        uri, cid, url, labels, version, emitted = row
+        return LedgerEntry(uri, cid, url, _decode(labels), version, _decode(emitted))
+
+    def _get(self, uri: str, cid: str) -> Optional[LedgerEntry]:
+        # the stored row, overlaid with whatever is still buffered for it
+        key = (uri, cid)
+        row = self._db.execute(
+            "SELECT uri, cid, url, labels, version, emitted FROM moderations "
+            "WHERE uri = ? AND cid = ?", key).fetchone()
+        entry = self._entry(row) if row else None
+        pending = self._rows.get(key)
+        if pending is not None:
+            _uri, _cid, url, labels, version, _moderated = pending
+            entry = LedgerEntry(uri, cid, url or (entry.url if entry else None), _decode(labels),
+                                version, entry.emitted if entry else frozenset())
+        mark = self._emits.get(key)
+        if mark is not None:
+            entry = entry or LedgerEntry(uri, cid, None, frozenset(), None, frozenset())
+            entry = entry._replace(emitted=_decode(mark[0]))
+        return entry
+
+    def get(self, uri: str, cid: str) -> Optional[LedgerEntry]:
+        with self._lock:
+            return self._get(uri, cid)
+
+    def get_url(self, url: str) -> Optional[LedgerEntry]:
+        """
+        The most recently moderated record version of the post at a web URL.
+        The URL does not say which CID it points at now, so this is for
+        reports; deciding whether to moderate a post again takes get().
+        """
+        with self._lock:
+            key = self._urls.get(url)
+            if key is None:
+                key = self._db.execute(
+                    "SELECT uri, cid FROM moderations WHERE url = ? "
+                    "ORDER BY moderated DESC LIMIT 1", (url,)).fetchone()
+                if key is None:
+                    return None
+            return self._get(*key)
+
+    def record(self, uri: str, cid: str, labels: Iterable[str], version: int,
+               url: Optional[str] = None) -> None:
+        """Remember the labels that rule version `version` computed for a record version."""
+        with self._lock:
+            self._rows[(uri, cid)] = (uri, cid, url or None, _encode(labels), version, time.time())
+            if url:
+                self._urls[url] = (uri, cid)
+            full = len(self._rows) + len(self._emits) >= self.batch_size
+        if full:
+            self.flush()
+
+    def mark_emitted(self, uri: str, cid: str, labels: Iterable[str]) -> None:
+        """Record that `labels` (everything sent so far) have been emitted for a record version."""
+        with self._lock:
+            self._emits[(uri, cid)] = (_encode(labels), time.time())
+            full = len(self._rows) + len(self._emits) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write everything buffered in one transaction."""
+        with self._lock:
+            if not self._rows and not self._emits:
+                return
+            rows, self._rows = self._rows, {}
+            emits, self._emits = self._emits, {}
+            urls, self._urls = self._urls, {}
+            db = self._db
+            db.execute("BEGIN")
+            try:
+                # a re-moderated row keeps its emission status
+                db.executemany(
+                    "INSERT INTO moderations (uri, cid, url, labels, version, moderated) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (uri, cid) DO UPDATE SET "
+                    "url = coalesce(excluded.url, url), labels = excluded.labels, "
+                    "version = excluded.version, moderated = excluded.moderated",
+                    rows.values(),
+                )
+                db.executemany(
+                    "INSERT INTO moderations (uri, cid, labels, emitted, emitted_at) "
+                    "VALUES (?, ?, '[]', ?, ?) ON CONFLICT (uri, cid) DO UPDATE SET "
+                    "emitted = excluded.emitted, emitted_at = excluded.emitted_at",
+                    ((uri, cid, labels, at) for (uri, cid), (labels, at) in emits.items()),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                self._rows = {**rows, **self._rows}
+                self._emits = {**emits, **self._emits}
+                self._urls = {**urls, **self._urls}
+                raise
+
+    def unemitted(self, version: Optional[int] = None, limit: int = 1000) -> List[LedgerEntry]:
+        """Rows with labels that have not all been emitted yet, e.g. after a crash mid-batch."""
+        self.flush()
+        query = ("SELECT uri, cid, url, labels, version, emitted FROM moderations "
+                 "WHERE labels != '[]' AND (emitted IS NULL OR emitted != labels)")
+        params: tuple = ()
+        if version is not None:
+            query += " AND version = ?"
+            params = (version,)
+        with self._lock:
+            rows = self._db.execute(query + " LIMIT ?", (*params, limit)).fetchall()
+        return [entry for entry in map(self._entry, rows) if not entry.labels <= entry.emitted]
+
+    def close(self) -> None:
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
@@ -0,0 +1,170 @@
+"Per-stage latency histograms and counters for the labeler"
+
+from __future__ import annotations
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Sequence, Tuple
+import json, threading, time
+
+# upper bounds in seconds, 1us .. 10s (the text rules run in microseconds)
+BUCKETS: Tuple[float, ...] = (
+    0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005,
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+PREFIX = "pylabel"
+
+_NULL_TIMER = nullcontext()
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus sense."""
+
+    def __init__(self, buckets: Sequence[float] = BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)     # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (None if empty)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        if exc_type is not None:
+            self.metrics.inc("errors", stage=self.stage)
+
+
+class Metrics:
+    """
+    Registry of stage timings and event counters.
+
+        metrics = Metrics()
+        labeler.metrics = metrics
+        ...
+        print(metrics.to_prometheus())
+
+    A disabled registry (Metrics(enabled=False), or NULL_METRICS) hands out
+    a shared no-op timer and ignores counters, so instrumented code costs
+    one attribute lookup and call per stage when nobody is collecting.
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Sequence[float] = BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._lock = threading.Lock()
+
+    def timer(self, stage: str):
+        """Context manager timing one run of `stage`; an exception also counts an error."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self.histograms.get(stage)
+            if hist is None:
+                hist = self.histograms[stage] = Histogram(self.buckets)
+            hist.observe(seconds)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        """Add to counter `name`, e.g. inc("cache_hits", cache="blob")."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def count(self, name: str, **labels: str) -> float:
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def snapshot(self) -> dict:
+        """Everything collected so far as plain JSON-serializable data."""
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": h.count,
+                    "sum_s": h.sum,
+                    "mean_s": h.sum / h.count if h.count else None,
+                    "p50_s": h.quantile(0.50),
+                    "p95_s": h.quantile(0.95),
+                    "p99_s": h.quantile(0.99),
+                    "buckets": dict(zip(map(str, (*h.buckets, "+Inf")), h.counts)),
+                }
+                for stage, h in sorted(self.histograms.items())
+            }
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+        return {"stages": stages, "counters": counters}
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        with self._lock:
+            name = f"{PREFIX}_stage_duration_seconds"
+            if self.histograms:
+                lines += [f"# HELP {name} Time spent in each labeling stage.", f"# TYPE {name} histogram"]
+            for stage, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip((*map(repr, h.buckets), "+Inf"), h.counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {h.sum!r}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+            typed = set()
+            for (counter, labels), value in sorted(self.counters.items()):
+                metric = f"{PREFIX}_{counter}_total"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write a .json snapshot, or Prometheus text for any other extension."""
+        text = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+NULL_METRICS = Metrics(enabled=False)
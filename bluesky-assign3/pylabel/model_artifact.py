@@ -0,0 +1,191 @@
+"Versioned on-disk artifact for the scam classifier"
+
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import hashlib, json, os
+import numpy as np
+
+ARTIFACT_VERSION = 3
+META_FILE    = "meta.json"
+IDF_FILE     = "idf"        # stems: the arrays are saved as <stem>-<digest>.npy
+COEF_FILE    = "coef"
+SCORING_FILE = "scoring.json"
+
+# everything that changes the fitted model; a mismatch forces a retrain
+HYPERPARAMS: Dict[str, Any] = {
+    "max_features": 5000,
+    "test_size": 0.2,
+    "random_state": 42,
+    "C": 1.0,
+    "max_iter": 100,
+}
+
+
+def data_digest(path: Path) -> str:
+    """blake2b of the training CSV's bytes."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@dataclass
+class ModelArtifact:
+    """
+    A trained TF-IDF + logistic regression model, independent of sklearn.
+
+    `vocabulary` lists terms in column order, `idf` and `coef` are
+    memory-mapped from the .npy files named in meta["files"],
+    `vectorizer_params` are the TfidfVectorizer settings needed to
+    tokenize the same way.
+    """
+    meta: Dict[str, Any]
+    idf: np.ndarray
+    coef: np.ndarray
+
+    @property
+    def vocabulary(self) -> List[str]:
+        return self.meta["vocabulary"]
+
+    @property
+    def intercept(self) -> float:
+        return self.meta["intercept"]
+
+    @property
+    def classes(self) -> List[Any]:
+        return self.meta["classes"]
+
+    @property
+    def vectorizer_params(self) -> Dict[str, Any]:
+        return self.meta["vectorizer_params"]
+
+    def matches(self, data_file: Path, hyperparams: Dict[str, Any]) -> bool:
+        """True if this artifact was trained on data_file with these hyperparameters."""
+        meta = self.meta
+        if meta.get("version") != ARTIFACT_VERSION or meta.get("hyperparams") != hyperparams:
+            return False
+        st = os.stat(data_file)
+        # size + mtime unchanged: skip re-reading the CSV to hash it
+        if meta.get("data_size") == st.st_size and meta.get("data_mtime_ns") == st.st_mtime_ns:
+            return True
+        return meta.get("data_digest") == data_digest(data_file)
+
+
+def save_artifact(directory: Path, vectorizer, model, data_file: Path,
+                  hyperparams: Dict[str, Any], metrics: Optional[Dict[str, Any]] = None) -> None:
+    """Write a fitted TfidfVectorizer + binary LogisticRegression to `directory`."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    vocab = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    st = os.stat(data_file)
+    params = vectorizer.get_params()
+    meta = {
+        "version": ARTIFACT_VERSION,
+        "hyperparams": hyperparams,
+        "data_digest": data_digest(data_file),
+        "data_size": st.st_size,
+        "data_mtime_ns": st.st_mtime_ns,
+        "vectorizer_params": {
+            k: params[k] for k in ("lowercase", "token_pattern", "ngram_range", "norm",
+                                   "use_idf", "smooth_idf", "sublinear_tf", "max_features")
+        },
+        "vocabulary": vocab,
+        "classes": [c.item() if hasattr(c, "item") else c for c in model.classes_],
+        "intercept": float(model.intercept_[0]),
+        "metrics": metrics or {},
+    }
+    idf = np.asarray(vectorizer.idf_, dtype=np.float64)
+    coef = np.asarray(model.coef_[0], dtype=np.float64)
+    meta["files"] = {"idf": save_array(directory, IDF_FILE, idf),
+                     "coef": save_array(directory, COEF_FILE, coef)}
+    write_scoring_table(directory / SCORING_FILE, meta, idf, coef)
+    replace_meta(directory / META_FILE, meta)
+
+
+def _write_atomic(path: Path, write) -> None:
+    # per-process temp file renamed over the target, so readers see the old or the new file, never a mix
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def save_array(directory: Path, stem: str, array: np.ndarray) -> str:
+    """
+    Save `array` as <stem>-<digest>.npy in `directory` and return the file name.
+
+    A name is never rewritten with other content, so a reader that has
+    memory-mapped the previous generation keeps seeing it unchanged.
+    """
+    digest = hashlib.blake2b(np.ascontiguousarray(array).tobytes(), digest_size=8).hexdigest()
+    name = f"{stem}-{digest}.npy"
+    if not (Path(directory) / name).exists():
+        _write_atomic(Path(directory) / name, lambda f: np.save(f, array))
+    return name
+
+
+def replace_meta(path: Path, meta: Dict[str, Any]) -> None:
+    """
+    Switch the artifact to `meta`, atomically and last: its presence marks a
+    complete artifact. Array files named by neither this meta nor the one it
+    replaces are then removed; the previous generation is kept for readers
+    that loaded its meta just before the switch.
+    """
+    path = Path(path)
+    keep = set(meta.get("files", {}).values())
+    try:
+        keep |= set(json.loads(path.read_text(encoding="utf-8")).get("files", {}).values())
+    except (OSError, ValueError):
+        pass
+    _write_atomic(path, lambda f: f.write(json.dumps(meta).encode("utf-8")))
+    stems = {name.rsplit("-", 1)[0] for name in keep}
+    for old in path.parent.glob("*.npy"):
+        # <stem>.npy is the unversioned layout of artifact version 2
+        if old.stem.rsplit("-", 1)[0] in stems and old.name not in keep:
+            old.unlink(missing_ok=True)
+
+
+def write_scoring_table(path: Path, meta: Dict[str, Any], idf: np.ndarray, coef: np.ndarray) -> None:
+    """
+    Write the stdlib-only table read by fast_scorer.FastScamScorer.
+
+    Each token maps to [idf * coef, idf]: the first is its contribution to
+    the decision function, the second feeds the l2 norm of the TF-IDF row.
+    """
+    params = meta["vectorizer_params"]
+    if (tuple(params["ngram_range"]) != (1, 1) or params["norm"] != "l2"
+            or not params["use_idf"] or params["sublinear_tf"]):
+        raise ValueError(f"fast scoring table does not support vectorizer params {params}")
+    table = {
+        "version": meta["version"],
+        "data_digest": meta["data_digest"],
+        "lowercase": params["lowercase"],
+        "token_pattern": params["token_pattern"],
+        "classes": meta["classes"],
+        "intercept": meta["intercept"],
+        "weights": {
+            term: [w, i] for term, w, i in zip(meta["vocabulary"], (idf * coef).tolist(), idf.tolist())
+        },
+    }
+    _write_atomic(Path(path), lambda f: f.write(json.dumps(table).encode("utf-8")))
+
+
+def load_artifact(directory: Path) -> Optional[ModelArtifact]:
+    """Load an artifact, or None if there is no complete one in `directory`."""
+    directory = Path(directory)
+    try:
+        meta = json.loads((directory / META_FILE).read_text(encoding="utf-8"))
+        if meta.get("version") != ARTIFACT_VERSION:
+            return None
+        idf = np.load(directory / meta["files"]["idf"], mmap_mode="r")
+        coef = np.load(directory / meta["files"]["coef"], mmap_mode="r")
+    except (OSError, ValueError, KeyError):
+        return None
+    return ModelArtifact(meta, idf, coef)
@@ -5,13 +5,19 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
 
-try:
+# the atproto client is only built the first time a URL is looked up
+_ATP_CLIENT = None
 
-    from atproto import Client
-    _ATP_CLIENT = Client()
 
-except ImportError:
-    _ATP_CLIENT = None
+def _atp_client():
+    global _ATP_CLIENT
+    if _ATP_CLIENT is None:
+        try:
+            from atproto import Client
+        except ImportError:
+            return None
+        _ATP_CLIENT = Client()
+    return _ATP_CLIENT
 
 
 
@@ -56,7 +62,9 @@ class PolicyProposalLabeler:
 
 def post_text_from_url(url: str) -> str | None:
 
-    if _ATP_CLIENT is None:
+    client = _atp_client()
+
+    if client is None:
 
         return None
     
@@ -66,7 +74,7 @@ def post_text_from_url(url: str) -> str | None:
 
         handle = url.split("/")[-3]
 
-        post = _ATP_CLIENT.get_post(rkey, handle)
+        post = client.get_post(rkey, handle)
 
         return post.value.text or ""
 
@@ -75,13 +83,15 @@ def post_text_from_url(url: str) -> str | None:
         print(f"Warning: Couldn't fetch post text : {exc}")
 
         return None
-# use the classifier
+# use the classifier (training runs only when this file is executed, never on import)
+
+if __name__ == "__main__":
 
-classifier = PolicyProposalClassifier()
+    classifier = PolicyProposalLabeler()
 
-# when used in automated_labeler.py, maybe this string could be a parameter.
+    # when used in automated_labeler.py, maybe this string could be a parameter.
 
-result = classifier.predict("I'm going to give away free money!")
-print(f"Prediction: {result}")
-evaluation = classifier.evaluate()
-print(f"Evaluation: {evaluation}")
\ No newline at end of file
+    result = classifier.predict("I'm going to give away free money!")
+    print(f"Prediction: {result}")
+    evaluation = classifier.evaluate()
+    print(f"Evaluation: {evaluation}")
\ No newline at end of file
@@ -1,47 +1,77 @@
-import pandas as pd
 import sys, re
-from typing import Optional
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, accuracy_score
 from pathlib import Path
 
+import numpy as np
 
 try:
+    from .model_artifact import HYPERPARAMS, load_artifact, save_artifact
+except ImportError:  # run as a script from inside pylabel/
+    from model_artifact import HYPERPARAMS, load_artifact, save_artifact
 
-    from atproto import Client
-    _ATP_CLIENT = Client()
 
-except ImportError:
-    _ATP_CLIENT = None
+# pandas, the training/metrics parts of sklearn and the atproto client are
+# only needed for training, evaluation and URL lookups, so they are imported
+# (and the client built) on first use rather than at import time
+_ATP_CLIENT = None
+
+
+def _atp_client():
+    global _ATP_CLIENT
+    if _ATP_CLIENT is None:
+        try:
+            from atproto import Client
+        except ImportError:
+            return None
+        _ATP_CLIENT = Client()
+    return _ATP_CLIENT
 
 
 
 
 class PolicyProposalClassifier:
-    def __init__(self):
+    def __init__(self, artifact_dir=None, retrain=False):
         #self.train_data = pd.read_csv('training-data/posts.csv')
         
         root = Path(__file__).resolve().parent
 
-        csv_path = root.parent / "training-data" / "posts.csv"
+        self.csv_path = root.parent / "training-data" / "posts.csv"
+        self.artifact_dir = Path(artifact_dir) if artifact_dir else root.parent / "models" / "scam-classifier"
+        self.hyperparams = dict(HYPERPARAMS)
 
-        self.train_data = pd.read_csv(csv_path)
-        
-        self.vectorizer = TfidfVectorizer(max_features=5000)
-        self.model = LogisticRegression()
+        # reuse the exported model unless the training data or hyperparameters changed
+        artifact = None if retrain else load_artifact(self.artifact_dir)
+        if artifact is not None and artifact.matches(self.csv_path, self.hyperparams):
+            self._load(artifact)
+        else:
+            self.fit()
+            self.export()
+
+    def _split_data(self):
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
 
+        self.train_data = pd.read_csv(self.csv_path)
         self.train_data['Post'] = self.train_data['Post'].fillna('')
 
         # Split the data into training and testing sets
         self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
             self.train_data['Post'], 
             self.train_data['Label'], 
-            test_size=0.2, 
-            random_state=42
+            test_size=self.hyperparams["test_size"], 
+            random_state=self.hyperparams["random_state"]
         )
 
+    def fit(self):
+        """Train the vectorizer and model from training-data/posts.csv."""
+        self._split_data()
+
+        self.vectorizer = TfidfVectorizer(max_features=self.hyperparams["max_features"])
+        self.model = LogisticRegression(C=self.hyperparams["C"], max_iter=self.hyperparams["max_iter"])
+
         # Fit the model
         self.X_tfidf = self.vectorizer.fit_transform(self.X_train)
         self.model.fit(self.X_tfidf, self.y_train)
@@ -51,6 +81,30 @@ class PolicyProposalClassifier:
         # Make predictions
         self.y_pred = self.model.predict(self.X_test_tfidf)
 
+    def export(self):
+        """Write the fitted model to artifact_dir so later instances skip training."""
+        from sklearn.metrics import accuracy_score, classification_report
+
+        self.metrics = {"accuracy": float(accuracy_score(self.y_test, self.y_pred)),
+                        "report": classification_report(self.y_test, self.y_pred)}
+        save_artifact(self.artifact_dir, self.vectorizer, self.model, self.csv_path, self.hyperparams,
+                      metrics=self.metrics)
+
+    def _load(self, artifact):
+        # held-out metrics as measured when the artifact was trained
+        self.metrics = artifact.meta.get("metrics", {})
+        params = dict(artifact.vectorizer_params)
+        params["ngram_range"] = tuple(params["ngram_range"])
+        self.vectorizer = TfidfVectorizer(**params)
+        self.vectorizer.vocabulary_ = {term: i for i, term in enumerate(artifact.vocabulary)}
+        self.vectorizer.idf_ = artifact.idf
+
+        self.model = LogisticRegression(C=self.hyperparams["C"], max_iter=self.hyperparams["max_iter"])
+        self.model.classes_ = np.array(artifact.classes)
+        self.model.coef_ = np.asarray(artifact.coef).reshape(1, -1)
+        self.model.intercept_ = np.array([artifact.intercept])
+        self.model.n_features_in_ = len(artifact.vocabulary)
+
     def train(self, texts, labels):
         self.vectorizer.fit_transform(texts)
         
@@ -58,15 +112,53 @@ class PolicyProposalClassifier:
         X_tfidf = self.vectorizer.transform([text])
         prediction = self.model.predict(X_tfidf)
         return prediction[0]
+
+    @staticmethod
+    def _chunks(texts: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+        it = iter(texts)
+        while True:
+            chunk = [t or "" for t in islice(it, chunk_size)]
+            if not chunk:
+                return
+            yield chunk
+
+    def predict_proba_many(self, texts: Iterable[str], chunk_size: int = 1024) -> Iterator[float]:
+        """
+        Yield P(scam) for each text, in order.
+
+        `texts` may be any iterable or generator; it is consumed and
+        vectorized `chunk_size` texts at a time, so memory stays flat
+        however long the input is.
+        """
+        for chunk in self._chunks(texts, chunk_size):
+            proba = self.model.predict_proba(self.vectorizer.transform(chunk))[:, 1]
+            yield from proba.tolist()
+
+    def predict_many(self, texts: Iterable[str], chunk_size: int = 1024) -> Iterator[Tuple[int, float]]:
+        """Yield (label, P(scam)) for each text, labelled the same way as predict()."""
+        classes = self.model.classes_
+        for chunk in self._chunks(texts, chunk_size):
+            proba = self.model.predict_proba(self.vectorizer.transform(chunk))
+            labels = classes[proba.argmax(axis=1)]
+            yield from zip(labels.tolist(), proba[:, 1].tolist())
     
     def evaluate(self):
+        from sklearn.metrics import classification_report, accuracy_score
+
+        if not hasattr(self, "y_pred"):
+            # loaded from an artifact: score the same held-out split now
+            self._split_data()
+            self.X_test_tfidf = self.vectorizer.transform(self.X_test)
+            self.y_pred = self.model.predict(self.X_test_tfidf)
         print("Accuracy:", accuracy_score(self.y_test, self.y_pred))
         return classification_report(self.y_test, self.y_pred)
 
 
 def post_text_from_url(url: str) -> Optional[str]:
 
-    if _ATP_CLIENT is None:
+    client = _atp_client()
+
+    if client is None:
 
         return None
     
@@ -76,7 +168,7 @@ def post_text_from_url(url: str) -> Optional[str]:
 
         handle = url.split("/")[-3]
 
-        post = _ATP_CLIENT.get_post(rkey, handle)
+        post = client.get_post(rkey, handle)
 
         return post.value.text or ""
 
@@ -89,12 +181,26 @@ def post_text_from_url(url: str) -> Optional[str]:
 
 if __name__ == "__main__":
 
-    if len(sys.argv) < 2:
+    args = sys.argv[1:]
+    evaluate = "--evaluate" in args
+    args = [a for a in args if a != "--evaluate"]
 
-        print("Usage: python3 policy_proposal_labeler.py <post-url>")
+    if not args:
 
+        print("Usage: python3 policy_proposal_labeler.py [--evaluate] <post-url>")
+        print("       python3 policy_proposal_labeler.py --train")
 
-    user_input = " ".join(sys.argv[1:])
+        sys.exit(1)
+
+    if args == ["--train"]:
+
+        classifier = PolicyProposalClassifier(retrain=True)
+
+        print(f"Exported model to {classifier.artifact_dir}")
+
+        sys.exit(0)
+
+    user_input = " ".join(args)
 
     is_url = re.match(r"https?://", user_input)
 
@@ -122,6 +228,17 @@ if __name__ == "__main__":
         print("POTENTIAL-SCAM")
 
 
-    print("\n=== model evaluation on hold")
+    if evaluate:
+
+        print("\n=== model evaluation on hold")
+
+        print(classifier.evaluate())
+
+    else:
+
+        # the held-out scores saved with the model; --evaluate recomputes them from the CSV
+        print("\n=== model evaluation on hold (at training time)")
+
+        print("Accuracy:", classifier.metrics.get("accuracy"))
 
-    print(classifier.evaluate())
\ No newline at end of file
+        print(classifier.metrics.get("report", ""))
@@ -0,0 +1,83 @@
+"Hydrated post shared by every checker"
+
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional, Tuple
+
+# atproto's models cost about a second to import; they are loaded by the
+# functions that decode records, so importing PostContext stays cheap
+if TYPE_CHECKING:
+    from atproto import models
+
+
+@dataclass(frozen=True)
+class PostContext:
+    """
+    Everything the checkers need from a post, fetched once.
+
+    `uri` and `cid` identify the exact record version (used for label
+    emission), `image_cids` are the blobs of an images embed and
+    `facet_links` are the link facets from the record.
+    """
+    # by hand rather than slots=True, which needs Python 3.10
+    __slots__ = ("url", "uri", "cid", "author_did", "text", "facet_links", "image_cids")
+
+    url: str
+    uri: str
+    cid: str
+    author_did: Optional[str]
+    text: str
+    facet_links: Tuple[str, ...]
+    image_cids: Tuple[str, ...]
+
+    @classmethod
+    def from_record(cls, url: str, uri: str, cid: str, record: Any) -> "PostContext":
+        """Build a context from an app.bsky.feed.post record (model or raw dict)."""
+        from atproto import models
+
+        if isinstance(record, dict):
+            record = models.get_or_create(record, models.AppBskyFeedPost.Record, strict=False)
+        return cls(
+            url=url,
+            uri=str(uri),
+            cid=str(cid),
+            author_did=did_from_uri(str(uri)),
+            text=getattr(record, "text", None) or "",
+            facet_links=_facet_links(record),
+            image_cids=_image_cids(record),
+        )
+
+    @classmethod
+    def from_get_record(cls, url: str, resp: models.AppBskyFeedPost.GetRecordResponse) -> "PostContext":
+        return cls.from_record(url, resp.uri, resp.cid, resp.value)
+
+
+def repo_from_uri(uri: str) -> str:
+    """The repo (a DID or a handle) of an at:// URI, or "" if it is not one."""
+    return uri[len("at://"):].split("/", 1)[0] if uri.startswith("at://") else ""
+
+
+def did_from_uri(uri: str) -> Optional[str]:
+    """The repo DID of an at:// URI, or None if the URI names a handle."""
+    repo = repo_from_uri(uri)
+    return repo if repo.startswith("did:") else None
+
+
+def _facet_links(record: Any) -> Tuple[str, ...]:
+    from atproto import models
+
+    links = []
+    for facet in getattr(record, "facets", None) or ():
+        for feature in facet.features or ():
+            if isinstance(feature, models.AppBskyRichtextFacet.Link):
+                links.append(feature.uri)
+    return tuple(links)
+
+
+def _image_cids(record: Any) -> Tuple[str, ...]:
+    from atproto import models
+
+    embed = getattr(record, "embed", None)
+    if isinstance(embed, models.AppBskyEmbedImages.Main):
+        return tuple(str(img.image.cid) for img in embed.images)
+    return ()
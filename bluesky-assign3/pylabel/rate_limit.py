@@ -0,0 +1,63 @@
+"Per-host rate limiting for outgoing requests"
+
+from __future__ import annotations
+from typing import Dict, Optional
+from urllib.parse import urlparse
+import threading, time
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` requests per second with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+
+
+class HostRateLimiter:
+    """
+    Token buckets keyed by host name.
+
+    Hosts without an explicit limit use `default` (None means unlimited).
+    Safe to share between the threads that run moderate_post concurrently.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, float]] = None, default: Optional[float] = None):
+        self.limits = {h.lower(): r for h, r in (limits or {}).items()}
+        self.default = default
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str) -> Optional[TokenBucket]:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate = self.limits.get(host, self.default)
+            if rate is None:
+                return None
+            with self._lock:
+                bucket = self._buckets.setdefault(host, TokenBucket(rate))
+        return bucket
+
+    def acquire(self, host_or_url: str) -> None:
+        """Block until a request to this host (or URL) is allowed."""
+        host = urlparse(host_or_url).hostname if "://" in host_or_url else host_or_url
+        bucket = self._bucket((host or "").lower())
+        if bucket is not None:
+            bucket.acquire()
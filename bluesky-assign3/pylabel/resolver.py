@@ -0,0 +1,154 @@
+"Cached, coalescing handle -> DID resolution"
+
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+import os, sqlite3, threading, time
+
+import requests
+
+from .cache import LRUCache
+from .sessions import pooled_session
+
+RESOLVE_URL  = "https://bsky.social/xrpc/com.atproto.identity.resolveHandle"
+CACHE_SIZE   = 100_000
+TTL          = 3600.0       # seconds a resolved DID is trusted
+NEGATIVE_TTL = 300.0        # seconds an unresolvable handle is remembered
+BATCH_WORKERS = 16
+
+# a cached miss is stored as this sentinel so it can be told apart from "not cached"
+_NOT_FOUND = ""
+
+
+class HandleResolver:
+    """
+    Resolves handles to DIDs with as few resolveHandle calls as possible.
+
+    Results live in an in-process LRU with a TTL, plus an optional SQLite
+    tier at `path` that survives restarts. Handles the server says do not
+    exist are cached for `negative_ttl`; transport and 5xx errors are not
+    cached. Concurrent lookups of the same handle share one request.
+    """
+
+    def __init__(self, path: Optional[str] = None, url: str = RESOLVE_URL,
+                 ttl: float = TTL, negative_ttl: float = NEGATIVE_TTL,
+                 maxsize: int = CACHE_SIZE, session: Optional[requests.Session] = None):
+        self.url = url
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.session = session or pooled_session()
+        self.requests = 0
+        # the LRU's own TTL is the longer one; negative entries carry their own expiry
+        self._cache: LRUCache[str, Tuple[str, float]] = LRUCache(maxsize, ttl)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS handles "
+                "(handle TEXT PRIMARY KEY, did TEXT NOT NULL, expires REAL NOT NULL)"
+            )
+
+    def _cached(self, handle: str) -> Optional[str]:
+        """The cached DID, _NOT_FOUND for a cached miss, or None if not cached."""
+        entry = self._cache.get(handle)
+        now = time.time()
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT did, expires FROM handles WHERE handle = ?", (handle,)
+            ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        self._cache.put(handle, row)
+        return row[0]
+
+    def _store(self, handle: str, did: str) -> None:
+        expires = time.time() + (self.ttl if did else self.negative_ttl)
+        self._cache.put(handle, (did, expires))
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO handles (handle, did, expires) VALUES (?, ?, ?)",
+                    (handle, did, expires),
+                )
+
+    def _fetch(self, handle: str) -> str:
+        self.requests += 1
+        resp = self.session.get(self.url, params={"handle": handle}, timeout=10)
+        if resp.status_code == 400:
+            # XRPC answers an unknown handle with 400 InvalidRequest
+            return _NOT_FOUND
+        resp.raise_for_status()
+        return resp.json()["did"]
+
+    def resolve(self, handle: str) -> Optional[str]:
+        """The DID for `handle`, or None if it does not resolve."""
+        handle = handle.strip().lstrip("@")
+        if handle.startswith("did:"):
+            return handle
+        handle = handle.lower()
+        did = self._cached(handle)
+        if did is not None:
+            return did or None
+
+        with self._lock:
+            fut = self._inflight.get(handle)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[handle] = Future()
+        if not owner:
+            return fut.result() or None
+
+        try:
+            did = self._fetch(handle)
+            self._store(handle, did)
+            fut.set_result(did)
+        except Exception as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(handle, None)
+        return did or None
+
+    def resolve_many(self, handles: Iterable[str], workers: int = BATCH_WORKERS) -> Dict[str, Optional[str]]:
+        """Resolve many handles concurrently; failures map to None."""
+        unique = list(dict.fromkeys(handles))
+        results: Dict[str, Optional[str]] = {}
+        todo = []
+        for handle in unique:
+            did = self._cached(handle.strip().lstrip("@").lower())
+            if did is not None:
+                results[handle] = did or None
+            else:
+                todo.append(handle)
+        if todo:
+            with ThreadPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+                futures = {h: pool.submit(self.resolve, h) for h in todo}
+                for handle, fut in futures.items():
+                    try:
+                        results[handle] = fut.result()
+                    except Exception:
+                        results[handle] = None
+        return results
+
+
+_default: Optional[HandleResolver] = None
+_default_lock = threading.Lock()
+
+
+def default_resolver() -> HandleResolver:
+    """Process-wide resolver used by did_from_handle (and so label_account and the CLI)."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = HandleResolver()
+    return _default
@@ -0,0 +1,16 @@
+"Shared HTTP sessions with keep-alive connection pools"
+
+from __future__ import annotations
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_SIZE = 32
+
+
+def pooled_session(pool_size: int = POOL_SIZE) -> requests.Session:
+    """A requests.Session whose per-host keep-alive pool can serve `pool_size` threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
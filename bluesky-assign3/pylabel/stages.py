@@ -0,0 +1,174 @@
+"Checker stages and the cost-aware scheduler that runs them"
+
+from __future__ import annotations
+from concurrent.futures import Executor
+import contextvars
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .metrics import NULL_METRICS, Metrics
+from .text_features import TextFeatures
+
+if TYPE_CHECKING:
+    from .post_context import PostContext
+
+# what a stage can ask of a post
+TEXT   = "text"
+LINKS  = "links"
+IMAGES = "images"
+
+SCAM_LABEL = "potential-scam"
+
+
+class IncompleteModeration(Exception):
+    """
+    Raised by run_stages when a stage failed. `labels` are what the other
+    stages found, so the caller can still use them, but not remember them
+    as the post's result.
+    """
+
+    def __init__(self, labels: Set[str], errors: Dict[str, BaseException]):
+        super().__init__("; ".join(f"{name}: {e!r}" for name, e in errors.items()))
+        self.labels = labels
+        self.errors = errors
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One checker.
+
+    `fn` maps a post and its TextFeatures to the labels that apply. The stage only runs when
+    the post has every one of `inputs`, and is skipped once all of
+    `labels` are already known (an empty `labels` means open-ended, e.g.
+    news sources, and is never skipped). `cost` is a rough estimate in
+    microseconds used for ordering; `io` stages wait on the network and
+    run concurrently with each other after the CPU stages. Bump `version`
+    whenever `fn` would label a post differently, so results recorded in
+    a ModerationLedger are recomputed.
+    """
+    name: str
+    fn: Callable[[PostContext, TextFeatures], Iterable[str]]
+    inputs: FrozenSet[str] = frozenset({TEXT})
+    labels: FrozenSet[str] = frozenset()
+    cost: float = 10.0
+    io: bool = False
+    version: str = "1"
+
+    def can_skip(self, have: Set[str], found: Set[str]) -> bool:
+        return not self.inputs <= have or (bool(self.labels) and self.labels <= found)
+
+
+def available_inputs(post: PostContext, features: TextFeatures) -> Set[str]:
+    have = set()
+    if post.text:
+        have.add(TEXT)
+    if features.links:
+        have.add(LINKS)
+    if post.image_cids:
+        have.add(IMAGES)
+    return have
+
+
+def _run(stage: Stage, post: PostContext, features: TextFeatures, metrics: Metrics,
+         errors: Dict[str, BaseException]) -> List[str]:
+    try:
+        with metrics.timer(stage.name):
+            return list(stage.fn(post, features))
+    except Exception as e:
+        errors[stage.name] = e
+        return []
+
+
+def run_cpu_stages(post: PostContext, stages: Sequence[Stage], features: TextFeatures,
+                   metrics: Metrics = NULL_METRICS,
+                   errors: Optional[Dict[str, BaseException]] = None) -> Tuple[Set[str], List[Stage]]:
+    """
+    Run the applicable CPU stages, cheapest first, and return their labels
+    along with the I/O stages those labels do not rule out. A failing stage
+    is recorded in `errors` and the rest still run.
+    """
+    errors = {} if errors is None else errors
+    have = available_inputs(post, features)
+    found: Set[str] = set()
+    io_stages: List[Stage] = []
+    for stage in sorted(stages, key=lambda s: (s.io, s.cost)):
+        if stage.io:
+            io_stages.append(stage)
+        elif not stage.can_skip(have, found):
+            found.update(_run(stage, post, features, metrics, errors))
+    return found, [s for s in io_stages if not s.can_skip(have, found)]
+
+
+def run_io_stages(post: PostContext, io_stages: Sequence[Stage], features: TextFeatures,
+                  executor: Optional[Executor] = None, metrics: Metrics = NULL_METRICS,
+                  errors: Optional[Dict[str, BaseException]] = None) -> Set[str]:
+    """Run I/O stages concurrently on `executor` (inline when there is only one, or no executor)."""
+    errors = {} if errors is None else errors
+    found: Set[str] = set()
+    if len(io_stages) == 1 or (io_stages and executor is None):
+        for stage in io_stages:
+            found.update(_run(stage, post, features, metrics, errors))
+    elif io_stages:
+        # each stage runs in a copy of the caller's context (e.g. the post's rate limiter)
+        for fut in [executor.submit(contextvars.copy_context().run, _run, s, post, features, metrics, errors)
+                    for s in io_stages]:
+            found.update(fut.result())
+    return found
+
+
+def run_stages(post: PostContext, stages: Sequence[Stage], executor: Optional[Executor] = None,
+               metrics: Metrics = NULL_METRICS, features: Optional[TextFeatures] = None) -> Set[str]:
+    """
+    Run the applicable stages on a post and return the union of their labels.
+
+    CPU stages run first, cheapest first, so their labels can rule out
+    the network stages; the remaining I/O stages then run concurrently on
+    `executor`. The text is tokenized and its links parsed once, up
+    front, for all stages. If any stage raised, IncompleteModeration is
+    raised after the others have run, carrying their labels.
+    """
+    features = features or TextFeatures.from_post(post)
+    errors: Dict[str, BaseException] = {}
+    found, io_stages = run_cpu_stages(post, stages, features, metrics, errors)
+    found |= run_io_stages(post, io_stages, features, executor, metrics, errors)
+    if errors:
+        raise IncompleteModeration(found, errors)
+    return found
+
+
+def scam_stage(scorer=None, threshold: float = 0.5, model_version: Optional[str] = None) -> Stage:
+    """
+    The scam classifier as a stage, labelling posts with P(scam) >= threshold.
+
+    `scorer` is anything with predict_proba(text) -> float; by default the
+    dependency-free FastScamScorer over the exported model, which scores
+    the shared TextFeatures terms instead of tokenizing the text again.
+    The stage's version names the model (`model_version`, else the
+    scorer's `digest` of its artifact), so retraining it invalidates the
+    ledger like any other rule change.
+    """
+    if scorer is None:
+        from .fast_scorer import DEFAULT_ARTIFACT_DIR, SCORING_FILE, FastScamScorer
+        if not (DEFAULT_ARTIFACT_DIR / SCORING_FILE).exists():
+            raise FileNotFoundError(
+                f"no exported scam classifier at {DEFAULT_ARTIFACT_DIR / SCORING_FILE}; "
+                "train one with `python -m pylabel.policy_proposal_labeler --train`")
+        scorer = FastScamScorer.load()
+    model_version = model_version or getattr(scorer, "digest", None)
+    if model_version is None:
+        raise ValueError("scam_stage needs model_version= for a scorer without an artifact digest")
+
+    if getattr(scorer, "accepts_terms", False):
+        def proba(post: PostContext, features: TextFeatures) -> float:
+            return scorer.predict_proba_terms(features.terms)
+    else:
+        def proba(post: PostContext, features: TextFeatures) -> float:
+            return scorer.predict_proba(post.text)
+
+    def check(post: PostContext, features: TextFeatures) -> Set[str]:
+        return {SCAM_LABEL} if proba(post, features) >= threshold else set()
+
+    return Stage("scam_classifier", check, inputs=frozenset({TEXT}),
+                 labels=frozenset({SCAM_LABEL}), cost=15.0,
+                 version=f"1:{threshold}:{model_version}")
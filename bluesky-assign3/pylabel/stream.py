@@ -0,0 +1,351 @@
+"""
+Continuous labeling from a Jetstream-style stream of commit events.
+
+Events are JSON lines in Jetstream's format, read from a socket or from a
+local replay file standing in for the live stream:
+
+    {"did": "did:plc:...", "time_us": 1725911162329308, "kind": "commit",
+     "commit": {"operation": "create", "collection": "app.bsky.feed.post",
+                "rkey": "3l3qo2vutsw2b", "cid": "bafy...", "record": {...}}}
+
+Post records are decoded straight into PostContexts, so nothing is
+re-fetched, and then moderated on a pool of worker threads.
+
+    python -m pylabel.stream labeler-inputs events.jsonl --checkpoint cursor.json
+"""
+
+from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Collection, Deque, Iterable, Iterator, List, Optional, Set, Tuple
+import argparse, json, os, queue, socket, sys, threading, time
+
+from .post_context import PostContext
+
+POST_COLLECTION = "app.bsky.feed.post"
+QUEUE_SIZE = 1024
+WORKERS = 4
+CHECKPOINT_EVERY = 1.0      # seconds
+REPORT_EVERY = 10.0         # seconds
+RETRIES = 3                 # attempts per post before it is dead-lettered
+RETRY_BACKOFF = 0.5         # seconds, doubled after each failed attempt
+
+Emit = Callable[[PostContext, List[str]], None]
+
+_STOP = object()
+
+
+def web_url(did: str, rkey: str) -> str:
+    return f"https://bsky.app/profile/{did}/post/{rkey}"
+
+
+def event_key(event: dict) -> str:
+    """Identifies one event among those that share its time_us."""
+    commit = event.get("commit") or {}
+    return ":".join(str(part) for part in (event.get("did"), event.get("kind"), commit.get("collection"),
+                                           commit.get("rkey"), commit.get("rev") or commit.get("cid")))
+
+
+def decode_event(line: str) -> Tuple[Optional[int], Optional[str], Optional[PostContext]]:
+    """
+    Return (cursor, key, post) for one event line.
+
+    The cursor is the event's time_us (None if the line is not an event)
+    and key its event_key; post is None for anything other than a newly
+    created post.
+    """
+    try:
+        event = json.loads(line)
+    except ValueError:
+        return None, None, None
+    cursor = event.get("time_us")
+    key = event_key(event)
+    commit = event.get("commit") or {}
+    if (event.get("kind") != "commit" or commit.get("operation") != "create"
+            or commit.get("collection") != POST_COLLECTION or not commit.get("record")):
+        return cursor, key, None
+    did, rkey = event["did"], commit["rkey"]
+    uri = f"at://{did}/{POST_COLLECTION}/{rkey}"
+    try:
+        post = PostContext.from_record(web_url(did, rkey), uri, commit.get("cid", ""), commit["record"])
+    except Exception as e:
+        print(f"[stream] could not decode {uri}: {e}")
+        return cursor, key, None
+    return cursor, key, post
+
+
+def replay_lines(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8") as f:
+        yield from f
+
+
+def socket_lines(host: str, port: int) -> Iterator[str]:
+    """JSON lines from a TCP socket (stand-in for the Jetstream websocket)."""
+    with socket.create_connection((host, port)) as sock, sock.makefile("r", encoding="utf-8") as f:
+        yield from f
+
+
+def load_cursor(path: Optional[str]) -> Tuple[Optional[int], Set[str]]:
+    """The saved cursor and the keys of the events at exactly that cursor already processed."""
+    if not path or not os.path.exists(path):
+        return None, set()
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    return saved.get("cursor"), set(saved.get("seen", ()))
+
+
+def save_cursor(path: str, cursor: int, seen: Collection[str] = ()) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"cursor": cursor, "seen": sorted(seen)}, f)
+    os.replace(tmp, path)
+
+
+class Watermark:
+    """
+    Cursor of the last event such that it and every event before it has been processed.
+
+    Workers finish out of order, so the checkpoint may only move past an
+    event once everything dispatched before it is done as well. Several
+    events can share a cursor (time_us), so `seen` holds the keys of the
+    processed events at exactly `value`: on restart, events before `value`
+    are skipped, and events at `value` only if their key is in `seen`.
+    """
+
+    def __init__(self, start: Optional[int] = None, seen: Optional[Set[str]] = None):
+        self._pending: Deque[Tuple[int, int, str]] = deque()    # (seq, cursor, key)
+        self._done: Set[int] = set()
+        self._seq = 0
+        self._lock = threading.Lock()
+        self.value = start
+        self.seen: Set[str] = set(seen or ())
+
+    def dispatched(self, cursor: int, key: str) -> int:
+        """Track an event; returns the token to pass to finished()."""
+        with self._lock:
+            self._seq += 1
+            self._pending.append((self._seq, cursor, key))
+            return self._seq
+
+    def finished(self, token: int) -> None:
+        with self._lock:
+            self._done.add(token)
+            while self._pending and self._pending[0][0] in self._done:
+                seq, cursor, key = self._pending.popleft()
+                self._done.discard(seq)
+                if cursor != self.value:
+                    self.value = cursor
+                    self.seen = set()
+                self.seen.add(key)
+
+    def snapshot(self) -> Tuple[Optional[int], Set[str]]:
+        with self._lock:
+            return self.value, set(self.seen)
+
+    @staticmethod
+    def skip(cursor: int, key: str, start: Optional[int], seen: Set[str]) -> bool:
+        """True if a checkpoint at (start, seen) says this event was already processed."""
+        return start is not None and (cursor < start or (cursor == start and key in seen))
+
+
+@dataclass
+class StreamStats:
+    events: int = 0
+    posts: int = 0
+    labeled: int = 0
+    errors: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def events_per_sec(self) -> float:
+        return self.events / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.events} events ({self.posts} posts, {self.labeled} labeled, "
+                f"{self.errors} errors) in {self.elapsed:.1f}s = {self.events_per_sec:.0f} events/s")
+
+
+class StreamLabeler:
+    """
+    Runs the labeler over a stream of events.
+
+    A reader decodes events into a bounded queue; when the workers fall
+    behind, put() blocks and the reader stops pulling from its source,
+    which for a socket pushes backpressure back to the sender. The
+    cursor of the last fully processed event is checkpointed to
+    `checkpoint_path` (see Watermark), and events it covers are skipped
+    on restart. A post whose moderation still fails after `retries`
+    attempts is counted as an error and dead-lettered: whatever labels
+    its other stages found are emitted, it is logged and, with a
+    `dead_letter_path`, appended there as a JSON line (URI, CID, URL,
+    labels, error) to be re-run by hand. The checkpoint then moves past
+    it, so one post that can never succeed (say, an image blob that is
+    gone) neither stalls the checkpoint nor fails again on every restart.
+    """
+
+    def __init__(self, labeler, emit: Optional[Emit] = None, workers: int = WORKERS,
+                 queue_size: int = QUEUE_SIZE, checkpoint_path: Optional[str] = None,
+                 checkpoint_every: float = CHECKPOINT_EVERY, report_every: Optional[float] = REPORT_EVERY,
+                 retries: int = RETRIES, retry_backoff: float = RETRY_BACKOFF,
+                 dead_letter_path: Optional[str] = None):
+        self.labeler = labeler
+        self.emit = emit
+        self.workers = workers
+        self.queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_every = checkpoint_every
+        self.report_every = report_every
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.dead_letter_path = dead_letter_path
+        self.stats = StreamStats()
+        self.watermark = Watermark(*load_cursor(checkpoint_path))
+        self._stats_lock = threading.Lock()
+
+    def _work(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            token, post = item
+            self._label(post)
+            if token is not None:
+                self.watermark.finished(token)
+
+    def _label(self, post: PostContext) -> None:
+        """Moderate and emit one post, retrying with backoff, and dead-letter it if every attempt failed."""
+        delay = self.retry_backoff
+        error: Optional[Exception] = None
+        for attempt in range(1, self.retries + 1):
+            try:
+                labels = self.labeler.moderate(post)
+                break
+            except Exception as e:
+                error = e
+                print(f"[stream] failed on {post.uri} (attempt {attempt}/{self.retries}): {e}")
+                if attempt < self.retries:
+                    time.sleep(delay)
+                    delay *= 2
+        else:
+            labels = sorted(getattr(error, "labels", ()))      # what an IncompleteModeration did find
+            self._dead_letter(post, labels, error)
+        if labels:
+            if self.emit is not None:
+                self.emit(post, labels)
+            with self._stats_lock:
+                self.stats.labeled += 1
+
+    def _dead_letter(self, post: PostContext, labels: List[str], error: Exception) -> None:
+        with self._stats_lock:
+            self.stats.errors += 1
+            if self.dead_letter_path:
+                with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"uri": post.uri, "cid": post.cid, "url": post.url,
+                                        "labels": labels, "error": repr(error)}) + "\n")
+        print(f"[stream] giving up on {post.uri} after {self.retries} attempts"
+              + (f"; written to {self.dead_letter_path}" if self.dead_letter_path else ""))
+
+    def _checkpoint(self) -> None:
+        cursor, seen = self.watermark.snapshot()
+        if self.checkpoint_path and cursor is not None:
+            save_cursor(self.checkpoint_path, cursor, seen)
+
+    def run(self, lines: Iterable[str]) -> StreamStats:
+        """Consume `lines` until exhausted (or KeyboardInterrupt) and return the stats."""
+        start_cursor, start_seen = self.watermark.snapshot()
+        threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for t in threads:
+            t.start()
+        self.stats = StreamStats()
+        next_checkpoint = time.monotonic() + self.checkpoint_every
+        next_report = time.monotonic() + (self.report_every or float("inf"))
+        try:
+            for line in lines:
+                cursor, key, post = decode_event(line)
+                if cursor is None or self.watermark.skip(cursor, key, start_cursor, start_seen):
+                    continue
+                self.stats.events += 1
+                token = self.watermark.dispatched(cursor, key)
+                if post is None:
+                    self.watermark.finished(token)
+                else:
+                    self.stats.posts += 1
+                    self.queue.put((token, post))       # blocks when workers fall behind
+                now = time.monotonic()
+                if now >= next_checkpoint:
+                    self._checkpoint()
+                    next_checkpoint = now + self.checkpoint_every
+                if now >= next_report:
+                    print(f"[stream] {self.stats.summary()}")
+                    next_report = now + self.report_every
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for _ in threads:
+                self.queue.put(_STOP)
+            for t in threads:
+                t.join()
+            self._checkpoint()
+        return self.stats
+
+
+def main():
+    from atproto import Client
+    from .automated_labeler import AutomatedLabeler
+    from .stages import scam_stage
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("labeler_inputs_dir", type=str)
+    parser.add_argument("source", type=str, help="replay file, or host:port of a JSON-lines socket")
+    parser.add_argument("--checkpoint", type=str, default=None)
+    parser.add_argument("--dead_letter", type=str, default=None,
+                        help="append posts that still fail after every retry to this JSON-lines file")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--queue_size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--scam", action="store_true", help="also run the scam classifier stage")
+    parser.add_argument("--dedup", action="store_true", help="reuse labels across near-duplicate posts")
+    parser.add_argument("--ledger", type=str, default=None,
+                        help="SQLite moderation ledger; posts already labeled are skipped")
+    parser.add_argument("--hash_processes", type=int, default=None,
+                        help="decode and hash images in this many worker processes")
+    parser.add_argument("--blob_cache", type=str, default=None,
+                        help="SQLite file that keeps image pHashes by CID across runs")
+    args = parser.parse_args()
+
+    try:
+        scam = scam_stage() if args.scam else None
+    except FileNotFoundError as e:
+        parser.error(f"--scam: {e}")
+
+    def emit(post: PostContext, labels: List[str]) -> None:
+        print(json.dumps({"uri": post.uri, "cid": post.cid, "labels": sorted(labels)}), flush=True)
+
+    if os.path.exists(args.source):
+        lines = replay_lines(args.source)
+    else:
+        host, port = args.source.rsplit(":", 1)
+        lines = socket_lines(host, int(port))
+
+    labeler = AutomatedLabeler(Client(), args.labeler_inputs_dir, blob_cache_path=args.blob_cache)
+    try:
+        if scam is not None:
+            labeler.register(scam)
+        if args.dedup:
+            labeler.enable_dedup()
+        if args.ledger:
+            labeler.enable_ledger(args.ledger)
+        if args.hash_processes:
+            labeler.enable_hash_pool(args.hash_processes)
+        stats = StreamLabeler(labeler, emit, workers=args.workers, queue_size=args.queue_size,
+                              checkpoint_path=args.checkpoint, dead_letter_path=args.dead_letter).run(lines)
+    finally:
+        labeler.close()
+    print(f"[stream] {stats.summary()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"Out-of-core, incremental training for the scam classifier"
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Union
+import argparse, json, zlib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+from .model_artifact import replace_meta, save_array
+
+ROOT       = Path(__file__).resolve().parent.parent
+DEFAULT_DATA      = ROOT / "training-data" / "posts.csv"
+DEFAULT_MODEL_DIR = ROOT / "models" / "scam-classifier-stream"
+
+CLASSES    = np.array([0, 1])
+CHUNK_SIZE = 10_000
+MODEL_FILE = "meta.json"
+COEF_FILE  = "coef"          # stem: saved as coef-<digest>.npy
+
+# every 5th row (by a stable hash of its URI) is held out for evaluation
+HOLDOUT_MOD = 5
+
+STREAM_PARAMS: Dict[str, Any] = {
+    "n_features": 1 << 20,
+    "alpha": 1e-5,
+}
+
+
+def is_holdout(uri: str) -> bool:
+    return zlib.crc32(uri.encode("utf-8")) % HOLDOUT_MOD == 0
+
+
+def read_chunks(path: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Yield the URI/Label/Post columns of a training file chunk by chunk.
+
+    CSV is read with pandas' chunked reader; .parquet files are read one
+    record batch at a time (needs pyarrow).
+    """
+    path = Path(path)
+    columns = ["URI", "Label", "Post"]
+    if path.suffix == ".parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+
+
+class StreamingScamClassifier:
+    """
+    Scam classifier that never holds the whole training set in memory.
+
+    Texts go through a stateless HashingVectorizer, so there is no
+    vocabulary to fit, and the model is an SGD logistic regression
+    updated with partial_fit. Training is a sequence of chunked passes,
+    and new labelled posts can be folded in later with add_examples.
+    """
+
+    def __init__(self, n_features: int = STREAM_PARAMS["n_features"],
+                 alpha: float = STREAM_PARAMS["alpha"]):
+        self.params = {"n_features": n_features, "alpha": alpha}
+        self.vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False, norm="l2")
+        self.model = SGDClassifier(loss="log_loss", alpha=alpha, random_state=42)
+        self.seen = 0
+
+    def add_examples(self, texts: Iterable[str], labels: Iterable[int]) -> None:
+        """Update the model with newly labelled posts, without refitting from scratch."""
+        texts = ["" if not isinstance(t, str) else t for t in texts]
+        labels = np.asarray(list(labels), dtype=int)
+        if not len(texts):
+            return
+        self.model.partial_fit(self.vectorizer.transform(texts), labels, classes=CLASSES)
+        self.seen += len(texts)
+
+    def fit_stream(self, path: Union[str, Path], epochs: int = 1,
+                   chunk_size: int = CHUNK_SIZE, holdout: bool = True) -> "StreamingScamClassifier":
+        """Train on a CSV/parquet file in chunked passes, skipping held-out rows."""
+        for _ in range(epochs):
+            for chunk in read_chunks(path, chunk_size):
+                if holdout:
+                    chunk = chunk[~chunk["URI"].astype(str).map(is_holdout)]
+                self.add_examples(chunk["Post"].tolist(), chunk["Label"].tolist())
+        return self
+
+    def evaluate_stream(self, path: Union[str, Path], chunk_size: int = CHUNK_SIZE) -> float:
+        """Accuracy on the held-out rows of a training file."""
+        correct = total = 0
+        for chunk in read_chunks(path, chunk_size):
+            chunk = chunk[chunk["URI"].astype(str).map(is_holdout)]
+            if chunk.empty:
+                continue
+            pred = self.model.predict(self.vectorizer.transform(chunk["Post"].fillna("").tolist()))
+            correct += int((pred == chunk["Label"].to_numpy()).sum())
+            total += len(chunk)
+        return correct / total if total else float("nan")
+
+    def predict(self, text: str) -> int:
+        return int(self.model.predict(self.vectorizer.transform([text or ""]))[0])
+
+    def predict_proba_many(self, texts: Iterable[str], chunk_size: int = 1024) -> Iterator[float]:
+        it = iter(texts)
+        while True:
+            chunk = [t or "" for _, t in zip(range(chunk_size), it)]
+            if not chunk:
+                return
+            yield from self.model.predict_proba(self.vectorizer.transform(chunk))[:, 1].tolist()
+
+    def save(self, directory: Union[str, Path]) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        meta = {
+            "params": self.params,
+            "intercept": float(self.model.intercept_[0]),
+            "t": float(self.model.t_),
+            "seen": self.seen,
+            # a new file per save, and meta switched last, as for the scam-classifier artifact
+            "files": {"coef": save_array(directory, COEF_FILE, self.model.coef_[0])},
+        }
+        replace_meta(directory / MODEL_FILE, meta)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path]) -> "StreamingScamClassifier":
+        """Restore a saved model; it can keep learning with add_examples."""
+        directory = Path(directory)
+        meta = json.loads((directory / MODEL_FILE).read_text(encoding="utf-8"))
+        clf = cls(**meta["params"])
+        # the fitted state partial_fit and predict read; a partial_fit call to set it
+        # up would take a real SGD step on whatever it was given
+        model = clf.model
+        model.classes_ = CLASSES
+        model.coef_ = np.load(directory / meta["files"]["coef"]).reshape(1, -1)
+        model.intercept_ = np.array([meta["intercept"]])
+        model.n_features_in_ = model.coef_.shape[1]
+        model.t_ = meta["t"]
+        clf.seen = meta["seen"]
+        return clf
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Train the streaming scam classifier on a CSV/parquet file and save it.")
+    parser.add_argument("--data", type=str, default=str(DEFAULT_DATA),
+                        help="training file with URI, Label and Post columns")
+    parser.add_argument("--model_dir", type=str, default=str(DEFAULT_MODEL_DIR))
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--chunk_size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--update", action="store_true",
+                        help="fold --data into the model saved in --model_dir instead of training a new one")
+    args = parser.parse_args()
+
+    if args.update:
+        try:
+            classifier = StreamingScamClassifier.load(args.model_dir)
+        except FileNotFoundError:
+            parser.error(f"no saved model in {args.model_dir} to update")
+    else:
+        classifier = StreamingScamClassifier()
+    classifier.fit_stream(args.data, epochs=args.epochs, chunk_size=args.chunk_size)
+    classifier.save(args.model_dir)
+    accuracy = classifier.evaluate_stream(args.data, chunk_size=args.chunk_size)
+    print(f"Trained on {classifier.seen} posts in total, holdout accuracy {accuracy:.3f}; "
+          f"saved to {args.model_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"Compiled matcher for the T&S word list"
+
+from __future__ import annotations
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+import string
+
+
+def is_phrase(term: str) -> bool:
+    """Multi-word terms (or ones using '&') are matched as substrings of the text."""
+    return " " in term or "&" in term
+
+
+def tokenize(text_lc: str) -> Set[str]:
+    """Split lowercased text into tokens the same way _ts_labels always has."""
+    return {tok.strip(string.punctuation) for tok in text_lc.split()}
+
+
+class TermMatcher:
+    """
+    Matches a whole word list against a post in a single pass.
+
+    Single words are matched against the post's tokens (punctuation stripped),
+    phrases are matched as substrings of the lowercased text with an
+    Aho-Corasick automaton, so the cost per post no longer depends on how
+    many terms are loaded.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        words: Set[str] = set()
+        phrases: Set[str] = set()
+        for term in terms:
+            term = term.lower()
+            if not term:
+                continue
+            (phrases if is_phrase(term) else words).add(term)
+
+        self.words = frozenset(words)
+        self.phrases = frozenset(phrases)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        for phrase in phrases:
+            self._add(phrase)
+        self._link()
+
+    def __len__(self) -> int:
+        return len(self.words) + len(self.phrases)
+
+    def _add(self, phrase: str) -> None:
+        state = 0
+        for ch in phrase:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = (phrase,)
+
+    def _link(self) -> None:
+        # breadth-first so every fail target is finished before it is used
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                if self._out[self._fail[nxt]]:
+                    self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _scan(self, text_lc: str, first_only: bool) -> Set[str]:
+        found: Set[str] = set()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text_lc:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+                if first_only:
+                    break
+        return found
+
+    def find_all(self, text: str) -> Set[str]:
+        """Return every term in the list that occurs in the text."""
+        text_lc = text.lower()
+        found = tokenize(text_lc) & self.words
+        if self.phrases:
+            found |= self._scan(text_lc, first_only=False)
+        return found
+
+    def search(self, text: str) -> bool:
+        """True as soon as any term occurs in the text."""
+        text_lc = text.lower()
+        return self.search_tokens(text_lc, tokenize(text_lc))
+
+    def search_tokens(self, text_lc: str, tokens: Set[str]) -> bool:
+        """search() for text that is already lowercased and tokenized (see TextFeatures)."""
+        if not self.words.isdisjoint(tokens):
+            return True
+        return bool(self.phrases) and bool(self._scan(text_lc, first_only=True))
@@ -0,0 +1,56 @@
+"Text features extracted once per post and shared by the text checkers"
+
+from __future__ import annotations
+from typing import Iterable, List, NamedTuple, Optional, Set, Tuple
+import re
+
+from .domain_index import split_url
+from .term_matcher import tokenize
+
+URL_RE = re.compile(r"https?://[^\s]+", re.I)
+# FastScamScorer's stand-in for sklearn's default token_pattern
+TERM_RE = re.compile(r"\w{2,}")
+
+
+class Link(NamedTuple):
+    url: str
+    host: str
+    segments: Tuple[str, ...]
+
+
+class TextFeatures:
+    """
+    One pass over a post's text: the lowercased text, its token set, and
+    every link (from the text and from the record's link facets, which
+    carry the full URL even when the displayed text is shortened) parsed
+    into a normalized host and path segments. Classifier terms are only
+    split out the first time they are asked for.
+    """
+
+    __slots__ = ("text", "text_lc", "tokens", "links", "_terms")
+
+    def __init__(self, text: str, facet_links: Iterable[str] = ()):
+        self.text = text
+        self.text_lc = text.lower()
+        self.tokens: Set[str] = tokenize(self.text_lc)
+        links: List[Link] = []
+        seen = set()
+        for url in (*facet_links, *URL_RE.findall(text)):
+            host, segments = split_url(url)
+            key = (host, tuple(segments))
+            if host and key not in seen:
+                seen.add(key)
+                links.append(Link(url, host, key[1]))
+        self.links: Tuple[Link, ...] = tuple(links)
+        self._terms: Optional[List[str]] = None
+
+    @classmethod
+    def from_post(cls, post) -> "TextFeatures":
+        return cls(post.text, post.facet_links)
+
+    @property
+    def terms(self) -> List[str]:
+        """Lowercased \\w{2,} runs, the tokens the scam classifier scores."""
+        if self._terms is None:
+            self._terms = TERM_RE.findall(self.text_lc)
+        return self._terms
@@ -0,0 +1,183 @@
+"Durable SQLite work queue of post URLs, claimed in batches by labeling workers"
+
+from __future__ import annotations
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import json, os, sqlite3, threading, time
+
+VISIBILITY_TIMEOUT = 60.0   # seconds a claimed job stays hidden from other workers
+MAX_ATTEMPTS       = 3
+CLAIM_BATCH        = 32
+RETRY_BACKOFF      = 1.0    # seconds a failed job waits before its first retry, doubled per attempt
+MAX_BACKOFF        = 300.0
+
+PENDING, DONE, DEAD = 0, 1, 2
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS jobs "
+    "(id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, state INTEGER NOT NULL DEFAULT 0, "
+    "visible_at REAL NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, owner TEXT, "
+    "uri TEXT, cid TEXT, labels TEXT, error TEXT, finished REAL)",
+    "CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(state, visible_at)",
+)
+
+
+class Job(NamedTuple):
+    id: int
+    url: str
+    attempts: int               # including this claim
+
+
+class JobResult(NamedTuple):
+    id: int
+    url: str
+    uri: Optional[str]
+    cid: Optional[str]
+    labels: Optional[List[str]]     # None if the job failed for good
+    error: Optional[str]
+    finished: float
+
+
+class WorkQueue:
+    """
+    Post URLs waiting to be moderated, in a SQLite file shared by processes.
+
+    A worker claims a batch of jobs, which hides them from every other
+    worker for `visibility_timeout` seconds (extend() pushes that back for
+    jobs still in flight), and acks each one with its labels. A job that
+    is neither acked nor failed before the timeout (its worker crashed or
+    hung) becomes claimable again; a failed one after `retry_backoff`
+    seconds, doubled on every attempt up to `max_backoff`. One that has
+    been claimed `max_attempts` times without an ack is marked dead.
+
+    ack, fail and extend only apply to the claim the caller holds (same
+    owner and attempt): once a claim has expired and the job was claimed
+    again, the late worker's calls are ignored. Each process opens its
+    own WorkQueue on the same path.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = VISIBILITY_TIMEOUT,
+                 max_attempts: int = MAX_ATTEMPTS, retry_backoff: float = RETRY_BACKOFF,
+                 max_backoff: float = MAX_BACKOFF, clock: Callable[[], float] = time.time):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "WorkQueue":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _write(self, sql: str, params=(), many: bool = False) -> Tuple[list, int]:
+        """Run one statement in a write transaction; returns its rows and the number changed."""
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent claims never deadlock
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self._db.executemany(sql, params) if many else self._db.execute(sql, params)
+                rows = cur.fetchall()
+                changed = cur.rowcount
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return rows, changed
+
+    def put(self, urls: Iterable[str]) -> None:
+        """Enqueue post URLs; a URL that is already queued (in any state) is left as it is."""
+        self._write("INSERT OR IGNORE INTO jobs (url) VALUES (?)", ((url,) for url in urls), many=True)
+
+    def claim(self, owner: str, n: int = CLAIM_BATCH) -> List[Job]:
+        """Claim up to `n` visible jobs, oldest first."""
+        now = self.clock()
+        # jobs whose last claim expired max_attempts times are given up on
+        self._write("UPDATE jobs SET state = ?, error = coalesce(error, 'visibility timeout') "
+                    "WHERE state = ? AND visible_at <= ? AND attempts >= ?",
+                    (DEAD, PENDING, now, self.max_attempts))
+        rows, _ = self._write(
+            "UPDATE jobs SET visible_at = ?, attempts = attempts + 1, owner = ? WHERE id IN "
+            "(SELECT id FROM jobs WHERE state = ? AND visible_at <= ? ORDER BY id LIMIT ?) "
+            "RETURNING id, url, attempts",
+            (now + self.visibility_timeout, owner, PENDING, now, n),
+        )
+        return sorted(Job(*row) for row in rows)
+
+    def ack(self, owner: str,
+            results: Sequence[Tuple[Job, Optional[str], Optional[str], Iterable[str]]]) -> int:
+        """
+        Mark claimed jobs done with their (job, uri, cid, labels), all in one
+        transaction. Returns how many were still `owner`'s to ack.
+        """
+        now = self.clock()
+        _, changed = self._write(
+            "UPDATE jobs SET state = ?, uri = ?, cid = ?, labels = ?, error = NULL, finished = ? "
+            "WHERE id = ? AND state = ? AND owner = ? AND attempts = ?",
+            ((DONE, uri, cid, json.dumps(sorted(labels)), now, job.id, PENDING, owner, job.attempts)
+             for job, uri, cid, labels in results),
+            many=True,
+        )
+        return changed
+
+    def fail(self, owner: str, failures: Sequence[Tuple[Job, str]]) -> int:
+        """
+        Release failed jobs for a retry after a backoff, or mark them dead
+        once out of attempts. Returns how many were still `owner`'s to fail.
+        """
+        now = self.clock()
+        _, changed = self._write(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN ? ELSE state END, "
+            "visible_at = ?, error = ?, finished = CASE WHEN attempts >= ? THEN ? END "
+            "WHERE id = ? AND state = ? AND owner = ? AND attempts = ?",
+            ((self.max_attempts, DEAD, now + self.backoff(job.attempts), error, self.max_attempts, now,
+              job.id, PENDING, owner, job.attempts)
+             for job, error in failures),
+            many=True,
+        )
+        return changed
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds a job that failed its `attempts`-th claim waits before it can be claimed again."""
+        return min(self.retry_backoff * 2 ** (attempts - 1), self.max_backoff)
+
+    def extend(self, owner: str, jobs: Iterable[Job]) -> int:
+        """Hide `owner`'s claimed jobs for another visibility_timeout; returns how many it still holds."""
+        _, changed = self._write(
+            "UPDATE jobs SET visible_at = ? WHERE id = ? AND state = ? AND owner = ? AND attempts = ?",
+            ((self.clock() + self.visibility_timeout, job.id, PENDING, owner, job.attempts) for job in jobs),
+            many=True,
+        )
+        return changed
+
+    def counts(self) -> Dict[str, int]:
+        """Jobs by state: pending (including claimed), done and dead."""
+        with self._lock:
+            rows = dict(self._db.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+        return {"pending": rows.get(PENDING, 0), "done": rows.get(DONE, 0), "dead": rows.get(DEAD, 0)}
+
+    def remaining(self) -> int:
+        return self.counts()["pending"]
+
+    def results(self) -> Iterator[JobResult]:
+        """Every finished job (done or dead), in queue order."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, url, uri, cid, labels, error, finished FROM jobs WHERE state != ? ORDER BY id",
+                (PENDING,)).fetchall()
+        for job_id, url, uri, cid, labels, error, finished in rows:
+            yield JobResult(job_id, url, uri, cid, json.loads(labels) if labels is not None else None,
+                            error, finished)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,151 @@
+"""
+Multi-process labeling: worker processes, each with its own AutomatedLabeler,
+draining a shared WorkQueue of post URLs.
+
+The labeler's CPU work (image decode, pHash, classifier scoring) holds the
+GIL, so one process tops out at one core. Here a coordinator enqueues the
+URLs and starts N workers; each builds its labeler (and so its indexes)
+once, then claims batches of jobs, moderates them on its own thread pool
+and acks the labels. A worker that dies is restarted, and the jobs it had
+claimed come back after the queue's visibility timeout.
+
+    python -m pylabel.workers labeler-inputs urls.csv --queue queue.db --processes 4
+"""
+
+from __future__ import annotations
+from typing import TYPE_CHECKING, Callable, Optional
+import argparse, multiprocessing, os, sys, time
+
+from .work_queue import CLAIM_BATCH, VISIBILITY_TIMEOUT, WorkQueue
+
+if TYPE_CHECKING:
+    from .automated_labeler import AutomatedLabeler
+
+CONCURRENCY   = 8           # posts in flight per worker (network waits overlap)
+IDLE_WAIT     = 0.5         # seconds between claims when everything left is claimed
+MAX_RESTARTS  = 3           # per worker slot
+
+LabelerFactory = Callable[[str], "AutomatedLabeler"]
+
+
+def default_labeler(input_dir: str) -> AutomatedLabeler:
+    """An AutomatedLabeler over a client logged in as USERNAME/PW from the environment (or .env)."""
+    from atproto import Client
+    from dotenv import load_dotenv
+    from .automated_labeler import AutomatedLabeler
+
+    load_dotenv(override=True)
+    client = Client()
+    username, password = os.getenv("USERNAME"), os.getenv("PW")
+    if username and password:
+        client.login(username, password)
+    return AutomatedLabeler(client, input_dir)
+
+
+def work(queue_path: str, input_dir: str, name: str, factory: LabelerFactory = default_labeler,
+         batch: int = CLAIM_BATCH, concurrency: int = CONCURRENCY,
+         visibility_timeout: float = VISIBILITY_TIMEOUT) -> int:
+    """
+    Worker loop: claim, moderate and ack until no job is left. Returns the number acked.
+
+    Each post is acked (or failed) as soon as its result arrives. The jobs
+    of the batch still waiting have their visibility extended along the
+    way: a result arrives at least every visibility_timeout / 2 (the
+    per-post timeout), so no job expires while this worker still holds it.
+    """
+    labeler = factory(input_dir)
+    acked = 0
+    try:
+        with WorkQueue(queue_path, visibility_timeout=visibility_timeout) as queue:
+            while True:
+                jobs = queue.claim(name, batch)
+                if not jobs:
+                    if queue.remaining() == 0:
+                        return acked
+                    time.sleep(IDLE_WAIT)       # the rest is claimed by others; wait for a retry
+                    continue
+                held = {job.url: job for job in jobs}      # claimed, not yet acked or failed
+                extended = time.monotonic()
+                for result in labeler.moderate_posts(list(held), concurrency=concurrency,
+                                                     timeout=visibility_timeout / 2):
+                    job = held.pop(result.url)
+                    if result.error is not None:
+                        queue.fail(name, [(job, repr(result.error))])
+                    else:
+                        ref = labeler.post_ref(result.url)
+                        acked += queue.ack(name, [(job, ref.uri, ref.cid, result.labels)])
+                    if held and time.monotonic() - extended >= visibility_timeout / 4:
+                        queue.extend(name, held.values())
+                        extended = time.monotonic()
+    finally:
+        labeler.close()
+
+
+def run_pool(queue_path: str, input_dir: str, processes: Optional[int] = None,
+             factory: LabelerFactory = default_labeler, batch: int = CLAIM_BATCH,
+             concurrency: int = CONCURRENCY, visibility_timeout: float = VISIBILITY_TIMEOUT,
+             max_restarts: int = MAX_RESTARTS) -> dict:
+    """
+    Run `processes` workers (default: one per core) until the queue is drained.
+
+    `factory` builds each worker's labeler from `input_dir`; it must be
+    picklable (a module-level function or a functools.partial of one).
+    While jobs remain, a worker that has exited is started again, up to
+    `max_restarts` times per slot; once no worker is left to run them,
+    the pool gives up. Returns the queue's final counts.
+    """
+    processes = processes or os.cpu_count() or 1
+    ctx = multiprocessing.get_context("spawn")
+    args = (queue_path, input_dir)
+    rest = (factory, batch, concurrency, visibility_timeout)
+
+    def start(slot: int):
+        proc = ctx.Process(target=work, args=(*args, f"worker-{slot}", *rest),
+                           name=f"labeler-worker-{slot}", daemon=True)
+        proc.start()
+        return proc
+
+    procs = [start(slot) for slot in range(processes)]
+    restarts = [0] * processes
+    with WorkQueue(queue_path, visibility_timeout=visibility_timeout) as queue:
+        # liveness alone is not enough: the last worker may die with jobs left
+        while queue.remaining():
+            for slot, proc in enumerate(procs):
+                if proc.is_alive() or restarts[slot] >= max_restarts:
+                    continue
+                print(f"[workers] {proc.name} exited with {proc.exitcode}, restarting", file=sys.stderr)
+                restarts[slot] += 1
+                procs[slot] = start(slot)
+            if not any(proc.is_alive() for proc in procs):
+                print(f"[workers] every worker is out of restarts; {queue.remaining()} jobs left",
+                      file=sys.stderr)
+                break
+            time.sleep(IDLE_WAIT)
+        for proc in procs:
+            proc.join()
+        return queue.counts()
+
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("labeler_inputs_dir", type=str)
+    parser.add_argument("input_urls", type=str, help="CSV with a URL column")
+    parser.add_argument("--queue", type=str, default="queue.db")
+    parser.add_argument("--processes", type=int, default=None, help="default: one per core")
+    parser.add_argument("--batch", type=int, default=CLAIM_BATCH)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--visibility_timeout", type=float, default=VISIBILITY_TIMEOUT)
+    args = parser.parse_args()
+
+    with WorkQueue(args.queue) as queue:
+        queue.put(pd.read_csv(args.input_urls)["URL"])
+    start = time.perf_counter()
+    counts = run_pool(args.queue, args.labeler_inputs_dir, args.processes, batch=args.batch,
+                      concurrency=args.concurrency, visibility_timeout=args.visibility_timeout)
+    print(f"[workers] {counts} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
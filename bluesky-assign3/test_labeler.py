@@ -8,7 +8,9 @@ import pandas as pd
 from atproto import Client
 from dotenv import load_dotenv
 
-from pylabel import AutomatedLabeler, label_post, did_from_handle
+from pylabel import AutomatedLabeler, did_from_handle
+from pylabel.emitter import LabelEmitter
+from pylabel.metrics import Metrics
 
 load_dotenv(override=True)
 USERNAME = os.getenv("USERNAME")
@@ -19,7 +21,7 @@ def main():
     Main function for the test script
     """
     client = Client()
-    labeler_client = None
+    emitter = None
     client.login(USERNAME, PW)
     did = did_from_handle(USERNAME)
 
@@ -27,26 +29,52 @@ def main():
     parser.add_argument("labeler_inputs_dir", type=str)
     parser.add_argument("input_urls", type=str)
     parser.add_argument("--emit_labels", action="store_true")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--metrics", type=str, default=None,
+                        help="write per-stage timings here (.json snapshot, else Prometheus text)")
+    parser.add_argument("--ledger", type=str, default=None,
+                        help="SQLite moderation ledger; posts already labeled and emitted are skipped")
+    parser.add_argument("--hash_processes", type=int, default=None,
+                        help="decode and hash images in this many worker processes")
+    parser.add_argument("--blob_cache", type=str, default=None,
+                        help="SQLite file that keeps image pHashes by CID across runs")
     args = parser.parse_args()
 
+    metrics = Metrics(enabled=args.metrics is not None)
+    labeler = AutomatedLabeler(client, args.labeler_inputs_dir, blob_cache_path=args.blob_cache)
+    labeler.metrics = metrics
+    if args.ledger:
+        labeler.enable_ledger(args.ledger)
+    if args.hash_processes:
+        labeler.enable_hash_pool(args.hash_processes)
     if args.emit_labels:
         labeler_client = client.with_proxy("atproto_labeler", did)
+        emitter = LabelEmitter(labeler_client, client.me.did, metrics=metrics, ledger=labeler.ledger)
 
-    labeler = AutomatedLabeler(client, args.labeler_inputs_dir)
-
-    urls = pd.read_csv(args.input_urls)
-    num_correct, total = 0, urls.shape[0]
-    for _index, row in urls.iterrows():
-        url, expected_labels = row["URL"], json.loads(row["Labels"])
-        labels = labeler.moderate_post(url)
-        if sorted(labels) == sorted(expected_labels):
-            num_correct += 1
-        else:
-            print(f"For {url}, labeler produced {labels}, expected {expected_labels}")
-        if args.emit_labels and (len(labels) > 0):
-            label_post(client, labeler_client, url, labels)
+    try:
+        urls = pd.read_csv(args.input_urls)
+        num_correct, total = 0, urls.shape[0]
+        expected = {row["URL"]: json.loads(row["Labels"]) for _index, row in urls.iterrows()}
+        for result in labeler.moderate_posts(urls["URL"], concurrency=args.concurrency):
+            url, expected_labels = result.url, expected[result.url]
+            if result.error is not None:
+                print(f"For {url}, labeler failed: {result.error!r}")
+                continue
+            labels = result.labels
+            if sorted(labels) == sorted(expected_labels):
+                num_correct += 1
+            else:
+                print(f"For {url}, labeler produced {labels}, expected {expected_labels}")
+            if emitter is not None and (len(labels) > 0):
+                emitter.label_post(labeler.post_ref(url), labels)
+    finally:
+        if emitter is not None:
+            emitter.close()
+        labeler.close()
     print(f"The labeler produced {num_correct} correct labels assignments out of {total}")
     print(f"Overall ratio of correct label assignments {num_correct/total}")
+    if args.metrics:
+        metrics.write(args.metrics)
 
 
 if __name__ == "__main__":
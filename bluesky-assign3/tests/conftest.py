@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the tests import pylabel and benchmarks from the bluesky-assign3 directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
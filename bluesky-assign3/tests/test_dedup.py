@@ -0,0 +1,89 @@
+"""The near-duplicate cache in front of the labeler's stages: what a hit skips and what is never cached."""
+
+from pathlib import Path
+
+import pytest
+
+from benchmarks.fixtures import FakeClient, fake_cid
+from pylabel.automated_labeler import AutomatedLabeler
+from pylabel.post_context import PostContext
+from pylabel.stages import IMAGES, TEXT, IncompleteModeration, Stage
+
+INPUT_DIR = str(Path(__file__).resolve().parent.parent / "labeler-inputs")
+WAVE_TEXT = ("limited offer send eth now and get double back guaranteed returns for everyone today "
+         "https://www.nytimes.com/2025/04/01/story.html")
+
+
+def post(i: int, text: str = WAVE_TEXT, images: int = 1) -> PostContext:
+    record = {"$type": "app.bsky.feed.post", "text": text, "createdAt": "2025-04-01T00:00:00Z"}
+    if images:
+        record["embed"] = {"$type": "app.bsky.embed.images", "images": [
+            {"alt": "", "image": {"$type": "blob", "mimeType": "image/jpeg", "size": 1,
+                                  "ref": {"$link": fake_cid(f"{i}-{n}".encode())}}} for n in range(images)]}
+    return PostContext.from_record(f"https://bsky.app/profile/did:plc:u{i}/post/3l{i}",
+                                   f"at://did:plc:u{i}/app.bsky.feed.post/3l{i}", f"cid{i}", record)
+
+
+class Recorder:
+    """An I/O stage standing in for the blob fetch, counting its calls."""
+
+    def __init__(self, labels=("probe",)):
+        self.calls = 0
+        self.labels = set(labels)
+        self.fail = False
+
+    def __call__(self, post, features):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("blob fetch failed")
+        return self.labels
+
+
+@pytest.fixture(scope="module")
+def base():
+    labeler = AutomatedLabeler(FakeClient([]), INPUT_DIR)
+    yield labeler
+    labeler.close()
+
+
+@pytest.fixture
+def labeler(base):
+    base.unregister("dog_labels")
+    base.unregister("probe")
+    probe = Recorder()
+    base.register(Stage("probe", probe, inputs=frozenset({IMAGES}), io=True))
+    base.enable_dedup()
+    base.probe = probe
+    return base
+
+
+def test_exact_copy_skips_every_stage(labeler):
+    assert sorted(labeler.moderate(post(1))) == ["nyt", "probe"]
+    texts = []
+    labeler.register(Stage("texts", lambda p, f: texts.append(p.uri) or (), inputs=frozenset({TEXT})))
+    # same text with other whitespace and case, and an image uploaded again
+    copy = post(2, "  " + WAVE_TEXT.replace("limited", "LIMITED").replace(" ", "\n", 3))
+    assert sorted(labeler.moderate(copy)) == ["nyt", "probe"]
+    assert labeler.probe.calls == 1 and texts == []
+    labeler.unregister("texts")
+
+
+def test_near_copy_reuses_only_network_labels(labeler):
+    labeler.moderate(post(1))
+    near = post(2, WAVE_TEXT.replace("today", "tomorrow"))
+    assert sorted(labeler.moderate(near)) == ["nyt", "probe"]
+    assert labeler.probe.calls == 1
+    # a changed link is not a copy, and neither is a different number of images
+    labeler.moderate(post(3, WAVE_TEXT.replace("nytimes", "washingtonpost")))
+    labeler.moderate(post(4, images=2))
+    assert labeler.probe.calls == 3
+
+
+def test_failed_stage_is_not_cached(labeler):
+    labeler.probe.fail = True
+    with pytest.raises(IncompleteModeration) as e:
+        labeler.moderate(post(1))
+    assert e.value.labels == {"nyt"}
+    labeler.probe.fail = False
+    assert sorted(labeler.moderate(post(2))) == ["nyt", "probe"]
+    assert labeler.probe.calls == 2
@@ -0,0 +1,101 @@
+"""LabelEmitter against a fake Ozone endpoint: idempotent re-emits, retries on 5xx, concurrent submits."""
+
+import threading
+from types import SimpleNamespace
+
+from atproto_client.exceptions import RequestErrorBase
+from atproto_client.request import Response
+
+from pylabel.emitter import LabelEmitter
+from pylabel.ledger import ModerationLedger
+
+URI = "at://did:plc:user0001/app.bsky.feed.post/3lpost0001"
+
+
+def post(cid: str = "cid1"):
+    return SimpleNamespace(uri=URI, cid=cid)
+
+
+def status(code: int) -> RequestErrorBase:
+    return RequestErrorBase(Response(success=False, status_code=code, content=None, headers={}))
+
+
+class FakeOzone:
+    """Records emitEvent calls as (subject uri, cid, labels); raises the queued errors first."""
+
+    def __init__(self):
+        self.events = []
+        self.errors = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+        self.tools = SimpleNamespace(ozone=SimpleNamespace(moderation=SimpleNamespace(emit_event=self.emit_event)))
+
+    def emit_event(self, data):
+        self.entered.set()
+        self.release.wait(10)
+        if self.errors:
+            raise self.errors.pop(0)
+        subject = data.subject
+        self.events.append((getattr(subject, "uri", None), getattr(subject, "cid", None),
+                            sorted(data.event.create_label_vals)))
+
+
+def emitter(ozone, **kwargs):
+    kwargs.setdefault("max_delay", 60.0)
+    return LabelEmitter(ozone, "did:plc:labeler", **kwargs)
+
+
+def test_re_emit_is_idempotent_per_uri_cid_and_label(tmp_path):
+    ozone = FakeOzone()
+    with emitter(ozone) as e:
+        e.label_post(post(), ["scam"])
+        e.flush()
+        e.label_post(post(), ["scam"])
+        e.label_post(post(), ["scam", "dog"])
+        e.flush()
+        e.label_post(post("cid2"), ["scam"])      # the record was edited: a new subject
+    assert ozone.events == [(URI, "cid1", ["scam"]), (URI, "cid1", ["dog"]), (URI, "cid2", ["scam"])]
+
+    # a restarted emitter learns from the ledger what was already sent
+    ozone = FakeOzone()
+    with ModerationLedger(str(tmp_path / "ledger.db")) as ledger:
+        version = ledger.version_id({"stages": {}})
+        ledger.record(URI, "cid1", ["scam", "dog"], version)
+        with emitter(ozone, ledger=ledger) as e:
+            e.label_post(post(), ["scam"])
+        with emitter(ozone, ledger=ledger) as e:
+            e.label_post(post(), ["scam", "dog"])
+    assert ozone.events == [(URI, "cid1", ["scam"]), (URI, "cid1", ["dog"])]
+
+
+def test_retries_5xx_but_not_4xx():
+    ozone, slept = FakeOzone(), []
+    ozone.errors = [status(503), status(502)]
+    with emitter(ozone, sleep=slept.append, backoff=0.5) as e:
+        e.label_post(post(), ["scam"])
+        e.flush()
+        assert e.sent == 1 and len(slept) == 2 and 0.25 <= slept[0] <= 0.5 and 0.5 <= slept[1] <= 1.0
+        ozone.errors = [status(400)]
+        e.label_post(post(), ["dog"])
+        e.flush()
+        assert e.failed == 1 and len(slept) == 2
+    assert ozone.events == [(URI, "cid1", ["scam"])]
+
+
+def test_label_submitted_while_in_flight_is_sent_once():
+    ozone = FakeOzone()
+    ozone.release.clear()
+    with emitter(ozone) as e:
+        e.label_post(post(), ["scam"])
+        flusher = threading.Thread(target=e.flush)
+        flusher.start()
+        assert ozone.entered.wait(5)           # the flush is sending "scam" right now
+        submitters = [threading.Thread(target=e.label_post, args=(post(), ["scam", "dog"])) for _ in range(4)]
+        for t in submitters:
+            t.start()
+        for t in submitters:
+            t.join()
+        ozone.release.set()
+        flusher.join()
+    assert ozone.events == [(URI, "cid1", ["scam"]), (URI, "cid1", ["dog"])]
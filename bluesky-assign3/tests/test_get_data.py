@@ -0,0 +1,93 @@
+"""get_data.crawl against a fake author feed: resuming, --fresh, and --append picking up new posts."""
+
+import csv
+import json
+from types import SimpleNamespace
+
+import get_data
+
+
+def item(account: str, n: int, when: str):
+    record = SimpleNamespace(text=f"post {n} from {account}", embed=None, facets=None)
+    return SimpleNamespace(reason=None, post=SimpleNamespace(
+        uri=f"at://{account}/app.bsky.feed.post/{n}", record=record, labels=[], reply=None, indexed_at=when))
+
+
+class FakeFeed:
+    """Serves each account's feed newest first, `page` items at a time; fails a page on request."""
+
+    def __init__(self, feeds, page: int = 2):
+        self.feeds = feeds
+        self.page = page
+        self.fail_at = set()        # (account, cursor) pairs that raise
+        self.requests = []
+        self.app = SimpleNamespace(bsky=SimpleNamespace(feed=SimpleNamespace(get_author_feed=self.get_author_feed)))
+
+    def get_author_feed(self, params):
+        account, cursor = params["actor"], params.get("cursor")
+        self.requests.append((account, cursor))
+        if (account, cursor) in self.fail_at:
+            raise RuntimeError("502 from the AppView")
+        start = int(cursor or 0)
+        items = self.feeds[account][start:start + self.page]
+        more = start + self.page < len(self.feeds[account])
+        return SimpleNamespace(feed=items, cursor=str(start + self.page) if more else None)
+
+
+def feed(account: str, n: int, first: int = 0):
+    # newest first, as the AppView returns them
+    return [item(account, i, f"2025-04-01T00:00:{i:02d}.000Z") for i in reversed(range(first, first + n))]
+
+
+def rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row["URI"] for row in csv.DictReader(f)]
+
+
+def paths(tmp_path):
+    return str(tmp_path / "posts.csv"), str(tmp_path / "state.json")
+
+
+def test_interrupted_crawl_resumes_from_partial_files(tmp_path):
+    out, state = paths(tmp_path)
+    client = FakeFeed({"a": feed("a", 5), "b": feed("b", 3)})
+    client.fail_at.add(("a", "2"))
+    get_data.crawl(client, ["a", "b"], out, state, concurrency=1)
+    # account a stopped midway: nothing replaces the output yet
+    assert not (tmp_path / "posts.csv").exists()
+    assert len(rows(out + ".partial")) == 2 + 3
+
+    client.fail_at.clear()
+    client.requests.clear()
+    get_data.crawl(client, ["a", "b"], out, state, concurrency=1)
+    assert client.requests == [("a", "2"), ("a", "4")]     # b was done, a resumes at its cursor
+    assert sorted(rows(out)) == sorted(f"at://a/app.bsky.feed.post/{i}" for i in range(5)) + \
+        sorted(f"at://b/app.bsky.feed.post/{i}" for i in range(3))
+    assert not (tmp_path / "posts.csv.partial").exists()
+
+
+def test_fresh_discards_an_interrupted_crawl(tmp_path):
+    out, state = paths(tmp_path)
+    client = FakeFeed({"a": feed("a", 5)})
+    client.fail_at.add(("a", "2"))
+    get_data.crawl(client, ["a"], out, state)
+    client.fail_at.clear()
+    client.requests.clear()
+    get_data.crawl(client, ["a"], out, state, fresh=True)
+    assert client.requests == [("a", None), ("a", "2"), ("a", "4")]
+    assert len(rows(out)) == 5
+
+
+def test_append_picks_up_new_posts_of_finished_accounts(tmp_path):
+    out, state = paths(tmp_path)
+    client = FakeFeed({"a": feed("a", 5)})
+    get_data.crawl(client, ["a"], out, state, append=True)
+    assert json.load(open(state))["a"] == {"cursor": None, "done": True, "since": "2025-04-01T00:00:04.000Z"}
+
+    # three new posts since, and one old post pinned at the top
+    client.feeds["a"] = [client.feeds["a"][-1]] + feed("a", 3, first=5) + client.feeds["a"][1:]
+    client.requests.clear()
+    get_data.crawl(client, ["a"], out, state, append=True)
+    assert client.requests == [("a", None), ("a", "2"), ("a", "4")]    # stops at the first all-old page
+    assert len(rows(out)) == 8
+    assert json.load(open(state))["a"]["since"] == "2025-04-01T00:00:07.000Z"
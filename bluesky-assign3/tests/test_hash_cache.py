@@ -0,0 +1,25 @@
+"""hash_directory notices an image rewritten in place, without the directory changing."""
+
+import os
+import shutil
+from pathlib import Path
+
+from pylabel.hash_cache import hash_directory, hash_image_bytes
+
+DOG_DIR = Path(__file__).resolve().parent.parent / "labeler-inputs" / "dog-list-images"
+
+
+def test_image_rewritten_in_place_is_rehashed(tmp_path):
+    first, second = sorted(DOG_DIR.iterdir())[:2]
+    images = tmp_path / "images"
+    images.mkdir()
+    shutil.copy(first, images / "a.jpg")
+    cache = str(tmp_path / "hashes.npz")
+    names, hashes = hash_directory(str(images), cache)
+    assert names.tolist() == ["a.jpg"] and int(hashes[0]) == hash_image_bytes(first.read_bytes())
+
+    dir_mtime = os.stat(images).st_mtime_ns
+    (images / "a.jpg").write_bytes(second.read_bytes())
+    assert os.stat(images).st_mtime_ns == dir_mtime
+    _names, hashes = hash_directory(str(images), cache)
+    assert int(hashes[0]) == hash_image_bytes(second.read_bytes())
@@ -0,0 +1,35 @@
+"""HashPool recovers from a dead worker and gives up on a slow one."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from pylabel.hash_pool import HashPool
+from pylabel.metrics import Metrics
+
+DOG_DIR = Path(__file__).resolve().parent.parent / "labeler-inputs" / "dog-list-images"
+
+
+@pytest.fixture(scope="module")
+def image():
+    return next(DOG_DIR.iterdir()).read_bytes()
+
+
+def test_rebuilds_a_broken_pool_and_retries(image):
+    metrics = Metrics(enabled=True)
+    with HashPool(1, metrics=metrics) as pool:
+        expected = pool.hash(image)
+        with pytest.raises(Exception):
+            pool._pool.submit(os._exit, 1).result()     # a worker dies, breaking the pool
+        assert pool.hash(image) == expected
+        assert pool.restarts == 1
+    assert {"name": "hash_pool_restarts", "labels": {}, "value": 1} in metrics.snapshot()["counters"]
+
+
+def test_times_out(image):
+    metrics = Metrics(enabled=True)
+    with HashPool(1, timeout=1e-6, metrics=metrics) as pool:
+        with pytest.raises(TimeoutError):
+            pool.hash(image)
+    assert {"name": "timeouts", "labels": {"stage": "hash_pool"}, "value": 1} in metrics.snapshot()["counters"]
@@ -0,0 +1,8 @@
+"""The import budget of benchmarks.bench_import: no heavy package loaded where it is not needed."""
+
+from benchmarks.bench_import import check
+
+
+def test_imports_stay_within_budget():
+    failures = check(runs=2, report=lambda line: None)
+    assert failures == []
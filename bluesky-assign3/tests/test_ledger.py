@@ -0,0 +1,47 @@
+"""The moderation ledger in front of the labeler: keyed by URI + CID, invalidated by a new model."""
+
+from pathlib import Path
+
+from benchmarks.fixtures import FakeClient, Fixture
+from pylabel.automated_labeler import AutomatedLabeler
+from pylabel.fast_scorer import FastScamScorer
+from pylabel.stages import scam_stage
+
+INPUT_DIR = str(Path(__file__).resolve().parent.parent / "labeler-inputs")
+URL = "https://bsky.app/profile/user1.bsky.social/post/3lpost0001"
+URI = "at://did:plc:user0001/app.bsky.feed.post/3lpost0001"
+
+
+def fixture(cid: str, text: str) -> Fixture:
+    record = {"$type": "app.bsky.feed.post", "text": text, "createdAt": "2025-04-01T00:00:00Z"}
+    return Fixture(URL, URI, cid, record, [])
+
+
+def test_post_rewritten_in_place_is_moderated_again(tmp_path):
+    client = FakeClient([fixture("cid1", "read https://www.nytimes.com/2025/04/01/story.html")])
+    with AutomatedLabeler(client, INPUT_DIR) as labeler:
+        labeler.enable_ledger(str(tmp_path / "ledger.db"))
+        assert labeler.moderate_post(URL) == ["nyt"]
+        labeler.post_cache.clear()
+        assert labeler.moderate_post(URL) == ["nyt"]
+        assert labeler.ledger.get(URI, "cid1") is not None
+
+        # putRecord: same URL and URI, new content and CID
+        client._by_key[("user1.bsky.social", "3lpost0001")] = fixture(
+            "cid2", "read https://www.cnn.com/2025/04/01/story.html")
+        labeler.post_cache.clear()
+        assert labeler.moderate_post(URL) == ["cnn"]
+        assert labeler.post_ref(URL).cid == "cid2"
+
+
+def test_retrained_scam_model_changes_the_rule_version(tmp_path):
+    table = {"lowercase": True, "token_pattern": r"(?u)\b\w\w+\b", "classes": [0, 1],
+             "intercept": 0.0, "weights": {"eth": [3.0, 1.0]}}
+    with AutomatedLabeler(FakeClient([]), INPUT_DIR) as labeler:
+        labeler.enable_ledger(str(tmp_path / "ledger.db"))
+        labeler.register(scam_stage(FastScamScorer(table, digest="model-a")))
+        before = labeler.rule_version()
+        labeler.register(scam_stage(FastScamScorer(table, digest="model-a")))
+        assert labeler.rule_version() == before
+        labeler.register(scam_stage(FastScamScorer(table, digest="model-b")))
+        assert labeler.rule_version() != before
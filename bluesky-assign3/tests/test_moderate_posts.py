@@ -0,0 +1,122 @@
+"""moderate_posts against a fake XRPC client: timeouts, slot reuse and rate limits."""
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from benchmarks.fixtures import FakeClient, Fixture
+from pylabel.automated_labeler import AutomatedLabeler
+from pylabel.rate_limit import HostRateLimiter
+
+INPUT_DIR = str(Path(__file__).resolve().parent.parent / "labeler-inputs")
+
+
+def fixture(i: int, text: str) -> Fixture:
+    record = {"$type": "app.bsky.feed.post", "text": text, "createdAt": "2025-04-01T00:00:00Z"}
+    return Fixture(f"https://bsky.app/profile/user{i}.bsky.social/post/3lpost{i:04d}",
+                   f"at://did:plc:user{i:04d}/app.bsky.feed.post/3lpost{i:04d}", f"cid{i}", record, [])
+
+
+class SlowClient(FakeClient):
+    """A FakeClient whose get_post takes `delay` seconds, or blocks until `release` for hung handles."""
+
+    def __init__(self, fixtures, delay: float = 0.0, hung=()):
+        super().__init__(fixtures)
+        self.delay = delay
+        self.hung = set(hung)
+        self.release = threading.Event()
+
+    def get_post(self, rkey: str, handle: str):
+        if handle in self.hung:
+            self.release.wait(10)
+        time.sleep(self.delay)
+        return super().get_post(rkey, handle)
+
+
+@pytest.fixture(scope="module")
+def labeler():
+    return AutomatedLabeler(FakeClient([]), INPUT_DIR)
+
+
+def posts(first: int, n: int):
+    # each test uses its own posts, since the labeler caches the ones it has hydrated
+    return [fixture(i, f"read this https://www.nytimes.com/2025/04/01/story-{i}.html")
+            for i in range(first, first + n)]
+
+
+def test_labels_every_post(labeler):
+    fixtures = posts(0, 20)
+    labeler.client = SlowClient(fixtures, delay=0.01)
+    results = list(labeler.moderate_posts([fx.url for fx in fixtures], concurrency=4))
+    assert sorted(r.url for r in results) == sorted(fx.url for fx in fixtures)
+    assert all(r.error is None and r.labels == ["nyt"] for r in results)
+
+
+def test_hung_post_does_not_hold_its_slot(labeler):
+    fixtures = posts(100, 4)
+    client = SlowClient(fixtures, delay=0.05, hung={"user100.bsky.social"})
+    labeler.client = client
+    try:
+        # with one slot, the posts after the hung one only run once it is abandoned,
+        # and the timeout must count their own running time, not the wait
+        results = {r.url: r for r in labeler.moderate_posts([fx.url for fx in fixtures],
+                                                             concurrency=1, timeout=0.5)}
+    finally:
+        client.release.set()
+    assert isinstance(results[fixtures[0].url].error, TimeoutError)
+    for fx in fixtures[1:]:
+        assert results[fx.url].error is None, results[fx.url].error
+        assert results[fx.url].labels == ["nyt"]
+
+
+class CountingLimiter(HostRateLimiter):
+    """A HostRateLimiter that counts the requests it was asked to throttle."""
+
+    def __init__(self, limits):
+        super().__init__(limits)
+        self.calls = 0
+
+    def acquire(self, host_or_url: str) -> None:
+        self.calls += 1
+        super().acquire(host_or_url)
+
+
+def test_rate_limits_apply_to_the_batch_only(labeler):
+    fixtures = posts(200, 8)
+    labeler.client = SlowClient(fixtures)
+    own = CountingLimiter({"example.org": 1.0})
+    labeler.rate_limiter = own
+    try:
+        start = time.perf_counter()
+        results = list(labeler.moderate_posts([fx.url for fx in fixtures], rate_limits={"bsky.social": 4.0}))
+        elapsed = time.perf_counter() - start
+    finally:
+        labeler.rate_limiter = None
+    assert all(r.labels == ["nyt"] for r in results)
+    # a burst of 4 tokens, then one every 0.25 s for the other 4 posts
+    assert 0.75 <= elapsed < 3.0
+    assert own.calls == 0 and labeler.rate_limiter is None
+
+
+def test_concurrent_batches_keep_their_own_limits(labeler):
+    slow, fast = posts(300, 6), posts(400, 4)
+    labeler.client = SlowClient(slow + fast)
+    throttled = {}
+
+    def run_throttled():
+        start = time.perf_counter()
+        list(labeler.moderate_posts([fx.url for fx in slow], rate_limits={"bsky.social": 2.0}))
+        throttled["elapsed"] = time.perf_counter() - start
+
+    thread = threading.Thread(target=run_throttled)
+    thread.start()
+    time.sleep(0.1)                 # the throttled batch has used its burst and is waiting
+    start = time.perf_counter()
+    results = list(labeler.moderate_posts([fx.url for fx in fast]))
+    unthrottled = time.perf_counter() - start
+    thread.join()
+    assert all(r.labels == ["nyt"] for r in results)
+    assert unthrottled < 0.5
+    assert throttled["elapsed"] >= 1.5      # 2 at once, then 4 more at 2 per second
@@ -0,0 +1,51 @@
+"""StreamLabeler: retries, dead-lettering and the checkpoint moving past a post that keeps failing."""
+
+import json
+
+from pylabel.stages import IncompleteModeration
+from pylabel.stream import StreamLabeler, load_cursor
+
+
+def event(i: int, text: str) -> str:
+    return json.dumps({"did": f"did:plc:user{i}", "time_us": 1000 + i, "kind": "commit",
+                       "commit": {"operation": "create", "collection": "app.bsky.feed.post",
+                                  "rkey": f"3lpost{i}", "cid": f"cid{i}",
+                                  "record": {"$type": "app.bsky.feed.post", "text": text,
+                                             "createdAt": "2025-04-01T00:00:00Z"}}})
+
+
+class FlakyLabeler:
+    """Labels posts "x"; a post whose text says "broken" never completes, one saying "flaky" fails once."""
+
+    def __init__(self):
+        self.attempts = {}
+
+    def moderate(self, post):
+        n = self.attempts[post.uri] = self.attempts.get(post.uri, 0) + 1
+        if "broken" in post.text:
+            raise IncompleteModeration({"partial"}, {"dog_labels": RuntimeError("blob 404")})
+        if "flaky" in post.text and n == 1:
+            raise RuntimeError("transient")
+        return ["x"]
+
+
+def test_failing_post_is_dead_lettered_and_the_checkpoint_moves_on(tmp_path):
+    checkpoint, dead = str(tmp_path / "cursor.json"), str(tmp_path / "dead.jsonl")
+    labeler, emitted = FlakyLabeler(), {}
+    stream = StreamLabeler(labeler, lambda post, labels: emitted.__setitem__(post.uri, labels),
+                           workers=1, checkpoint_path=checkpoint, report_every=None,
+                           retries=3, retry_backoff=0.0, dead_letter_path=dead)
+    stats = stream.run([event(0, "fine"), event(1, "broken"), event(2, "flaky"), event(3, "fine")])
+
+    assert stats.errors == 1 and stats.labeled == 4
+    broken = "at://did:plc:user1/app.bsky.feed.post/3lpost1"
+    assert labeler.attempts[broken] == 3
+    assert emitted[broken] == ["partial"]           # what the other stages found is still emitted
+    assert emitted["at://did:plc:user2/app.bsky.feed.post/3lpost2"] == ["x"]
+    [record] = [json.loads(line) for line in open(dead, encoding="utf-8")]
+    assert record["uri"] == broken and record["cid"] == "cid1" and record["labels"] == ["partial"]
+    assert "blob 404" in record["error"]
+
+    cursor, _seen = load_cursor(checkpoint)
+    assert cursor == 1003
+    assert not stream.watermark._pending
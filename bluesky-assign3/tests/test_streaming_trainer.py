@@ -0,0 +1,60 @@
+"""StreamingScamClassifier: a saved model keeps learning where it stopped, and the CLI that trains it."""
+
+import csv
+import json
+import random
+import sys
+
+import numpy as np
+
+from pylabel import streaming_trainer
+from pylabel.streaming_trainer import StreamingScamClassifier, is_holdout
+
+SCAM = ["send eth now and get double back", "guaranteed returns click the link", "crypto giveaway limited offer"]
+HAM = ["lovely walk in the park today", "reading a good book tonight", "the match was great fun"]
+
+
+def write_posts(path, n: int, seed: int = 0):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["URI", "Account", "Label", "Post"])
+        for i in range(n):
+            label = i % 2
+            text = f"{rng.choice(SCAM if label else HAM)} {rng.choice(SCAM + HAM).split()[-1]}"
+            writer.writerow([f"at://did:plc:u{seed}/app.bsky.feed.post/{i}", "user", label, text])
+    return path
+
+
+def trained_rows(n: int, seed: int = 0) -> int:
+    return sum(not is_holdout(f"at://did:plc:u{seed}/app.bsky.feed.post/{i}") for i in range(n))
+
+
+def test_saved_model_continues_training_like_the_original(tmp_path):
+    data = write_posts(tmp_path / "posts.csv", 400)
+    more = write_posts(tmp_path / "more.csv", 100, seed=1)
+    original = StreamingScamClassifier(n_features=1 << 12).fit_stream(data, chunk_size=64)
+    original.save(tmp_path / "model")
+    restored = StreamingScamClassifier.load(tmp_path / "model")
+    assert restored.seen == original.seen
+
+    # the incremental update takes the same steps on the restored model as on the one in memory
+    for clf in (original, restored):
+        clf.fit_stream(more, chunk_size=64, holdout=False)
+    np.testing.assert_allclose(restored.model.coef_, original.model.coef_)
+    assert restored.model.intercept_[0] == original.model.intercept_[0]
+    assert restored.seen == original.seen == trained_rows(400) + 100
+    assert restored.predict("send eth now and get double back") == 1
+    assert restored.predict("lovely walk in the park today") == 0
+
+
+def test_cli_trains_then_updates_the_saved_model(tmp_path, monkeypatch, capsys):
+    data = write_posts(tmp_path / "posts.csv", 200)
+    model_dir = tmp_path / "model"
+    for extra in ([], ["--update"]):
+        monkeypatch.setattr(sys, "argv", ["streaming_trainer", "--data", str(data),
+                                          "--model_dir", str(model_dir), *extra])
+        streaming_trainer.main()
+    meta = json.loads((model_dir / streaming_trainer.MODEL_FILE).read_text(encoding="utf-8"))
+    assert meta["seen"] == 2 * trained_rows(200)
+    assert "holdout accuracy" in capsys.readouterr().out
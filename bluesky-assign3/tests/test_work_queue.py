@@ -0,0 +1,183 @@
+"""WorkQueue claims, visibility timeouts, retries and dead jobs, and a worker taking over a crashed one's jobs."""
+
+import functools
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from pylabel.automated_labeler import ModerationResult
+from pylabel.work_queue import WorkQueue
+from pylabel.workers import run_pool, work
+
+URLS = [f"https://bsky.app/profile/user{i}.bsky.social/post/3lpost{i:04d}" for i in range(5)]
+
+
+class Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    with WorkQueue(str(tmp_path / "queue.db"), visibility_timeout=60.0, max_attempts=3,
+                   retry_backoff=10.0, clock=clock) as q:
+        q.put(URLS)
+        yield q
+
+
+def done(job):
+    return (job, f"at://{job.url}", "cid", ["x"])
+
+
+def test_claim_hides_jobs_from_other_workers(queue):
+    a = queue.claim("a", 3)
+    b = queue.claim("b", 3)
+    assert [job.url for job in a] == URLS[:3]
+    assert [job.url for job in b] == URLS[3:]
+    assert all(job.attempts == 1 for job in a + b)
+    assert queue.claim("c", 3) == []
+
+    assert queue.ack("a", [done(job) for job in a]) == 3
+    assert queue.ack("b", [done(b[0])]) == 1
+    assert queue.counts() == {"pending": 1, "done": 4, "dead": 0}
+    results = list(queue.results())
+    assert [r.url for r in results] == URLS[:4]
+    assert all(r.labels == ["x"] and r.error is None for r in results)
+
+
+def test_expired_claim_is_reclaimed_and_late_ack_ignored(queue, clock):
+    [job] = queue.claim("a", 1)
+    clock.now += 61
+    [again] = queue.claim("b", 1)
+    assert again.id == job.id and again.attempts == 2
+
+    # the first worker's claim is gone: neither its ack nor its fail counts
+    assert queue.ack("a", [done(job)]) == 0
+    assert queue.fail("a", [(job, "late")]) == 0
+    # nor does the same owner replaying an older attempt
+    assert queue.ack("b", [done(job)]) == 0
+    assert queue.ack("b", [done(again)]) == 1
+    assert queue.counts()["done"] == 1
+
+
+def test_extend_keeps_jobs_hidden(queue, clock):
+    jobs = queue.claim("a", 5)
+    clock.now += 50
+    assert queue.extend("a", jobs) == 5
+    assert queue.extend("b", jobs) == 0
+    clock.now += 50
+    assert queue.claim("b", 5) == []
+    clock.now += 11
+    assert len(queue.claim("b", 5)) == 5
+
+
+def test_failed_job_retries_with_exponential_backoff(queue, clock):
+    [job] = queue.claim("a", 1)
+    assert queue.fail("a", [(job, "boom")]) == 1
+    others = queue.claim("a", 5)
+    assert job.id not in {j.id for j in others}     # not visible before its backoff
+    queue.ack("a", [done(j) for j in others])
+    clock.now += 9.9
+    assert queue.claim("a", 1) == []
+    clock.now += 0.1
+    [retry] = queue.claim("a", 1)
+    assert retry.id == job.id and retry.attempts == 2
+
+    queue.fail("a", [(retry, "boom")])
+    clock.now += 19.9
+    assert queue.claim("a", 1) == []
+    clock.now += 0.1
+    assert queue.claim("a", 1)[0].attempts == 3
+
+
+def test_job_out_of_attempts_is_dead(queue, clock):
+    for attempt in range(1, 4):
+        [job] = queue.claim("a", 1)
+        assert job.attempts == attempt
+        queue.fail("a", [(job, f"boom {attempt}")])
+        clock.now += queue.backoff(attempt)
+    assert queue.counts() == {"pending": 4, "done": 0, "dead": 1}
+    [dead] = queue.results()
+    assert dead.url == URLS[0] and dead.labels is None and dead.error == "boom 3"
+
+
+def test_job_whose_claims_all_expire_is_dead(queue, clock):
+    for _ in range(3):
+        assert queue.claim("a", 1)[0].url == URLS[0]
+        clock.now += 61
+    assert queue.claim("a", 1)[0].url == URLS[1]
+    [dead] = queue.results()
+    assert dead.url == URLS[0] and dead.error == "visibility timeout"
+
+
+class FakeLabeler:
+    """Labels every post ["x"]; enough of AutomatedLabeler for work()."""
+
+    def __init__(self, crash_marker=None):
+        self.crash_marker = crash_marker
+        self.closed = False
+
+    def moderate_posts(self, urls, concurrency, timeout):
+        for url in urls:
+            if self.crash_marker and not os.path.exists(self.crash_marker):
+                open(self.crash_marker, "w").close()
+                os._exit(1)         # the first worker dies holding its claimed jobs
+            yield ModerationResult(url, ["x"])
+
+    def post_ref(self, url):
+        return SimpleNamespace(uri=f"at://{url}", cid="cid")
+
+    def close(self):
+        self.closed = True
+
+
+def crashing_labeler(crash_marker, _input_dir):
+    return FakeLabeler(crash_marker)
+
+
+def dying_labeler(_input_dir):
+    os._exit(1)
+
+
+def test_worker_takes_over_crashed_workers_jobs(tmp_path):
+    path = str(tmp_path / "queue.db")
+    with WorkQueue(path, visibility_timeout=0.2) as queue:
+        queue.put(URLS)
+        crashed = queue.claim("crashed", 2)     # claimed, then never acked
+
+    labeler = FakeLabeler()
+    assert work(path, "unused", "worker", factory=lambda _dir: labeler, visibility_timeout=0.2) == len(URLS)
+    assert labeler.closed
+
+    with WorkQueue(path) as queue:
+        results = {r.url: r for r in queue.results()}
+        assert queue.counts() == {"pending": 0, "done": len(URLS), "dead": 0}
+        assert queue.ack("crashed", [done(job) for job in crashed]) == 0
+    assert all(r.labels == ["x"] for r in results.values())
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_pool_restarts_the_last_worker_when_it_crashes(tmp_path, processes):
+    path = str(tmp_path / "queue.db")
+    with WorkQueue(path) as queue:
+        queue.put(URLS)
+    factory = functools.partial(crashing_labeler, str(tmp_path / "crashed"))
+    counts = run_pool(path, "unused", processes, factory=factory, batch=len(URLS), visibility_timeout=0.5)
+    assert counts == {"pending": 0, "done": len(URLS), "dead": 0}
+
+
+def test_pool_gives_up_once_out_of_restarts(tmp_path):
+    path = str(tmp_path / "queue.db")
+    with WorkQueue(path) as queue:
+        queue.put(URLS)
+    counts = run_pool(path, "unused", 1, factory=dying_labeler, visibility_timeout=0.5, max_restarts=1)
+    assert counts["pending"] == len(URLS)